@@ -0,0 +1,194 @@
+import os
+import json
+import time
+
+import main
+from main import (
+    PROMPT_TEMPLATE,
+    TEMPERATURE,
+    build_prompt,
+    load_post_text,
+    get_coordinates_from_api,
+    format_result,
+    save_response,
+    post_key,
+    trace,
+    trace_posts,
+)
+
+# Kept apart from the repository's requests.jsonl placeholder so it is never overwritten
+DEFAULT_BATCH_FILE = "batch_requests.jsonl"
+BATCH_ENDPOINT = "/v1/chat/completions"
+FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+def parse_custom_id(custom_id, base_dir="yearly_result"):
+    """Map a custom_id back to (year, txt_file, coordinate_file)"""
+    year, file_id = custom_id.split("-", 1)
+    folder = os.path.join(base_dir, f"result_{year}", "output_banjir")
+    return int(year), os.path.join(folder, f"{file_id}.txt"), os.path.join(folder, f"{file_id}_coordinate.loc")
+
+def build_batch_file(jobs, model, batch_file=DEFAULT_BATCH_FILE):
+    """
+    Write one chat completion request per pending job to a JSONL batch file.
+    Posts already answered in the LLM cache, or confidently by the rule-based
+    fast path, are returned as {custom_id: address} instead of being sent.
+    """
+    cached = {}
+    written = 0
+    with open(batch_file, 'w', encoding='utf-8') as f:
+        for year, txt_file, _ in jobs:
+            custom_id = post_key(year, txt_file)
+            with trace_posts(custom_id):
+                text, _ = load_post_text(txt_file)
+            if main.llm_cache is not None:
+                answer = main.llm_cache.get(PROMPT_TEMPLATE, text, model, TEMPERATURE)
+                if answer is not None:
+                    cached[custom_id] = answer
+                    continue
+            answer, _ = main.route_fast_path(text)
+            if answer is not None:
+                cached[custom_id] = answer
+                continue
+            with trace_posts(custom_id), trace("prompt"):
+                prompt = build_prompt(text)
+            request = {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": {
+                    "model": model,
+                    "messages": [{"role": "user", "content": prompt}],
+                    "temperature": TEMPERATURE,
+                },
+            }
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+            written += 1
+    return written, cached
+
+def submit_batch(client, batch_file=DEFAULT_BATCH_FILE):
+    """Upload a batch file and start the batch; returns the batch id"""
+    with open(batch_file, 'rb') as f:
+        uploaded = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=uploaded.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h",
+        metadata={"source": "GeoLLM"},
+    )
+    return batch.id
+
+def wait_for_batch(client, batch_id, poll_interval=30):
+    """Poll a batch until it reaches a final status"""
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        if counts is not None:
+            print(f"  Batch {batch_id}: {batch.status} "
+                  f"({counts.completed}/{counts.total} completed, {counts.failed} failed)")
+        else:
+            print(f"  Batch {batch_id}: {batch.status}")
+        if batch.status in FINAL_STATUSES:
+            return batch
+        time.sleep(poll_interval)
+
+def iter_batch_answers(client, file_id):
+    """Stream (custom_id, address, usage, error) tuples from a batch output file"""
+    with client.files.with_streaming_response.content(file_id) as response:
+        for line in response.iter_lines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            custom_id = record.get("custom_id")
+            result = record.get("response") or {}
+            body = result.get("body") or {}
+            if record.get("error") or result.get("status_code") != 200:
+                error = record.get("error") or body.get("error") or f"HTTP {result.get('status_code')}"
+                yield custom_id, None, {}, error
+                continue
+            address = body["choices"][0]["message"]["content"].strip()
+            yield custom_id, address, body.get("usage") or {}, None
+
+def save_answer(custom_id, address, base_dir="yearly_result"):
+    """Geocode one answer and write its coordinate file; returns True on success"""
+    year, txt_file, coordinate_file = parse_custom_id(custom_id, base_dir)
+    with trace_posts(custom_id):
+        if address.startswith("Error"):
+            # Not an address: record the failure without spending a geocoding request
+            response = address
+        else:
+            coordinates = get_coordinates_from_api(address)
+            response = format_result(address, coordinates)
+        saved = save_response(year, txt_file, coordinate_file, response)
+    if not saved:
+        print(f"  Error processing {custom_id}: {response}")
+        return False
+    print(f"  Saved: {year}-{os.path.basename(coordinate_file)}")
+    return True
+
+def run_batch(client, jobs, model="gpt-4.1-mini", base_dir="yearly_result",
+              batch_file=DEFAULT_BATCH_FILE, batch_id=None, poll_interval=30,
+              geo_workers=8, geo_rpm=3000):
+    """
+    Extract addresses for all pending jobs through the OpenAI Batch API, then
+    geocode the results into the usual _coordinate.loc files.
+    Pass batch_id to resume polling a batch submitted by an earlier run.
+    """
+    from pipeline import Stage
+
+    cached = {}
+    # The posts a resumed batch was built from were read by an earlier run
+    resumed = batch_id is not None
+    if batch_id is None:
+        written, cached = build_batch_file(jobs, model, batch_file)
+        print(f"Wrote {written} batch requests to {batch_file} ({len(cached)} answered from cache or local rules)")
+        if written:
+            batch_id = submit_batch(client, batch_file)
+            print(f"Submitted batch {batch_id}")
+
+    geo_stage = Stage("geocode", geo_workers, geo_rpm)
+    futures = []
+    total_errors = 0
+    try:
+        for custom_id, address in cached.items():
+            futures.append(geo_stage.submit(save_answer, custom_id, address, base_dir))
+
+        if batch_id is not None:
+            batch = wait_for_batch(client, batch_id, poll_interval)
+            if batch.output_file_id:
+                for custom_id, address, usage, error in iter_batch_answers(client, batch.output_file_id):
+                    if error:
+                        print(f"  Error processing {custom_id}: {error}")
+                        total_errors += 1
+                        continue
+                    if main.tracer is not None:
+                        main.tracer.record_usage(model, usage, keys=[custom_id], batch=True)
+                    if main.llm_cache is not None and "maaf" not in address.lower():
+                        _, txt_file, _ = parse_custom_id(custom_id, base_dir)
+                        text, _ = load_post_text(txt_file)
+                        if resumed:
+                            # Read now, not when the batch was built, so its hash is not the one the answer came from
+                            main.forget_input_version(txt_file)
+                        main.llm_cache.put(PROMPT_TEMPLATE, text, model, TEMPERATURE, address,
+                                           usage.get("total_tokens", 0))
+                    futures.append(geo_stage.submit(save_answer, custom_id, address, base_dir))
+            if batch.error_file_id:
+                for custom_id, _, _, error in iter_batch_answers(client, batch.error_file_id):
+                    print(f"  Error processing {custom_id}: {error}")
+                    total_errors += 1
+            if batch.status != "completed":
+                print(f"Batch {batch_id} ended with status {batch.status}")
+
+        total_processed = 0
+        for future in futures:
+            try:
+                if future.result():
+                    total_processed += 1
+                else:
+                    total_errors += 1
+            except Exception as e:
+                total_errors += 1
+                print(f"  Error saving batch result: {str(e)}")
+    finally:
+        geo_stage.shutdown()
+
+    return total_processed, total_errors
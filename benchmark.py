@@ -0,0 +1,306 @@
+"""
+Throughput benchmark against local stand-ins for the OpenAI and Geocoding APIs.
+
+    python benchmark.py --limit 200 --latency 0.3 --output bench.json
+    python benchmark.py --limit 200 --latency 0.3 --compare bench.json
+
+No API keys or network access are needed; results are written as JSON so runs
+can be compared for regressions.
+"""
+import os
+import io
+import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import tracemalloc
+import contextlib
+
+import main
+import transport
+import pipeline
+import packing
+from stub_servers import StubBehavior, start_openai_stub, start_geocode_stub
+
+MODES = ("sequential", "concurrent", "packed")
+
+def build_corpus(source_dir, target_dir, limit=None):
+    """Copy up to `limit` real posts (without results) into a fresh yearly_result tree"""
+    copied = 0
+    for year in range(2010, 2026):
+        pattern = os.path.join(source_dir, f"result_{year}", "output_banjir", "*.txt")
+        for txt_file in sorted(glob.glob(pattern)):
+            if limit is not None and copied >= limit:
+                return copied
+            folder = os.path.join(target_dir, f"result_{year}", "output_banjir")
+            os.makedirs(folder, exist_ok=True)
+            shutil.copy(txt_file, folder)
+            copied += 1
+    return copied
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+class StageTimer:
+    """Collects call latencies per stage while a benchmark run is in progress"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+
+    def add(self, stage, seconds):
+        with self.lock:
+            self.latencies.setdefault(stage, []).append(seconds)
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+    def summary(self, elapsed):
+        stages = {}
+        for stage, values in sorted(self.latencies.items()):
+            stages[stage] = {
+                "calls": len(values),
+                # Calls, not files: a packed LLM call covers many posts
+                "calls_per_second": round(len(values) / elapsed, 3) if elapsed else None,
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+            }
+        return stages
+
+@contextlib.contextmanager
+def instrumented(timer):
+    """
+    Time the read, LLM, geocoding and write stages. The LLM and geocoding stages
+    are measured around transport.call_with_retries, so retries and backoff count.
+    """
+    patches = []
+
+    def patch(module, name, stage):
+        original = getattr(module, name)
+        patches.append((module, name, original))
+        setattr(module, name, timer.wrap(stage, original))
+
+    original_call = transport.call_with_retries
+
+    def timed_call(fn, limiter=None, max_attempts=None):
+        stage = {id(transport.llm_limiter): "llm", id(transport.geo_limiter): "geocode"}.get(id(limiter), "other")
+        return timer.wrap(stage, original_call)(fn, limiter, max_attempts)
+
+    patches.append((transport, "call_with_retries", original_call))
+    transport.call_with_retries = timed_call
+    for module in (main, pipeline, packing):
+        patch(module, "load_post_text", "read")
+    for module in (main, pipeline):
+        patch(module, "save_response", "write")
+    try:
+        yield
+    finally:
+        for module, name, original in reversed(patches):
+            setattr(module, name, original)
+
+def run_mode(mode, client, base_dir, model, workers):
+    """Run one pipeline mode over base_dir; returns (processed, errors)"""
+    if mode == "sequential":
+        return main.run_sequential(client, base_dir, model)
+    jobs = main.find_pending_files(base_dir, verbose=False)
+    if mode == "concurrent":
+        return pipeline.run_concurrent(client, jobs, model, llm_workers=workers, llm_rpm=0,
+                                       geo_workers=workers, geo_rpm=0)
+    return packing.run_packed(client, jobs, model, llm_workers=workers, llm_rpm=0,
+                              geo_workers=workers, geo_rpm=0)
+
+def fresh_copy(corpus_dir, work_dir, mode):
+    """A new copy of the corpus for one run of a mode, so every run finds all posts pending"""
+    base_dir = os.path.join(work_dir, mode)
+    shutil.rmtree(base_dir, ignore_errors=True)
+    shutil.copytree(corpus_dir, base_dir)
+    return base_dir
+
+def measure_peak_memory(mode, client, corpus_dir, work_dir, model, workers, verbose=False):
+    """Peak traced Python memory of a separate, untimed run of a mode, in MB"""
+    base_dir = fresh_copy(corpus_dir, work_dir, mode)
+    output = sys.stdout if verbose else io.StringIO()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        with contextlib.redirect_stdout(output):
+            run_mode(mode, client, base_dir, model, workers)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / (1024 * 1024), 2)
+
+def benchmark_mode(mode, client, corpus_dir, work_dir, model, workers, verbose=False, memory=True):
+    """
+    Run one mode on a fresh copy of the corpus and return its measurements. tracemalloc
+    slows every allocation, so peak memory comes from a second run outside the timed one.
+    """
+    base_dir = fresh_copy(corpus_dir, work_dir, mode)
+    files = len(glob.glob(os.path.join(base_dir, "result_*", "output_banjir", "*.txt")))
+
+    transport.llm_limiter.configure(initial=workers, maximum=workers)
+    transport.geo_limiter.configure(initial=workers, maximum=workers)
+    timer = StageTimer()
+    output = sys.stdout if verbose else io.StringIO()
+
+    start = time.perf_counter()
+    with instrumented(timer), contextlib.redirect_stdout(output):
+        processed, errors = run_mode(mode, client, base_dir, model, workers)
+    elapsed = time.perf_counter() - start
+
+    peak_memory = None
+    if memory:
+        transport.llm_limiter.configure(initial=workers, maximum=workers)
+        transport.geo_limiter.configure(initial=workers, maximum=workers)
+        peak_memory = measure_peak_memory(mode, client, corpus_dir, work_dir, model, workers, verbose)
+
+    return {
+        "files": files,
+        "processed": processed,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "files_per_second": round(files / elapsed, 3) if elapsed else None,
+        "peak_memory_mb": peak_memory,
+        "stages": timer.summary(elapsed),
+    }
+
+def compare(previous, current, threshold=0.1):
+    """Print per-mode changes against a previous result file; returns the regressions"""
+    regressions = []
+    for mode, result in current["modes"].items():
+        before = previous.get("modes", {}).get(mode)
+        if not before:
+            continue
+        checks = [("files_per_second", before["files_per_second"], result["files_per_second"], True),
+                  ("peak_memory_mb", before["peak_memory_mb"], result["peak_memory_mb"], False)]
+        for stage, stats in result["stages"].items():
+            old = before.get("stages", {}).get(stage)
+            if old:
+                checks.append((f"{stage} p95_ms", old["p95_ms"], stats["p95_ms"], False))
+        for name, old, new, higher_is_better in checks:
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change < -threshold if higher_is_better else change > threshold
+            marker = "  REGRESSION" if worse else ""
+            print(f"  {mode:<10} {name:<22} {old:>10} -> {new:<10} ({change:+.1%}){marker}")
+            if worse:
+                regressions.append(f"{mode} {name}")
+    return regressions
+
+def print_results(results):
+    for mode, result in results["modes"].items():
+        memory = "" if result['peak_memory_mb'] is None else f", peak {result['peak_memory_mb']} MB"
+        print(f"{mode}: {result['files']} files in {result['seconds']}s "
+              f"({result['files_per_second']} files/s, {result['errors']} errors{memory})")
+        for stage, stats in result["stages"].items():
+            print(f"  {stage:<8} {stats['calls']:>6} calls  {stats['calls_per_second']:>9} calls/s  "
+                  f"p50 {stats['p50_ms']}ms  p95 {stats['p95_ms']}ms  p99 {stats['p99_ms']}ms")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark GeoLLM against local API stand-ins")
+    parser.add_argument('--base-dir', default="yearly_result", help="Source of real posts for the corpus")
+    parser.add_argument('--limit', type=int, default=200, help="Number of posts in the corpus")
+    parser.add_argument('--modes', default=",".join(MODES), help=f"Comma-separated list of {', '.join(MODES)}")
+    parser.add_argument('--model', default="gpt-4.1-mini", help="Model name sent to the stand-in")
+    parser.add_argument('--workers', type=int, default=8, help="Workers per stage for concurrent and packed modes")
+    parser.add_argument('--latency', type=float, default=0.2, help="Stand-in LLM response latency in seconds")
+    parser.add_argument('--geo-latency', type=float, default=0.05, help="Stand-in geocoding latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Random +/- seconds added to both latencies")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of 5xx responses")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Fraction of 429/OVER_QUERY_LIMIT responses")
+    parser.add_argument('--retry-after', type=float, default=0.1, help="Retry-After seconds sent with 429s")
+    parser.add_argument('--seed', type=int, default=1, help="Seed for the stand-ins' random failures")
+    parser.add_argument('--output', help="Write the JSON results to this file")
+    parser.add_argument('--compare', help="Previous JSON results to compare against")
+    parser.add_argument('--threshold', type=float, default=0.1, help="Relative change counted as a regression")
+    parser.add_argument('--no-memory', action='store_true',
+                        help="Skip the separate traced run of each mode that measures peak memory")
+    parser.add_argument('--verbose', action='store_true', help="Show the pipeline's own output")
+    return parser.parse_args(argv)
+
+def run(argv=None):
+    args = parse_args(argv)
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        sys.exit(f"Unknown modes: {', '.join(sorted(unknown))}")
+
+    def behavior(latency):
+        return StubBehavior(latency, args.jitter, args.error_rate, args.throttle_rate,
+                            args.retry_after, args.seed)
+
+    llm_behavior = behavior(args.latency)
+    geo_behavior = behavior(args.geo_latency)
+    openai_server, openai_url = start_openai_stub(behavior=llm_behavior)
+    geo_server, geo_url = start_geocode_stub(behavior=geo_behavior)
+
+    # Measure the pipeline itself: no caches, gazetteer, store or dead-letter file
+    main.geocode_cache = main.llm_cache = main.gazetteer = None
+    main.result_store = main.input_manifest = main.dead_letters = None
+    main.GEOCODE_URL = geo_url
+    os.environ.setdefault("GOOGLE_MAPS_API_KEY", "stub")
+    transport.BACKOFF_BASE = 0.05
+    client = main.OpenAI(api_key="stub", base_url=openai_url, max_retries=0)
+
+    work_dir = tempfile.mkdtemp(prefix="geollm-bench-")
+    try:
+        corpus_dir = os.path.join(work_dir, "corpus")
+        files = build_corpus(args.base_dir, corpus_dir, args.limit)
+        if not files:
+            sys.exit(f"No posts found under {args.base_dir}")
+        print(f"Benchmarking {files} posts (LLM latency {args.latency}s, geocoding latency "
+              f"{args.geo_latency}s, error rate {args.error_rate}, throttle rate {args.throttle_rate})")
+
+        results = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "settings": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "verbose")},
+            "modes": {},
+        }
+        for mode in modes:
+            print(f"Running {mode}...")
+            results["modes"][mode] = benchmark_mode(mode, client, corpus_dir, work_dir,
+                                                    args.model, args.workers, args.verbose,
+                                                    memory=not args.no_memory)
+        results["stub_requests"] = {"llm": llm_behavior.stats(), "geocode": geo_behavior.stats()}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        openai_server.shutdown()
+        geo_server.shutdown()
+
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        print(f"Compared with {args.compare}:")
+        regressions = compare(previous, results, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressions above {args.threshold:.0%}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,162 @@
+"""
+Model cascade: ask a cheap model first, check its answer automatically and
+send only the posts it got wrong to stronger models in the same run.
+
+    python main.py --cascade gpt-4.1-nano,gpt-4.1-mini,gpt-4.1
+"""
+import re
+import time
+import threading
+from collections import Counter
+
+from main import NO_COORDINATES, extract_address, get_coordinates_from_api
+from telemetry import estimate_cost, usage_tokens
+
+# (south, west, north, east) bounds of Indonesia
+INDONESIA_BOUNDS = (-11.2, 94.7, 6.3, 141.1)
+
+# Phrases of answers that give up instead of naming a place
+APOLOGIES = ("maaf", "tidak dapat", "tidak ada", "tidak ditemukan", "tidak disebutkan",
+             "tidak diketahui", "sorry", "unable")
+
+MAX_ADDRESS_LENGTH = 200
+
+def check_address(address):
+    """Reason an extracted address is unusable, or None when it looks right"""
+    if address.startswith("Error"):
+        return "error"
+    lowered = address.lower()
+    if any(phrase in lowered for phrase in APOLOGIES):
+        return "apology"
+    # The prompt asks for one %20-joined line ending in Indonesia
+    if (not address or "\n" in address or " " in address or len(address) > MAX_ADDRESS_LENGTH
+            or not lowered.endswith("indonesia")):
+        return "format"
+    return None
+
+def check_coordinates(coordinates):
+    """Reason geocoded coordinates are unusable, or None when they fall inside Indonesia"""
+    if coordinates.startswith("Error"):
+        # Only "no results" says the address was wrong; quota, network or key failures do not
+        return "no_coordinates" if coordinates == NO_COORDINATES else "geocode_error"
+    match = re.match(r"^\s*(-?\d+(?:\.\d+)?),\s*(-?\d+(?:\.\d+)?)\s*$", coordinates)
+    if match is None:
+        return "no_coordinates"
+    lat, lon = float(match.group(1)), float(match.group(2))
+    south, west, north, east = INDONESIA_BOUNDS
+    if not (south <= lat <= north and west <= lon <= east):
+        return "outside_indonesia"
+    return None
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+class TierStats:
+    """Attempts, outcomes, latency and token spend of one cascade tier"""
+
+    def __init__(self, model):
+        self.model = model
+        self.attempts = 0
+        self.accepted = 0
+        self.failures = Counter()
+        self.latencies = []
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    @property
+    def cost(self):
+        return estimate_cost(self.model, self.prompt_tokens, self.completion_tokens)
+
+    def summary(self):
+        rate = self.accepted / self.attempts if self.attempts else 0.0
+        cost = self.cost
+        cost_text = "unknown price" if cost is None else f"${cost:.4f}"
+        if cost is not None and self.accepted:
+            cost_text += f" (${cost / self.accepted:.5f} per accepted post)"
+        reasons = ", ".join(f"{reason} {count}" for reason, count in self.failures.most_common())
+        return (f"  {self.model}: {self.accepted}/{self.attempts} accepted ({rate:.1%}), "
+                f"latency p50 {percentile(self.latencies, 50):.2f}s p95 {percentile(self.latencies, 95):.2f}s, "
+                f"{self.prompt_tokens + self.completion_tokens} tokens, {cost_text}"
+                + (f"; rejected: {reasons}" if reasons else ""))
+
+class ModelCascade:
+    """
+    Try models from cheapest to strongest. Each answer is validated (no apology,
+    requested address format, geocodes inside Indonesia) and failures escalate
+    to the next model. The last model's answer is kept even when it fails, as
+    a single-model run would. A geocoding failure is not the model's fault, so it
+    ends the cascade with the error, which sends the post to the dead-letter queue.
+    Answers from the fast path count toward the first tier.
+    """
+
+    def __init__(self, models):
+        if not models:
+            raise ValueError("A cascade needs at least one model")
+        self.models = list(models)
+        self.tiers = [TierStats(model) for model in self.models]
+        self.lock = threading.Lock()
+        self.posts = 0
+        self.unresolved = 0
+        self.geocode_errors = 0
+
+    def resolve(self, client, text):
+        """(address, coordinates) for a post, escalating through the models as needed"""
+        for position, tier in enumerate(self.tiers):
+            usage = []
+            start = time.perf_counter()
+            address = extract_address(client, text, tier.model, on_usage=usage.append,
+                                      use_fast_path=position == 0)
+            reason = check_address(address)
+            coordinates = None
+            # An LLM error is never geocoded; it is returned as is and recorded as a failure
+            if reason is None or (position == len(self.tiers) - 1 and reason != "error"):
+                coordinates = get_coordinates_from_api(address)
+                if reason is None:
+                    reason = check_coordinates(coordinates)
+            elapsed = time.perf_counter() - start
+            final = position == len(self.tiers) - 1 or reason == "geocode_error"
+
+            with self.lock:
+                tier.attempts += 1
+                tier.latencies.append(elapsed)
+                for call in usage:
+                    prompt_tokens, completion_tokens = usage_tokens(call)
+                    tier.prompt_tokens += prompt_tokens
+                    tier.completion_tokens += completion_tokens
+                if reason is None:
+                    tier.accepted += 1
+                else:
+                    tier.failures[reason] += 1
+                if position == 0:
+                    self.posts += 1
+                if reason == "geocode_error":
+                    self.geocode_errors += 1
+                elif reason is not None and final:
+                    self.unresolved += 1
+
+            if reason is None or final:
+                return address, coordinates
+            if position < len(self.tiers) - 1:
+                print(f"  Cascade: {tier.model} answer rejected ({reason}), escalating to "
+                      f"{self.tiers[position + 1].model}")
+        return address, coordinates
+
+    def summary(self):
+        lines = [f"Cascade: {self.posts} posts, {self.posts - self.unresolved - self.geocode_errors} validated, "
+                 f"{self.unresolved} kept unvalidated from {self.models[-1]}, "
+                 f"{self.geocode_errors} geocoding failures (not escalated)"]
+        lines.extend(tier.summary() for tier in self.tiers)
+        costs = [tier.cost for tier in self.tiers]
+        if self.posts and None not in costs:
+            total = sum(costs)
+            lines.append(f"  Total ${total:.4f} (${total / self.posts:.5f} per post)")
+            # What the same posts would have cost on the strongest model alone, at its observed tokens per call
+            strongest = self.tiers[-1]
+            if strongest.attempts:
+                per_call = (strongest.prompt_tokens / strongest.attempts, strongest.completion_tokens / strongest.attempts)
+                single = estimate_cost(strongest.model, per_call[0] * self.posts, per_call[1] * self.posts)
+                lines.append(f"  {strongest.model} alone: ~${single:.4f}")
+        return "\n".join(lines)
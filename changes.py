@@ -0,0 +1,158 @@
+import os
+import re
+import glob
+import time
+import hashlib
+import argparse
+import sqlite3
+import threading
+
+def file_hash(path):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def content_hash(data):
+    """SHA-256 of bytes already read, matching file_hash of the same contents"""
+    return hashlib.sha256(data).hexdigest()
+
+class InputManifest:
+    """
+    Records the content hash of every input that produced a result, so edited
+    posts can be detected and reprocessed. Size and mtime are checked first so
+    unchanged files are never re-hashed.
+    """
+
+    def __init__(self, path="input_manifest.sqlite", conn=None, lock=None):
+        self.path = path
+        self.lock = lock or threading.RLock()
+        self.conn = conn or sqlite3.connect(path, check_same_thread=False)
+        self.owns_conn = conn is None
+        with self.lock:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS manifest ("
+                " path TEXT PRIMARY KEY,"
+                " year INTEGER NOT NULL,"
+                " post_id TEXT NOT NULL,"
+                " size INTEGER,"
+                " mtime REAL,"
+                " processed_at REAL NOT NULL,"
+                " input_hash TEXT)"
+            )
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(manifest)")}
+            if "input_hash" not in columns:
+                # Manifests created before content hashing was added
+                self.conn.execute("ALTER TABLE manifest ADD COLUMN input_hash TEXT")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS manifest_post ON manifest (year, post_id)")
+            self.conn.commit()
+
+    def record(self, txt_file, year, post_id, now=None, commit=True, version=None):
+        """
+        Remember the input a result was extracted from. version is the (size, mtime,
+        hash) captured when the post was read; without it the file is stat'ed and
+        hashed now, which is only right for results adopted from earlier runs.
+        """
+        if version is not None:
+            size, mtime, input_hash = version
+        else:
+            try:
+                stat = os.stat(txt_file)
+                size, mtime = stat.st_size, stat.st_mtime
+                input_hash = file_hash(txt_file)
+            except OSError:
+                size = mtime = input_hash = None
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO manifest"
+                " (path, year, post_id, size, mtime, processed_at, input_hash)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (os.path.normpath(txt_file), year, str(post_id), size, mtime,
+                 now or time.time(), input_hash),
+            )
+            if commit:
+                self.conn.commit()
+
+    def is_changed(self, txt_file, year=None, post_id=None):
+        """
+        True when an input differs from the version that produced its result.
+        An input without an entry is adopted as it is now (recorded when year and
+        post_id are given) and reported unchanged, so results written before
+        tracking started are never replaced.
+        """
+        path = os.path.normpath(txt_file)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT size, mtime, input_hash FROM manifest WHERE path = ?", (path,)
+            ).fetchone()
+        if row is None:
+            if year is not None:
+                self.record(txt_file, year, post_id)
+            return False
+        try:
+            stat = os.stat(txt_file)
+        except OSError:
+            # Served from a --dump (or removed): there is no file to compare
+            return False
+        if stat.st_size == row[0] and stat.st_mtime == row[1]:
+            return False
+        if row[2] is None:
+            return True
+        if file_hash(txt_file) != row[2]:
+            return True
+        # Touched but identical: refresh the stat so it is not hashed again
+        with self.lock:
+            self.conn.execute(
+                "UPDATE manifest SET size = ?, mtime = ? WHERE path = ?",
+                (stat.st_size, stat.st_mtime, path),
+            )
+            self.conn.commit()
+        return False
+
+    def is_recorded(self, txt_file):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM manifest WHERE path = ? AND input_hash IS NOT NULL",
+                (os.path.normpath(txt_file),),
+            ).fetchone()
+        return row is not None
+
+    def close(self):
+        if self.owns_conn:
+            with self.lock:
+                self.conn.close()
+
+    def adopt(self, base_dir="yearly_result"):
+        """Record the current version of every input that already has a _coordinate.loc; returns the count"""
+        pattern = os.path.join(base_dir, "result_*", "output_banjir", "*_coordinate.loc")
+        adopted = 0
+        now = time.time()
+        for coord_file in glob.glob(pattern):
+            txt_file = coord_file[:-len("_coordinate.loc")] + ".txt"
+            if not os.path.exists(txt_file) or self.is_recorded(txt_file):
+                continue
+            match = re.search(r"result_(\d{4})", coord_file.replace('\\', '/'))
+            if match is None:
+                continue
+            year = int(match.group(1))
+            post_id = os.path.splitext(os.path.basename(txt_file))[0]
+            self.record(txt_file, year, post_id, now, commit=False)
+            adopted += 1
+        with self.lock:
+            self.conn.commit()
+        return adopted
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the input manifest used to reprocess edited posts")
+    parser.add_argument('command', choices=["adopt"],
+                        help="adopt: accept existing results as current, so they are not reprocessed")
+    parser.add_argument('--manifest', default=os.getenv('INPUT_MANIFEST', "input_manifest.sqlite"),
+                        help="Input hash manifest")
+    parser.add_argument('--base-dir', default="yearly_result", help="Directory holding result_<year> folders")
+    args = parser.parse_args()
+
+    manifest = InputManifest(args.manifest)
+    print(f"Adopted {manifest.adopt(args.base_dir)} existing results into {args.manifest}")
+    manifest.close()
@@ -0,0 +1,321 @@
+"""
+Shared work queue so several processes or machines can run the backfill together.
+
+    python main.py --queue /shared/work_queue.sqlite --shard 0/2     # machine A
+    python main.py --queue /shared/work_queue.sqlite --shard 1/2     # machine B
+    python coordinator.py status --queue /shared/work_queue.sqlite
+"""
+import os
+import time
+import socket
+import sqlite3
+import zlib
+import argparse
+import threading
+
+DEFAULT_QUEUE = "work_queue.sqlite"
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def parse_shard(value):
+    """Parse "K/N" into (K, N)"""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except (AttributeError, ValueError):
+        raise ValueError(f"Shard must look like K/N, got {value!r}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard {value} is out of range")
+    return index, count
+
+class Coordinator:
+    """
+    SQLite job table with leases: a worker claims jobs atomically, renews its
+    leases with heartbeats while it works, and marks each job done or failed.
+    Leases of a worker that stopped heartbeating expire and are claimed again.
+    The database uses rollback journaling rather than WAL so it can live on a
+    shared volume that several machines mount.
+
+    Work is split between workers by shard=(K, N): a job belongs to shard K when
+    its year (shard_by="year") or the CRC32 of its post key (shard_by="hash")
+    is K modulo N.
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE, worker_id=None, lease_seconds=300, shard=(0, 1),
+                 shard_by="hash", max_attempts=3):
+        self.path = path
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.shard = shard
+        self.shard_by = shard_by
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " key TEXT PRIMARY KEY,"
+            " year INTEGER NOT NULL,"
+            " txt_file TEXT NOT NULL,"
+            " coordinate_file TEXT NOT NULL,"
+            " shard_hash INTEGER NOT NULL,"
+            " status TEXT NOT NULL,"
+            " owner TEXT,"
+            " lease_expires REAL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " error TEXT,"
+            " updated_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_expires)")
+
+    def transaction(self, fn):
+        """Run fn(conn) inside BEGIN IMMEDIATE so claims from other processes serialize"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self.conn)
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    def enqueue(self, jobs, scanned_at=None, missing=()):
+        """
+        Add (year, txt_file, coordinate_file) jobs. Jobs already in the queue are
+        left alone: a done job stays done whatever the caller's own view of the
+        post is. Only done/failed jobs whose keys are in missing and that were last
+        touched before scanned_at are reopened, because their result has since
+        been removed (e.g. a "maaf" deleted by recheck.py).
+        """
+        scanned_at = scanned_at or time.time()
+        now = time.time()
+
+        def insert(conn):
+            added = 0
+            for year, txt_file, coordinate_file in jobs:
+                key = f"{year}-{os.path.splitext(os.path.basename(txt_file))[0]}"
+                cursor = conn.execute(
+                    "INSERT INTO jobs (key, year, txt_file, coordinate_file, shard_hash, status, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, 'pending', ?)"
+                    " ON CONFLICT(key) DO UPDATE SET status = 'pending', attempts = 0, error = NULL,"
+                    " owner = NULL, lease_expires = NULL, updated_at = excluded.updated_at"
+                    " WHERE jobs.status IN ('done', 'failed') AND jobs.updated_at < ? AND ?",
+                    (key, year, txt_file, coordinate_file, zlib.crc32(key.encode("utf-8")), now, scanned_at,
+                     key in missing),
+                )
+                added += cursor.rowcount
+            return added
+
+        return self.transaction(insert)
+
+    def shard_filter(self):
+        """SQL condition and parameters selecting this worker's shard"""
+        index, count = self.shard
+        column = "year" if self.shard_by == "year" else "shard_hash"
+        return f"{column} % ? = ?", (count, index)
+
+    def claim(self, limit=16):
+        """Lease up to limit pending (or expired) jobs in this worker's shard"""
+        now = time.time()
+
+        shard, shard_params = self.shard_filter()
+
+        def take(conn):
+            rows = conn.execute(
+                "SELECT key, year, txt_file, coordinate_file FROM jobs"
+                f" WHERE (status = 'pending' OR (status = 'leased' AND lease_expires < ?)) AND {shard}"
+                " ORDER BY year, key LIMIT ?",
+                (now, *shard_params, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET status = 'leased', owner = ?, lease_expires = ?, updated_at = ? WHERE key = ?",
+                [(self.worker_id, now + self.lease_seconds, now, row[0]) for row in rows],
+            )
+            return [(year, txt_file, coordinate_file) for _, year, txt_file, coordinate_file in rows]
+
+        return self.transaction(take)
+
+    def heartbeat(self):
+        """Extend the leases this worker holds; returns how many were renewed"""
+        now = time.time()
+        return self.transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET lease_expires = ? WHERE owner = ? AND status = 'leased'",
+            (now + self.lease_seconds, self.worker_id),
+        ).rowcount)
+
+    def complete(self, job, ok, error=None):
+        """
+        Mark a claimed job done, or return it to the queue (failed after
+        max_attempts). Returns False when the lease had already passed to another worker.
+        """
+        year, txt_file, _ = job
+        key = f"{year}-{os.path.splitext(os.path.basename(txt_file))[0]}"
+        now = time.time()
+
+        def finish(conn):
+            row = conn.execute("SELECT owner, attempts FROM jobs WHERE key = ?", (key,)).fetchone()
+            if row is None or row[0] != self.worker_id:
+                return False
+            attempts = row[1] + (0 if ok else 1)
+            if ok:
+                status = "done"
+            elif attempts >= self.max_attempts:
+                status = "failed"
+            else:
+                status = "pending"
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, error = ?, owner = ?, lease_expires = NULL,"
+                " updated_at = ? WHERE key = ?",
+                (status, attempts, error, self.worker_id if ok else None, now, key),
+            )
+            return True
+
+        return self.transaction(finish)
+
+    def release(self):
+        """Hand this worker's unfinished leases back to the queue"""
+        return self.transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET status = 'pending', owner = NULL, lease_expires = NULL"
+            " WHERE owner = ? AND status = 'leased'",
+            (self.worker_id,),
+        ).rowcount)
+
+    def outstanding(self):
+        """Jobs in this worker's shard that are pending or leased by anyone"""
+        shard, shard_params = self.shard_filter()
+        with self.lock:
+            return self.conn.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'leased') AND {shard}", shard_params
+            ).fetchone()[0]
+
+    def progress(self):
+        """Queue totals: {"status": {...}, "years": {year: {status: n}}, "workers": {owner: {...}}}"""
+        now = time.time()
+        with self.lock:
+            by_status = self.conn.execute(
+                "SELECT year, status, COUNT(*) FROM jobs GROUP BY year, status"
+            ).fetchall()
+            by_owner = self.conn.execute(
+                "SELECT owner, status, COUNT(*), MAX(updated_at) FROM jobs"
+                " WHERE owner IS NOT NULL AND (status = 'done' OR lease_expires >= ?)"
+                " GROUP BY owner, status",
+                (now,),
+            ).fetchall()
+            expired = self.conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'leased' AND lease_expires < ?", (now,)
+            ).fetchone()[0]
+        totals = {}
+        years = {}
+        for year, status, count in by_status:
+            totals[status] = totals.get(status, 0) + count
+            years.setdefault(year, {})[status] = count
+        workers = {}
+        for owner, status, count, last in by_owner:
+            entry = workers.setdefault(owner, {"done": 0, "leased": 0, "last_update": 0.0})
+            entry[status] = count
+            entry["last_update"] = max(entry["last_update"], last)
+        return {"status": totals, "years": years, "workers": workers, "expired_leases": expired}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def format_progress(progress):
+    totals = progress["status"]
+    total = sum(totals.values())
+    done = totals.get("done", 0)
+    lines = [f"Queue: {done}/{total} done ({done / total:.1%})" if total else "Queue: empty",
+             "  " + ", ".join(f"{status} {count}" for status, count in sorted(totals.items()))]
+    if progress["expired_leases"]:
+        lines.append(f"  {progress['expired_leases']} expired leases waiting to be reclaimed")
+    for year in sorted(progress["years"]):
+        counts = progress["years"][year]
+        lines.append(f"  {year}: " + ", ".join(f"{status} {count}" for status, count in sorted(counts.items())))
+    for owner, entry in sorted(progress["workers"].items()):
+        age = time.time() - entry["last_update"]
+        lines.append(f"  worker {owner}: {entry['done']} done, {entry['leased']} leased, "
+                     f"last update {age:.0f}s ago")
+    return "\n".join(lines)
+
+def has_result(year, txt_file, coordinate_file):
+    """Whether a post's result exists, in the result store or as its .loc file"""
+    import main
+    if main.result_store is not None:
+        return main.result_store.is_processed(year, os.path.splitext(os.path.basename(txt_file))[0])
+    return os.path.exists(coordinate_file)
+
+def run_worker(client, coordinator, base_dir="yearly_result", model="gpt-4.1-mini", claim_size=16,
+               idle_wait=30, llm_workers=8, llm_rpm=500, geo_workers=8, geo_rpm=3000):
+    """
+    Enqueue pending posts, then claim and process leased batches until this
+    shard has nothing left. Leases are renewed from a heartbeat thread, and a
+    job counts as done once its result exists. Returns (processed, errors).
+    """
+    from main import find_pending_files, is_done
+    from pipeline import run_concurrent
+
+    scanned_at = time.time()
+    pending = find_pending_files(base_dir, verbose=False)
+    # This worker's change manifest is local, so only a missing result reopens a done job
+    missing = {f"{year}-{os.path.splitext(os.path.basename(txt_file))[0]}"
+               for year, txt_file, coordinate_file in pending
+               if not has_result(year, txt_file, coordinate_file)}
+    added = coordinator.enqueue(pending, scanned_at, missing)
+    print(f"Worker {coordinator.worker_id} (shard {coordinator.shard[0]}/{coordinator.shard[1]}): "
+          f"{added} new jobs queued in {coordinator.path}")
+
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(max(1.0, coordinator.lease_seconds / 3)):
+            try:
+                coordinator.heartbeat()
+            except sqlite3.Error as e:
+                print(f"  Heartbeat failed: {str(e)}")
+
+    heartbeat = threading.Thread(target=beat, name="lease-heartbeat", daemon=True)
+    heartbeat.start()
+
+    total_processed = 0
+    total_errors = 0
+    try:
+        while True:
+            jobs = coordinator.claim(claim_size)
+            if not jobs:
+                if not coordinator.outstanding():
+                    break
+                # Other workers hold the rest; wait in case one of them dies and its leases expire
+                time.sleep(min(idle_wait, coordinator.lease_seconds))
+                continue
+            run_concurrent(client, jobs, model, llm_workers=llm_workers, llm_rpm=llm_rpm,
+                           geo_workers=geo_workers, geo_rpm=geo_rpm)
+            for job in jobs:
+                ok = is_done(*job)
+                if not coordinator.complete(job, ok, None if ok else "No result written"):
+                    print(f"  Lease on {job[0]}-{os.path.basename(job[1])} was lost to another worker")
+                if ok:
+                    total_processed += 1
+                else:
+                    total_errors += 1
+            print(format_progress(coordinator.progress()).splitlines()[0])
+    finally:
+        stop.set()
+        coordinator.release()
+
+    return total_processed, total_errors
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the shared GeoLLM work queue")
+    parser.add_argument('command', choices=["status", "release-expired"])
+    parser.add_argument('--queue', default=DEFAULT_QUEUE, help="Work queue SQLite file")
+    args = parser.parse_args()
+
+    coordinator = Coordinator(args.queue, worker_id="admin")
+    if args.command == "release-expired":
+        released = coordinator.transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET status = 'pending', owner = NULL, lease_expires = NULL"
+            " WHERE status = 'leased' AND lease_expires < ?", (time.time(),)).rowcount)
+        print(f"Released {released} expired leases")
+    print(format_progress(coordinator.progress()))
+    coordinator.close()
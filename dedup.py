@@ -0,0 +1,208 @@
+import os
+import re
+import glob
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import main
+from main import coordinate_path, format_result, post_key, read_text_file, save_response
+from result_store import parse_coordinate_file
+from text_cleaner import clean_post_text
+
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+# Permutations are (a * x + b) mod PRIME with a kept below 2**32 so products fit in uint64
+PRIME = 4294967311
+
+def post_body(txt_file):
+    """Cleaned post text without comments, which differ between reposts of the same story"""
+    return clean_post_text(read_text_file(txt_file), keep_comments=False)
+
+def shingles(text, size=SHINGLE_WORDS):
+    """Set of overlapping word n-grams of a text"""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def choose_bands(num_perm, threshold):
+    """
+    (bands, rows) for LSH banding: the most rows per band whose collision
+    threshold (1/bands)**(1/rows) stays at or below the similarity threshold,
+    so likely duplicates are candidates and exact checks remove the rest.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if (1.0 / bands) ** (1.0 / rows) <= threshold:
+            best = (bands, rows)
+    return best
+
+class MinHasher:
+    """MinHash signatures over 32-bit shingle hashes, computed for all permutations at once"""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 2 ** 32 - 1, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, PRIME, num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, shingle_set):
+        if not shingle_set:
+            return None
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingle_set),
+                             dtype=np.uint64, count=len(shingle_set))
+        return ((hashes[:, None] * self.a + self.b) % PRIME).min(axis=0)
+
+def cluster_signatures(signatures, threshold=0.8, num_perm=NUM_PERM):
+    """
+    Group near-duplicate signatures with LSH banding; candidate pairs are kept
+    when their estimated Jaccard similarity reaches threshold. Returns a list
+    of clusters (lists of positions), singletons included.
+    """
+    parent = list(range(len(signatures)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    bands, rows = choose_bands(num_perm, threshold)
+    for band in range(bands):
+        buckets = {}
+        for i, signature in enumerate(signatures):
+            if signature is not None:
+                key = signature[band * rows:(band + 1) * rows].tobytes()
+                buckets.setdefault(key, []).append(i)
+        for members in buckets.values():
+            first = members[0]
+            for other in members[1:]:
+                root_a, root_b = find(first), find(other)
+                if root_a == root_b:
+                    continue
+                if np.mean(signatures[first] == signatures[other]) >= threshold:
+                    parent[root_b] = root_a
+
+    clusters = {}
+    for i in range(len(signatures)):
+        clusters.setdefault(find(i), []).append(i)
+    return list(clusters.values())
+
+def post_sort_key(year, txt_file):
+    post_id = os.path.splitext(os.path.basename(txt_file))[0]
+    return (year, int(post_id) if post_id.isdigit() else 0, post_id)
+
+def stored_response(year, txt_file, coordinate_file):
+    """Address and Coordinates of a post's existing result, or None"""
+    if main.result_store is not None:
+        row = main.result_store.get(year, os.path.splitext(os.path.basename(txt_file))[0])
+        if row is None or row["lat"] is None:
+            return None
+        return format_result(row["address"], f"{row['lat']}, {row['lon']}")
+    try:
+        with open(coordinate_file, 'r', encoding='utf-8') as f:
+            parsed = parse_coordinate_file(f.read())
+    except OSError:
+        return None
+    if parsed["address"] is None or parsed["lat"] is None:
+        return None
+    return format_result(parsed["address"], parsed["coordinates"])
+
+class DedupPlan:
+    """
+    Pending jobs split into one representative per cluster of near-duplicates.
+    followers maps a representative's post key to the jobs that copy its result;
+    reused lists (job, source job) pairs answered by an earlier duplicate's result.
+    """
+
+    def __init__(self, pending):
+        self.pending = pending
+        self.representatives = []
+        self.followers = {}
+        self.reused = []
+        self.clusters = 0
+
+    def summary(self):
+        skipped = len(self.pending) - len(self.representatives)
+        share = skipped / len(self.pending) if self.pending else 0.0
+        return (f"Dedup: {len(self.pending)} pending posts in {self.clusters} clusters; "
+                f"{len(self.representatives)} LLM calls instead of {len(self.pending)} "
+                f"({skipped} LLM and geocoding calls skipped, {share:.1%}), "
+                f"{len(self.reused)} answered from earlier duplicates")
+
+def deduplicate(jobs, base_dir="yearly_result", threshold=0.8, workers=8):
+    """
+    Cluster every post under base_dir by MinHash/LSH and plan the pending jobs:
+    a cluster with an existing result reuses it, otherwise its earliest pending
+    post is sent to the LLM and the result is copied to the rest.
+    """
+    pending = {job[1]: job for job in jobs}
+    posts = []
+    for year in range(2010, 2026):
+        pattern = os.path.join(base_dir, f"result_{year}", "output_banjir", "*.txt")
+        for txt_file in glob.glob(pattern):
+            posts.append((year, txt_file))
+    seen = {txt_file for _, txt_file in posts}
+    posts.extend((year, txt_file) for year, txt_file, _ in jobs if txt_file not in seen)
+
+    hasher = MinHasher()
+
+    def sign(post):
+        try:
+            return hasher.signature(shingles(post_body(post[1])))
+        except OSError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        signatures = list(executor.map(sign, posts))
+
+    plan = DedupPlan(jobs)
+    clusters = cluster_signatures(signatures, threshold, hasher.num_perm)
+    for cluster in clusters:
+        members = sorted((posts[i] for i in cluster), key=lambda post: post_sort_key(*post))
+        waiting = [pending[txt_file] for _, txt_file in members if txt_file in pending]
+        if not waiting:
+            continue
+        plan.clusters += 1
+        source = None
+        for year, txt_file in members:
+            if txt_file not in pending and stored_response(year, txt_file, coordinate_path(txt_file)):
+                source = (year, txt_file, coordinate_path(txt_file))
+                break
+        if source is not None:
+            plan.reused.extend((job, source) for job in waiting)
+            continue
+        representative = waiting[0]
+        plan.representatives.append(representative)
+        if len(waiting) > 1:
+            plan.followers[post_key(representative[0], representative[1])] = waiting[1:]
+    return plan
+
+def fan_out(plan):
+    """
+    Copy each representative's result (and each reused earlier result) to the
+    rest of its cluster. Returns (processed, errors); followers of a failed
+    representative stay pending for the next run.
+    """
+    processed = 0
+    errors = 0
+    copies = list(plan.reused)
+    for representative in plan.representatives:
+        for job in plan.followers.get(post_key(representative[0], representative[1]), []):
+            copies.append((job, representative))
+    for (year, txt_file, coordinate_file), source in copies:
+        response = stored_response(*source)
+        if response is None:
+            errors += 1
+            continue
+        if save_response(year, txt_file, coordinate_file, response):
+            processed += 1
+            print(f"  Copied: {post_key(*source[:2])} -> {year}-{os.path.basename(coordinate_file)}")
+        else:
+            errors += 1
+    return processed, errors
@@ -0,0 +1,461 @@
+"""
+Read posts straight from one large JSONL dump instead of per-post .txt files.
+
+Each line is a JSON object with "year", "id" and either "text" (the post in the
+same layout as the .txt files) or "post_link", "date" and "content". Dumps may
+be gzip-compressed (.gz).
+
+    python dump.py index posts.jsonl.gz
+    python dump.py get posts.jsonl 2013-17
+    python dump.py list posts.jsonl --from 1048576 --limit 5
+    python dump.py repack scraped.jsonl.gz posts.jsonl.gz   # gzip restart points that survive restarts
+    python main.py --dump posts.jsonl --store results.sqlite --concurrent
+"""
+import os
+import re
+import gzip
+import json
+import mmap
+import zlib
+import bisect
+import argparse
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Uncompressed bytes between gzip restart points; a random read decompresses at most this much
+CHECKPOINT_BYTES = 4 * 1024 * 1024
+READ_CHUNK = 256 * 1024
+# Decompressed gzip segments kept for reads that land close together
+SEGMENT_CACHE = 8
+
+INDEX_VERSION = 2
+# zlib window bits for reading gzip headers
+GZIP_WBITS = zlib.MAX_WBITS | 16
+
+def record_text(record):
+    """Post text of a dump record in the .txt layout (POST LINK / DATE header, blank line, content)"""
+    if record.get("text") is not None:
+        return record["text"]
+    return (f"POST LINK: {record.get('post_link') or ''}\n"
+            f"DATE: {record.get('date') or ''}\n\n"
+            f"{record.get('content') or ''}")
+
+def record_key(record):
+    """(year, post id) of a dump record; raises ValueError when either is missing"""
+    try:
+        return int(record["year"]), str(record["id"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Dump records need a year and an id")
+
+def split_post_path(txt_file):
+    """(year, post id) of a yearly_result/result_<year>/output_banjir/<id>.txt path, or None"""
+    match = re.search(r"result_(\d{4})[\\/]output_banjir[\\/]([^\\/]+)\.txt$", txt_file)
+    if match is None:
+        return None
+    return int(match.group(1)), match.group(2)
+
+class MappedFile:
+    """Random reads from an uncompressed dump through mmap"""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+
+    def read(self, offset, length):
+        return self.map[offset:offset + length]
+
+    def lines(self, start=0):
+        """(offset, line bytes) from start to the end of the file"""
+        position = start
+        while position < self.size:
+            end = self.map.find(b"\n", position)
+            if end == -1:
+                end = self.size
+            yield position, self.map[position:end]
+            position = end + 1
+
+    def close(self):
+        if self.size:
+            self.map.close()
+        self.file.close()
+
+class GzipFile:
+    """
+    Random reads from a gzip dump. A read restarts from the checkpoint before
+    its offset, so it never decompresses from the start, and recently decoded
+    segments are cached. Gzip member starts are restart points that need no
+    state, so they are saved with the index; inside a long member the
+    decompressor state is copied every CHECKPOINT_BYTES, which only lasts as
+    long as the process.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        # (uncompressed offset, compressed offset, decompressor or None at a member start) restart points
+        self.checkpoints = None
+        self.size = None
+        self.cache = OrderedDict()
+
+    def stream(self, start=0, checkpoint=False):
+        """Decompressed (uncompressed offset, chunk) pairs from start, optionally recording checkpoints"""
+        upos, cpos, decompressor = 0, 0, zlib.decompressobj(GZIP_WBITS)
+        if checkpoint:
+            checkpoints = [(0, 0, None)]
+        elif start and self.checkpoints is not None:
+            index = bisect.bisect_right([point[0] for point in self.checkpoints], start) - 1
+            upos, cpos, state = self.checkpoints[index]
+            decompressor = zlib.decompressobj(GZIP_WBITS) if state is None else state.copy()
+        with open(self.path, 'rb') as f:
+            f.seek(cpos)
+            last = last_member = upos
+            while True:
+                data = f.read(READ_CHUNK)
+                if not data:
+                    break
+                cpos += len(data)
+                while data:
+                    out = decompressor.decompress(data)
+                    data = b""
+                    member_end = decompressor.eof
+                    if member_end:
+                        # Concatenated gzip members continue with a fresh decompressor
+                        data = decompressor.unused_data
+                        decompressor = zlib.decompressobj(GZIP_WBITS)
+                    if out:
+                        yield upos, out
+                        upos += len(out)
+                    if checkpoint and member_end and upos - last_member >= CHECKPOINT_BYTES:
+                        checkpoints.append((upos, cpos - len(data), None))
+                        last = last_member = upos
+                if checkpoint and upos - last >= CHECKPOINT_BYTES:
+                    checkpoints.append((upos, cpos, decompressor.copy()))
+                    last = upos
+        if checkpoint:
+            # A member boundary at the very end restarts nothing
+            while len(checkpoints) > 1 and checkpoints[-1][0] >= upos:
+                checkpoints.pop()
+            self.checkpoints = checkpoints
+            self.size = upos
+
+    def saved_checkpoints(self):
+        """(uncompressed, compressed) offsets of the member-start checkpoints, as saved in the index"""
+        return np.array([(upos, cpos) for upos, cpos, state in self.checkpoints if state is None],
+                        dtype=np.int64).reshape(-1, 2)
+
+    def restore_checkpoints(self, points, size):
+        """
+        Use member-start checkpoints saved in the index. Returns False, leaving reads
+        to rebuild checkpoints by decompressing the whole dump, when they are too far
+        apart to bound a read (one long gzip member).
+        """
+        starts = [int(upos) for upos, _ in points] + [int(size)]
+        if max(b - a for a, b in zip(starts, starts[1:])) > 2 * CHECKPOINT_BYTES:
+            return False
+        with self.lock:
+            if self.checkpoints is None:
+                self.checkpoints = [(int(upos), int(cpos), None) for upos, cpos in points]
+                self.size = int(size)
+        return True
+
+    def ensure_checkpoints(self):
+        with self.lock:
+            if self.checkpoints is None:
+                for _ in self.stream(checkpoint=True):
+                    pass
+
+    def segment(self, index):
+        """Decompressed bytes between checkpoint index and the next one"""
+        with self.lock:
+            if index in self.cache:
+                self.cache.move_to_end(index)
+                return self.cache[index]
+        start = self.checkpoints[index][0]
+        end = self.checkpoints[index + 1][0] if index + 1 < len(self.checkpoints) else self.size
+        parts = []
+        for upos, chunk in self.stream(start):
+            if upos >= end:
+                break
+            parts.append(chunk[:end - upos])
+        data = b"".join(parts)
+        with self.lock:
+            self.cache[index] = data
+            while len(self.cache) > SEGMENT_CACHE:
+                self.cache.popitem(last=False)
+        return data
+
+    def read(self, offset, length):
+        self.ensure_checkpoints()
+        starts = [point[0] for point in self.checkpoints]
+        index = bisect.bisect_right(starts, offset) - 1
+        parts = []
+        while length > 0 and index < len(starts):
+            data = self.segment(index)
+            begin = offset - starts[index]
+            piece = data[begin:begin + length]
+            parts.append(piece)
+            offset += len(piece)
+            length -= len(piece)
+            index += 1
+        return b"".join(parts)
+
+    def lines(self, start=0, checkpoint=False):
+        """(offset, line bytes) from start to the end of the stream"""
+        pending = b""
+        pending_offset = None
+        for upos, chunk in self.stream(start, checkpoint):
+            if upos + len(chunk) <= start:
+                continue
+            if upos < start:
+                chunk = chunk[start - upos:]
+                upos = start
+            if pending_offset is None:
+                pending_offset = upos
+            pending += chunk
+            position = 0
+            while True:
+                end = pending.find(b"\n", position)
+                if end == -1:
+                    break
+                yield pending_offset + position, pending[position:end]
+                position = end + 1
+            pending_offset += position
+            pending = pending[position:]
+        if pending:
+            yield pending_offset, pending
+
+    def close(self):
+        self.cache.clear()
+
+class PostDump:
+    """
+    Posts of a JSONL dump, with a byte-offset index for random access by
+    (year, post id). The index is saved next to the dump as <dump>.idx.npz and
+    rebuilt when the dump changes. Gzip offsets count uncompressed bytes, and
+    the gzip restart points are saved in the same index.
+    """
+
+    def __init__(self, path, index_path=None):
+        self.path = path
+        self.index_path = index_path or f"{path}.idx.npz"
+        self.compressed = path.endswith(".gz")
+        self.source = GzipFile(path) if self.compressed else MappedFile(path)
+        self.keys = None
+        self.offsets = None
+        self.lengths = None
+        self.duplicates = 0
+
+    def fingerprint(self):
+        stat = os.stat(self.path)
+        return np.array([INDEX_VERSION, stat.st_size, int(stat.st_mtime_ns)], dtype=np.int64)
+
+    def iter_records(self, start=0):
+        """
+        Stream (offset, next offset, record) from byte offset start, without the
+        index. Pass a saved next offset back as start to resume an interrupted pass.
+        """
+        for offset, line in self.source.lines(start):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"  Skipping malformed dump line at byte {offset}")
+                continue
+            yield offset, offset + len(line) + 1, record
+
+    def build_index(self):
+        """Scan the dump once and save the (year-id) -> (offset, length) index"""
+        keys, offsets, lengths = [], [], []
+        seen = set()
+        self.duplicates = 0
+        lines = self.source.lines(checkpoint=True) if self.compressed else self.source.lines()
+        for offset, line in lines:
+            if not line.strip():
+                continue
+            try:
+                year, post_id = record_key(json.loads(line))
+            except ValueError:
+                print(f"  Skipping unusable dump line at byte {offset}")
+                continue
+            key = f"{year}-{post_id}"
+            # The first copy of a post wins, as it would when files were written once
+            if key in seen:
+                self.duplicates += 1
+                continue
+            seen.add(key)
+            keys.append(key)
+            offsets.append(offset)
+            lengths.append(len(line))
+        order = np.argsort(np.array(keys, dtype=str), kind="stable")
+        self.keys = np.array(keys, dtype=str)[order]
+        self.offsets = np.array(offsets, dtype=np.int64)[order]
+        self.lengths = np.array(lengths, dtype=np.int64)[order]
+        if self.compressed:
+            checkpoints, size = self.source.saved_checkpoints(), self.source.size
+            if not self.source.restore_checkpoints(checkpoints, size):
+                print(f"  {self.path} is one long gzip stream: new processes decompress it once before "
+                      f"random reads. 'python dump.py repack' writes a copy that avoids this")
+        else:
+            checkpoints, size = np.zeros((0, 2), dtype=np.int64), 0
+        tmp_path = f"{self.index_path}.tmp.npz"
+        np.savez(tmp_path, keys=self.keys, offsets=self.offsets, lengths=self.lengths,
+                 fingerprint=self.fingerprint(), checkpoints=checkpoints, size=size)
+        os.replace(tmp_path, self.index_path)
+        return len(self.keys)
+
+    def load_index(self):
+        """Load the saved index, rebuilding it when missing or stale"""
+        if self.keys is not None:
+            return
+        try:
+            with np.load(self.index_path) as saved:
+                if np.array_equal(saved["fingerprint"], self.fingerprint()):
+                    self.keys = saved["keys"]
+                    self.offsets = saved["offsets"]
+                    self.lengths = saved["lengths"]
+                    if self.compressed:
+                        self.source.restore_checkpoints(saved["checkpoints"], saved["size"])
+                    return
+        except (OSError, KeyError, ValueError):
+            pass
+        print(f"Indexing {self.path}...")
+        count = self.build_index()
+        print(f"Indexed {count} posts ({self.duplicates} duplicates skipped) into {self.index_path}")
+
+    def __len__(self):
+        self.load_index()
+        return len(self.keys)
+
+    def get(self, year, post_id):
+        """Record of a post, or None when the dump does not hold it"""
+        self.load_index()
+        key = f"{year}-{post_id}"
+        position = np.searchsorted(self.keys, key)
+        if position >= len(self.keys) or self.keys[position] != key:
+            return None
+        line = self.source.read(int(self.offsets[position]), int(self.lengths[position]))
+        return json.loads(line)
+
+    def read_path(self, txt_file):
+        """Text of the post a result_<year>/output_banjir/<id>.txt path stands for, or None"""
+        parsed = split_post_path(txt_file)
+        if parsed is None:
+            return None
+        record = self.get(*parsed)
+        return None if record is None else record_text(record)
+
+    def jobs(self, base_dir="yearly_result", years=None):
+        """
+        (year, txt_file, coordinate_file) for every post, in dump order. The paths are
+        where the post's files would live; nothing is written there for the inputs.
+        """
+        self.load_index()
+        jobs = []
+        for position in np.argsort(self.offsets, kind="stable"):
+            year, post_id = str(self.keys[position]).split("-", 1)
+            year = int(year)
+            if years is not None and year not in years:
+                continue
+            folder = os.path.join(base_dir, f"result_{year}", "output_banjir")
+            jobs.append((year, os.path.join(folder, f"{post_id}.txt"),
+                         os.path.join(folder, f"{post_id}_coordinate.loc")))
+        return jobs
+
+    def close(self):
+        self.source.close()
+
+def write_lines(lines, dump_path):
+    """
+    Write JSONL lines (bytes, without newlines) to a dump. A .gz dump gets a new
+    gzip member every CHECKPOINT_BYTES, so its index can restart reads there.
+    """
+    count = 0
+    if not dump_path.endswith(".gz"):
+        with open(dump_path, 'wb') as out:
+            for line in lines:
+                out.write(line + b"\n")
+                count += 1
+        return count
+    with open(dump_path, 'wb') as out:
+        member = None
+        for line in lines:
+            if member is None:
+                member = gzip.GzipFile(fileobj=out, mode='wb', mtime=0)
+                written = 0
+            member.write(line + b"\n")
+            written += len(line) + 1
+            count += 1
+            if written >= CHECKPOINT_BYTES:
+                member.close()
+                member = None
+        if member is not None:
+            member.close()
+    return count
+
+def write_dump(base_dir, dump_path, years=range(2010, 2026)):
+    """Pack existing result_<year>/output_banjir/*.txt posts into a JSONL dump (gzip for .gz)"""
+    import glob
+
+    def lines():
+        for year in years:
+            pattern = os.path.join(base_dir, f"result_{year}", "output_banjir", "*.txt")
+            for txt_file in sorted(glob.glob(pattern)):
+                with open(txt_file, 'r', encoding='utf-8') as f:
+                    text = f.read()
+                post_id = os.path.splitext(os.path.basename(txt_file))[0]
+                yield json.dumps({"year": year, "id": post_id, "text": text}, ensure_ascii=False).encode('utf-8')
+
+    return write_lines(lines(), dump_path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index and read JSONL post dumps")
+    commands = parser.add_subparsers(dest="command", required=True)
+    index_cmd = commands.add_parser("index", help="Build or refresh the byte-offset index")
+    index_cmd.add_argument('dump')
+    get_cmd = commands.add_parser("get", help="Print one post by <year>-<id>")
+    get_cmd.add_argument('dump')
+    get_cmd.add_argument('key')
+    list_cmd = commands.add_parser("list", help="Stream posts from a byte offset")
+    list_cmd.add_argument('dump')
+    list_cmd.add_argument('--from', dest="start", type=int, default=0, help="Byte offset to resume from")
+    list_cmd.add_argument('--limit', type=int, default=10)
+    pack_cmd = commands.add_parser("pack", help="Write the .txt posts under a base dir into a dump")
+    pack_cmd.add_argument('dump')
+    pack_cmd.add_argument('--base-dir', default="yearly_result")
+    repack_cmd = commands.add_parser("repack", help="Copy a dump, writing gzip members the index can restart at")
+    repack_cmd.add_argument('dump')
+    repack_cmd.add_argument('output')
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        print(f"Wrote {write_dump(args.base_dir, args.dump)} posts to {args.dump}")
+    elif args.command == "repack":
+        if os.path.abspath(args.output) == os.path.abspath(args.dump):
+            parser.error("repack needs a different output file")
+        source = GzipFile(args.dump) if args.dump.endswith(".gz") else MappedFile(args.dump)
+        count = write_lines((line for _, line in source.lines() if line.strip()), args.output)
+        source.close()
+        print(f"Wrote {count} lines to {args.output}")
+    else:
+        dump = PostDump(args.dump)
+        if args.command == "index":
+            count = dump.build_index()
+            print(f"Indexed {count} posts ({dump.duplicates} duplicates skipped) into {dump.index_path}")
+        elif args.command == "get":
+            year, post_id = args.key.split("-", 1)
+            record = dump.get(year, post_id)
+            print(record_text(record) if record is not None else f"{args.key} is not in {args.dump}")
+        else:
+            shown = 0
+            for offset, next_offset, record in dump.iter_records(args.start):
+                text = record_text(record).replace("\n", " ")
+                print(f"{offset:>12}  {record.get('year')}-{record.get('id')}  {text[:80]}")
+                shown += 1
+                if shown >= args.limit:
+                    print(f"Resume with --from {next_offset}")
+                    break
+        dump.close()
@@ -0,0 +1,238 @@
+"""
+Export every result as one GIS-ready dataset instead of copying .loc/.txt pairs.
+
+    python export.py floods.geojson                      # GeoJSON FeatureCollection
+    python export.py floods.csv                          # CSV
+    python export.py floods_parquet --format geoparquet  # GeoParquet, one file per year (needs pyarrow)
+    python export.py floods.geojson --store results.sqlite --years 2020-2025
+"""
+import os
+import csv
+import json
+import struct
+import argparse
+import itertools
+from datetime import datetime
+from urllib.parse import unquote
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from result_store import COORDINATE_SUFFIX, parse_coordinate_file, read_post_header, split_coordinate_path
+from temporal import parse_date
+
+FIELDS = ("year", "post_id", "lat", "lon", "date", "date_text", "address", "address_raw", "post_link")
+FORMATS = ("geojson", "csv", "geoparquet")
+
+# Files read per parallel chunk; only one chunk of records is held at a time
+CHUNK_FILES = 512
+# Rows per Parquet row group
+ROW_GROUP = 50000
+
+def coordinate_files(base_dir="yearly_result", years=range(2010, 2026)):
+    """Yield every _coordinate.loc path, year by year, without listing everything up front"""
+    for year in years:
+        folder = os.path.join(base_dir, f"result_{year}", "output_banjir")
+        try:
+            entries = os.scandir(folder)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.name.endswith(COORDINATE_SUFFIX):
+                    yield entry.path
+
+def make_record(year, post_id, address, lat, lon, post_link, date_text, scraped_at=None):
+    """One export row; date is an ISO minute timestamp, or None when DATE cannot be parsed"""
+    reference = datetime.fromtimestamp(scraped_at) if scraped_at else None
+    parsed = parse_date(date_text, reference) if date_text else np.datetime64("NaT")
+    return {
+        "year": int(year),
+        "post_id": str(post_id),
+        "lat": float(lat),
+        "lon": float(lon),
+        "date": None if np.isnat(parsed) else str(parsed),
+        "date_text": date_text,
+        "address": unquote(address) if address else None,
+        "address_raw": address,
+        "post_link": post_link,
+    }
+
+def read_result(coord_file):
+    """Export row for a .loc file, or None when it has no coordinates"""
+    year, post_id = split_coordinate_path(coord_file)
+    try:
+        with open(coord_file, 'r', encoding='utf-8') as f:
+            parsed = parse_coordinate_file(f.read())
+    except OSError:
+        return None
+    if year is None or parsed["lat"] is None:
+        return None
+    txt_file = coord_file[:-len(COORDINATE_SUFFIX)] + ".txt"
+    if parsed["post_link"] is None and parsed["date"] is None:
+        parsed["post_link"], parsed["date"] = read_post_header(txt_file)
+    try:
+        scraped_at = os.path.getmtime(txt_file)
+    except OSError:
+        scraped_at = None
+    return make_record(year, post_id, parsed["address"], parsed["lat"], parsed["lon"],
+                       parsed["post_link"], parsed["date"], scraped_at)
+
+def iter_records(base_dir="yearly_result", years=range(2010, 2026), store=None, workers=8):
+    """Stream export rows in year order, from a ResultStore or from .loc files read in parallel"""
+    if store is not None:
+        for year in years:
+            for row in store.iter_results(year):
+                if row["lat"] is not None and row["lon"] is not None:
+                    yield make_record(row["year"], row["post_id"], row["address"], row["lat"], row["lon"],
+                                      row["post_link"], row["date"])
+        return
+    files = coordinate_files(base_dir, years)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            chunk = list(itertools.islice(files, CHUNK_FILES))
+            if not chunk:
+                break
+            for record in executor.map(read_result, chunk):
+                if record is not None:
+                    yield record
+
+def write_geojson(records, path):
+    """Write a FeatureCollection of Point features, one line per feature"""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"type": "FeatureCollection", "features": [\n')
+        for record in records:
+            properties = {field: record[field] for field in FIELDS if field not in ("lat", "lon")}
+            feature = {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [record["lon"], record["lat"]]},
+                "properties": properties,
+            }
+            f.write(("" if count == 0 else ",\n") + json.dumps(feature, ensure_ascii=False))
+            count += 1
+        f.write("\n]}\n")
+    return count
+
+def write_csv(records, path):
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            count += 1
+    return count
+
+def point_wkb(lon, lat):
+    """Little-endian WKB for a 2D point"""
+    return struct.pack("<BIdd", 1, 1, lon, lat)
+
+def write_geoparquet(records, path):
+    """
+    Write one GeoParquet file per year under path (year=<year>/part-0.parquet) with
+    typed columns and a WKB Point geometry. Rows arrive in year order, so only one
+    file is open at a time. The year lives only in the hive partition directory,
+    so readers of the dataset get it back as a partition column.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("GeoParquet export needs pyarrow (pip install pyarrow)")
+
+    # GeoParquet 1.0 metadata; without a "crs" the points are WGS84 lon/lat
+    geo = {
+        "version": "1.0.0",
+        "primary_column": "geometry",
+        "columns": {"geometry": {"encoding": "WKB", "geometry_types": ["Point"]}},
+    }
+    schema = pa.schema([
+        ("post_id", pa.string()),
+        ("lat", pa.float64()),
+        ("lon", pa.float64()),
+        ("date", pa.timestamp("s")),
+        ("date_text", pa.string()),
+        ("address", pa.string()),
+        ("address_raw", pa.string()),
+        ("post_link", pa.string()),
+        ("geometry", pa.binary()),
+    ], metadata={"geo": json.dumps(geo)})
+
+    count = 0
+    writer = None
+    year = None
+    rows = []
+
+    def flush():
+        columns = {field: [row[field] for row in rows] for field in FIELDS if field != "year"}
+        columns["date"] = [None if value is None else datetime.fromisoformat(value) for value in columns["date"]]
+        columns["geometry"] = [point_wkb(row["lon"], row["lat"]) for row in rows]
+        writer.write_table(pa.table(columns, schema=schema))
+        rows.clear()
+
+    for record in records:
+        if record["year"] != year:
+            if writer is not None:
+                if rows:
+                    flush()
+                writer.close()
+            year = record["year"]
+            partition = os.path.join(path, f"year={year}")
+            os.makedirs(partition, exist_ok=True)
+            writer = pq.ParquetWriter(os.path.join(partition, "part-0.parquet"), schema)
+        rows.append(record)
+        count += 1
+        if len(rows) >= ROW_GROUP:
+            flush()
+    if writer is not None:
+        if rows:
+            flush()
+        writer.close()
+    return count
+
+def export(output, output_format=None, base_dir="yearly_result", years=range(2010, 2026), store=None, workers=8):
+    """Stream every result into output; the format defaults to the file extension. Returns the row count"""
+    if output_format is None:
+        extension = os.path.splitext(output)[1].lower()
+        output_format = {".geojson": "geojson", ".json": "geojson", ".csv": "csv",
+                         ".parquet": "geoparquet"}.get(extension, "geoparquet" if not extension else None)
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown export format for {output}; use --format {'/'.join(FORMATS)}")
+    records = iter_records(base_dir, years, store, workers)
+    if output_format == "geoparquet":
+        return write_geoparquet(records, output)
+    # Written next to the target and renamed, so readers never see a half-written file
+    tmp_path = f"{output}.tmp"
+    writer = write_geojson if output_format == "geojson" else write_csv
+    count = writer(records, tmp_path)
+    os.replace(tmp_path, output)
+    return count
+
+def parse_years(value):
+    """"2020" or "2015-2020" as a range of years"""
+    first, _, last = value.partition("-")
+    return range(int(first), int(last or first) + 1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export flood results as GeoJSON, CSV or GeoParquet")
+    parser.add_argument('output', help="Output file (.geojson/.csv) or directory (GeoParquet)")
+    parser.add_argument('--format', choices=FORMATS, help="Output format (default: from the extension)")
+    parser.add_argument('--base-dir', default="yearly_result", help="Directory holding result_<year> folders")
+    parser.add_argument('--store', help="Read results from this result store instead of .loc files")
+    parser.add_argument('--years', type=parse_years, default=range(2010, 2026), help="Year or range, e.g. 2015-2020")
+    parser.add_argument('--workers', type=int, default=8, help="Parallel .loc readers")
+    args = parser.parse_args()
+
+    store = None
+    if args.store:
+        from result_store import ResultStore
+        store = ResultStore(args.store)
+    try:
+        count = export(args.output, args.format, args.base_dir, args.years, store, args.workers)
+    except (ValueError, RuntimeError) as e:
+        parser.error(str(e))
+    finally:
+        if store is not None:
+            store.close()
+    print(f"Exported {count} results to {args.output}")
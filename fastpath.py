@@ -0,0 +1,279 @@
+"""
+Rule-based address extraction tried before the LLM.
+
+    python fastpath.py --evaluate            # agreement with existing .loc answers per threshold
+    python fastpath.py yearly_result/result_2018/output_banjir/12.txt
+"""
+import os
+import re
+import glob
+import time
+import random
+import argparse
+import threading
+
+from gazetteer import normalize_name
+from text_cleaner import clean_post_text
+
+# Regencies and cities E100 reports on most; a loaded gazetteer adds the rest
+CITIES = {
+    "surabaya", "sidoarjo", "gresik", "mojokerto", "pasuruan", "malang", "batu", "jombang",
+    "lamongan", "tuban", "bojonegoro", "nganjuk", "kediri", "madiun", "situbondo", "probolinggo",
+    "lumajang", "jember", "banyuwangi", "bondowoso", "bangkalan", "sampang", "pamekasan",
+    "sumenep", "blitar", "tulungagung", "trenggalek", "ponorogo", "pacitan", "magetan", "ngawi",
+    "jakarta", "bandung", "semarang", "yogyakarta", "solo", "bekasi", "tangerang", "bogor", "depok",
+}
+
+# Well-known districts mapped to their city, so "Banjir di Bangil" still gets a city
+DISTRICTS = {
+    "bangil": "pasuruan", "beji": "pasuruan", "gempol": "pasuruan", "pandaan": "pasuruan",
+    "mojoagung": "jombang", "ploso": "jombang", "kesamben": "jombang",
+    "taman": "sidoarjo", "waru": "sidoarjo", "gedangan": "sidoarjo", "sedati": "sidoarjo",
+    "candi": "sidoarjo", "porong": "sidoarjo", "tanggulangin": "sidoarjo", "krian": "sidoarjo",
+    "buduran": "sidoarjo", "tulangan": "sidoarjo", "prambon": "sidoarjo", "krembung": "sidoarjo",
+    "sukodono": "sidoarjo", "wonoayu": "sidoarjo", "tarik": "sidoarjo", "jabon": "sidoarjo",
+    "menganti": "gresik", "driyorejo": "gresik", "kebomas": "gresik", "cerme": "gresik",
+    "benjeng": "gresik", "balongpanggang": "gresik", "wringinanom": "gresik",
+    "tandes": "surabaya", "benowo": "surabaya", "lakarsantri": "surabaya", "wiyung": "surabaya",
+    "rungkut": "surabaya", "gubeng": "surabaya", "wonokromo": "surabaya", "sukolilo": "surabaya",
+    "mulyorejo": "surabaya", "tambaksari": "surabaya", "kenjeran": "surabaya", "genteng": "surabaya",
+    "tegalsari": "surabaya", "sawahan": "surabaya", "jambangan": "surabaya", "gayungan": "surabaya",
+    "wonocolo": "surabaya", "tenggilis": "surabaya", "gunung anyar": "surabaya", "asemrowo": "surabaya",
+    "sukomanunggal": "surabaya", "karang pilang": "surabaya", "dukuh pakis": "surabaya",
+    "kalianak": "surabaya", "margomulyo": "surabaya", "kertajaya": "surabaya", "medokan": "surabaya",
+}
+
+CITY_NAMES = re.compile(r"\b(" + "|".join(sorted(map(re.escape, CITIES), key=len, reverse=True)) + r")\b")
+DISTRICT_NAMES = re.compile(r"\b(" + "|".join(sorted(map(re.escape, DISTRICTS), key=len, reverse=True)) + r")\b")
+
+PLACE_WORD = r"[A-Z][\w'-]*"
+PLACE = rf"{PLACE_WORD}(?:\s+(?:{PLACE_WORD}|\d+))" + "{0,3}"
+
+# The phrase is matched case-insensitively, the place itself must be capitalised
+FLOOD_AT = re.compile(
+    r"(?i:\b(?:banjir|genangan|tergenang|terendam)\s+(?:\S+\s+)?di\s+"
+    r"(?:(?:daerah|kawasan|wilayah|sekitar|depan|jalan|jl\.?|desa|kelurahan|kel\.?|kecamatan|kec\.?)\s+)?)"
+    rf"({PLACE})"
+)
+
+ADMIN_PREFIXES = {
+    "area": r"(?:Jalan|Jl\.?|Raya|Perum(?:ahan)?|Dusun|Dsn\.?)",
+    "kelurahan": r"(?:Kelurahan|Kel\.|Desa|Ds\.)",
+    "kecamatan": r"(?:Kecamatan|Kec\.)",
+    "kota": r"(?:Kabupaten|Kab\.|Kota)",
+}
+ADMIN = {level: re.compile(rf"\b{prefix}\s*({PLACE})") for level, prefix in ADMIN_PREFIXES.items()}
+
+LIST_ITEM = re.compile(r"^\s*\d{1,2}[.)]\s", re.MULTILINE)
+# Words that end a place phrase ("Banjir di Kalianyar Bangil, Kamis ...")
+STOP = {"kamis", "jumat", "sabtu", "minggu", "senin", "selasa", "rabu", "pagi", "siang", "sore",
+        "malam", "hari", "ini", "tadi", "pukul", "sejak", "akibat", "karena", "setinggi", "masih",
+        "arah", "terpantau", "info", "informasi", "dan", "yang", "sudah", "belum", "surut", "pada",
+        "capai", "mencapai", "hingga", "sampai", "ketinggian", "kembali", "lagi", "kemarin"}
+# Administrative words start the next level of an address ("Saladi Kecamatan Ulu Pungkut")
+ADMIN_WORDS = {"kelurahan", "kel", "desa", "ds", "kecamatan", "kec", "kabupaten", "kab", "kota"}
+
+class FastResult:
+    __slots__ = ("address", "confidence", "reason")
+
+    def __init__(self, address, confidence, reason):
+        self.address = address
+        self.confidence = confidence
+        self.reason = reason
+
+def trim_place(phrase):
+    """Cut a captured place phrase at the first stop word"""
+    words = []
+    for word in phrase.split():
+        key = word.lower().strip(".,")
+        if key in STOP or (words and key in ADMIN_WORDS):
+            break
+        words.append(word.strip(".,;:"))
+    return " ".join(words)
+
+def find_names(pattern, text):
+    """Distinct dictionary names in a text, in order of appearance"""
+    return list(dict.fromkeys(pattern.findall(text.lower())))
+
+def extract(text, gazetteer=None):
+    """
+    Guess the post's address from flood phrases, administrative prefixes and
+    known place names. Returns a FastResult with a %20-joined address in the
+    LLM's format and a confidence in [0, 1]; address is None when nothing was found.
+    """
+    score = 0.0
+    reasons = []
+    parts = []
+
+    match = FLOOD_AT.search(text)
+    if match and trim_place(match.group(1)):
+        parts.append(trim_place(match.group(1)))
+        score += 0.35
+        reasons.append("banjir di")
+
+    levels = {}
+    for level, pattern in ADMIN.items():
+        found = pattern.search(text)
+        if found and trim_place(found.group(1)):
+            levels[level] = trim_place(found.group(1))
+    for level in ("area", "kelurahan", "kecamatan"):
+        if level in levels and normalize_name(levels[level]) not in {normalize_name(p) for p in parts}:
+            parts.append(levels[level])
+    if levels:
+        score += min(0.3, 0.15 * len(levels))
+        reasons.append("prefix " + "/".join(sorted(levels)))
+
+    cities = find_names(CITY_NAMES, text)
+    if "kota" in levels and normalize_name(levels["kota"]) not in cities:
+        cities.insert(0, normalize_name(levels["kota"]))
+    if not cities:
+        district_cities = {DISTRICTS[name] for name in find_names(DISTRICT_NAMES, " ".join(parts) or text)}
+        if len(district_cities) == 1:
+            cities = list(district_cities)
+            score += 0.15
+            reasons.append("district")
+    elif len(cities) == 1:
+        score += 0.25
+        reasons.append("city")
+
+    if not parts and not cities:
+        return FastResult(None, 0.0, "no location")
+
+    # Traffic round-ups and posts naming several cities need the LLM to pick one
+    if len(cities) > 1:
+        score -= 0.3
+        reasons.append("several cities")
+    if len(LIST_ITEM.findall(text)) >= 2:
+        score -= 0.2
+        reasons.append("list")
+
+    named = set(normalize_name(" ".join(parts)).split())
+    address_parts = parts + [city.title() for city in cities[:1] if not set(city.split()) <= named]
+    address = "%20".join(part.replace(" ", "%20") for part in address_parts) + "%20Indonesia"
+
+    if gazetteer is not None and gazetteer.lookup(address) is not None:
+        score += 0.3
+        reasons.append("gazetteer")
+    return FastResult(address, round(max(0.0, min(score, 1.0)), 2), ", ".join(reasons))
+
+def addresses_agree(fast, llm):
+    """Whether two addresses name the same place (half of the shorter one's words shared)"""
+    a = set(normalize_name(fast).split())
+    b = set(normalize_name(llm).split())
+    if not a or not b:
+        return False
+    return len(a & b) / min(len(a), len(b)) >= 0.5
+
+class FastPathRouter:
+    """
+    Sends confident rule-based answers straight back and everything else to the
+    LLM, counting each route and how often the two agree per confidence bucket so
+    the threshold can be tuned. audit_rate sends a share of confident posts to the
+    LLM anyway, to keep measuring agreement above the threshold.
+    """
+
+    def __init__(self, threshold=0.5, audit_rate=0.0, gazetteer=None):
+        self.threshold = threshold
+        self.audit_rate = audit_rate
+        self.gazetteer = gazetteer
+        self.lock = threading.Lock()
+        self.random = random.Random()
+        self.routes = {"fast": 0, "llm_low_confidence": 0, "llm_no_location": 0, "llm_audit": 0}
+        self.buckets = {}   # confidence rounded down to 0.1 -> [agree, compared]
+        self.seconds = 0.0
+
+    def route(self, text):
+        """Return (FastResult, answer locally?) for a cleaned post"""
+        start = time.perf_counter()
+        result = extract(text, self.gazetteer)
+        elapsed = time.perf_counter() - start
+        if result.address is None:
+            name = "llm_no_location"
+        elif result.confidence < self.threshold:
+            name = "llm_low_confidence"
+        elif self.audit_rate and self.random.random() < self.audit_rate:
+            name = "llm_audit"
+        else:
+            name = "fast"
+        with self.lock:
+            self.routes[name] += 1
+            self.seconds += elapsed
+        return result, name == "fast"
+
+    def compare(self, result, llm_address):
+        """Record whether the LLM's answer agrees with the rule-based one"""
+        if result.address is None or not llm_address or "maaf" in llm_address.lower():
+            return
+        bucket = int(result.confidence * 10) / 10
+        with self.lock:
+            totals = self.buckets.setdefault(bucket, [0, 0])
+            totals[0] += addresses_agree(result.address, llm_address)
+            totals[1] += 1
+
+    def summary(self):
+        total = sum(self.routes.values())
+        lines = [f"Fast path (threshold {self.threshold}): "
+                 + ", ".join(f"{name} {count}" for name, count in self.routes.items())]
+        if total:
+            lines[0] += (f"; {self.routes['fast'] / total:.1%} answered locally, "
+                         f"{self.seconds / total * 1e6:.0f} us per post")
+        for bucket in sorted(self.buckets):
+            agree, compared = self.buckets[bucket]
+            lines.append(f"  confidence {bucket:.1f}-{bucket + 0.1:.1f}: "
+                         f"{agree}/{compared} agree with the LLM ({agree / compared:.0%})")
+        return "\n".join(lines)
+
+def evaluate(base_dir="yearly_result", gazetteer=None):
+    """Compare the extractor with existing .loc answers; returns [(threshold, coverage, agreement)]"""
+    from result_store import parse_coordinate_file
+    from main import read_text_file
+
+    scored = []
+    for coord_file in glob.glob(os.path.join(base_dir, "result_*", "output_banjir", "*_coordinate.loc")):
+        txt_file = coord_file.replace("_coordinate.loc", ".txt")
+        if not os.path.exists(txt_file):
+            continue
+        with open(coord_file, 'r', encoding='utf-8') as f:
+            answer = parse_coordinate_file(f.read())["address"]
+        if not answer or "maaf" in answer.lower():
+            continue
+        result = extract(clean_post_text(read_text_file(txt_file)), gazetteer)
+        agree = result.address is not None and addresses_agree(result.address, answer)
+        scored.append((result.confidence, agree))
+
+    rows = []
+    for step in range(3, 10):
+        threshold = step / 10
+        routed = [agree for confidence, agree in scored if confidence >= threshold]
+        coverage = len(routed) / len(scored) if scored else 0.0
+        agreement = sum(routed) / len(routed) if routed else None
+        rows.append((threshold, coverage, agreement))
+    return len(scored), rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rule-based address extraction")
+    parser.add_argument('files', nargs='*', help="Post .txt files to extract from")
+    parser.add_argument('--evaluate', action='store_true', help="Score thresholds against existing .loc answers")
+    parser.add_argument('--base-dir', default="yearly_result", help="Directory holding result_<year> folders")
+    parser.add_argument('--gazetteer', default=os.getenv('GAZETTEER_CSV'), help="Place CSV for extra confidence")
+    args = parser.parse_args()
+
+    gazetteer = None
+    if args.gazetteer:
+        from gazetteer import Gazetteer
+        gazetteer = Gazetteer(args.gazetteer)
+
+    if args.evaluate:
+        start = time.perf_counter()
+        count, rows = evaluate(args.base_dir, gazetteer)
+        print(f"Compared {count} posts with LLM answers in {time.perf_counter() - start:.1f}s")
+        for threshold, coverage, agreement in rows:
+            shown = f"{agreement:.1%}" if agreement is not None else "-"
+            print(f"  threshold {threshold:.1f}: {coverage:6.1%} answered locally, {shown} agree")
+    for txt_file in args.files:
+        with open(txt_file, 'r', encoding='utf-8') as f:
+            text = clean_post_text(f.read())
+        start = time.perf_counter()
+        result = extract(text, gazetteer)
+        elapsed = (time.perf_counter() - start) * 1e6
+        print(f"{txt_file}: {result.address} (confidence {result.confidence}, {result.reason}, {elapsed:.0f} us)")
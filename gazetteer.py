@@ -0,0 +1,208 @@
+import re
+import csv
+import threading
+from urllib.parse import unquote
+
+# Administrative prefixes and filler words that are not part of a place name
+STOP_WORDS = {
+    "kel", "kelurahan", "desa", "ds", "kec", "kecamatan", "kab", "kabupaten",
+    "kota", "kotamadya", "kodya", "prov", "provinsi", "indonesia", "dan", "di",
+}
+
+LEVELS = ("kelurahan", "kecamatan", "kota")
+
+def normalize_name(name):
+    """Lower-case a place name and drop punctuation and administrative prefixes"""
+    text = unquote(name or "").lower()
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    return " ".join(word for word in text.split() if word not in STOP_WORDS)
+
+def max_distance(word):
+    """Edit distance allowed for a name of this length"""
+    if len(word) <= 4:
+        return 0
+    if len(word) <= 8:
+        return 1
+    return 2
+
+class TrieNode:
+    __slots__ = ("children", "value")
+
+    def __init__(self):
+        self.children = {}
+        self.value = None
+
+class PlaceTrie:
+    """Prefix trie of normalized place names with bounded edit-distance search"""
+
+    def __init__(self):
+        self.root = TrieNode()
+
+    def insert(self, name, value):
+        node = self.root
+        for char in name:
+            node = node.children.setdefault(char, TrieNode())
+        if node.value is None:
+            node.value = []
+        node.value.append(value)
+
+    def search(self, word, max_dist):
+        """Return [(values, distance)] for names within max_dist edits of word"""
+        results = []
+        first_row = list(range(len(word) + 1))
+        for char, child in self.root.children.items():
+            self._search(child, char, word, first_row, max_dist, results)
+        return results
+
+    def _search(self, node, char, word, previous_row, max_dist, results):
+        row = [previous_row[0] + 1]
+        for i in range(1, len(word) + 1):
+            cost = 0 if word[i - 1] == char else 1
+            row.append(min(row[i - 1] + 1, previous_row[i] + 1, previous_row[i - 1] + cost))
+        if row[-1] <= max_dist and node.value is not None:
+            results.append((node.value, row[-1]))
+        if min(row) <= max_dist:
+            for next_char, child in node.children.items():
+                self._search(child, next_char, word, row, max_dist, results)
+
+    def with_prefix(self, prefix, limit=2):
+        """Return up to `limit` value lists for names starting with prefix"""
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        found = []
+        stack = [node]
+        while stack and len(found) <= limit:
+            current = stack.pop()
+            if current.value is not None:
+                found.append(current.value)
+            stack.extend(current.children.values())
+        return found[:limit]
+
+class Gazetteer:
+    """
+    In-memory kelurahan/kecamatan/kota centroid index loaded from a CSV with
+    columns kelurahan, kecamatan, kota, lat, lon (extra columns are ignored).
+    """
+
+    def __init__(self, path, max_ngram=4):
+        self.path = path
+        self.max_ngram = max_ngram
+        self.trie = PlaceTrie()
+        self.centroids = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.load(path)
+
+    def load(self, path):
+        sums = {}
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                try:
+                    lat = float(row["lat"])
+                    lon = float(row["lon"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                kota = normalize_name(row.get("kota"))
+                kec = normalize_name(row.get("kecamatan"))
+                kel = normalize_name(row.get("kelurahan"))
+                if not kota:
+                    continue
+                keys = [("kota", (kota,))]
+                if kec:
+                    keys.append(("kecamatan", (kota, kec)))
+                    if kel:
+                        keys.append(("kelurahan", (kota, kec, kel)))
+                for key in keys:
+                    total = sums.setdefault(key, [0.0, 0.0, 0])
+                    total[0] += lat
+                    total[1] += lon
+                    total[2] += 1
+
+        for (level, key), (lat_sum, lon_sum, count) in sums.items():
+            self.centroids[(level, key)] = (lat_sum / count, lon_sum / count)
+            self.trie.insert(key[-1], (level, key))
+
+    def __len__(self):
+        return len(self.centroids)
+
+    def _matches(self, tokens):
+        """Find place names among the query n-grams as (level, key, span, distance)"""
+        matches = []
+        for n in range(1, self.max_ngram + 1):
+            for start in range(len(tokens) - n + 1):
+                phrase = " ".join(tokens[start:start + n])
+                span = set(range(start, start + n))
+                found = self.trie.search(phrase, max_distance(phrase))
+                if not found and n == 1 and len(phrase) >= 5:
+                    # Truncated names such as "kemayo" only count when the completion is unique
+                    completions = self.trie.with_prefix(phrase)
+                    if len(completions) == 1:
+                        found = [(completions[0], 1)]
+                for values, dist in found:
+                    for level, key in values:
+                        matches.append((level, key, span, dist))
+        return matches
+
+    def lookup(self, address):
+        """
+        Resolve an address to (lat, lon, level) when at least two administrative
+        levels agree, e.g. kelurahan + kota or kecamatan + kota; otherwise None.
+        """
+        tokens = normalize_name(address).split()
+        by_level = {level: [] for level in LEVELS}
+        for level, key, span, dist in self._matches(tokens):
+            by_level[level].append((key, span, dist))
+
+        best = None
+        for level in ("kelurahan", "kecamatan"):
+            for key, span, dist in by_level[level]:
+                used = set(span)
+                score = 3 if level == "kelurahan" else 2
+                penalty = dist
+                levels = 1
+                if level == "kelurahan":
+                    kec = self._agreeing(by_level["kecamatan"], key[:2], used)
+                    if kec is not None:
+                        score += 2
+                        penalty += kec[0]
+                        used |= kec[1]
+                        levels += 1
+                kota = self._agreeing(by_level["kota"], key[:1], used)
+                if kota is not None:
+                    score += 1
+                    penalty += kota[0]
+                    levels += 1
+                if levels < 2:
+                    continue
+                candidate = (score - 0.5 * penalty, level, key)
+                if best is None or candidate[0] > best[0]:
+                    best = candidate
+                elif candidate[0] == best[0] and candidate[2] != best[2]:
+                    # Two different places fit equally well; not confident
+                    best = (best[0], None, None)
+
+        with self.lock:
+            if best is None or best[1] is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        lat, lon = self.centroids[(best[1], best[2])]
+        return lat, lon, best[1]
+
+    def _agreeing(self, matches, parent_key, used):
+        """(distance, span) of the closest match for parent_key that does not reuse tokens"""
+        best = None
+        for key, span, dist in matches:
+            if key == parent_key and not span & used:
+                if best is None or dist < best[0]:
+                    best = (dist, span)
+        return best
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        return (f"Gazetteer: {self.hits} of {lookups} addresses resolved locally "
+                f"({len(self)} places loaded)")
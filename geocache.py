@@ -0,0 +1,100 @@
+import re
+import time
+import sqlite3
+import threading
+from collections import namedtuple
+from urllib.parse import unquote
+
+# Cached geocoding answer; lat/lon are None for addresses Google could not resolve
+CachedLocation = namedtuple("CachedLocation", ["lat", "lon"])
+
+DEFAULT_TTL = 90 * 24 * 3600
+DEFAULT_NEGATIVE_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 200000
+
+def normalize_address(address):
+    """Normalize an address so spelling-identical queries share a cache entry"""
+    text = unquote(address or "")
+    text = text.casefold()
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" ,.")
+
+class GeocodeCache:
+    """SQLite-backed cache of geocoding results keyed by normalized address"""
+
+    def __init__(self, path="geocode_cache.sqlite", ttl=DEFAULT_TTL,
+                 negative_ttl=DEFAULT_NEGATIVE_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocode ("
+            " key TEXT PRIMARY KEY,"
+            " address TEXT,"
+            " lat REAL,"
+            " lon REAL,"
+            " expires_at REAL NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS geocode_expires ON geocode (expires_at)")
+        self.conn.commit()
+        self.evict()
+
+    def get(self, address):
+        """Return a CachedLocation, or None when the address is not cached"""
+        key = normalize_address(address)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT lat, lon FROM geocode WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return CachedLocation(row[0], row[1])
+
+    def put(self, address, lat=None, lon=None):
+        """Store a result; leave lat/lon as None to record a negative answer"""
+        key = normalize_address(address)
+        now = time.time()
+        ttl = self.ttl if lat is not None else self.negative_ttl
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO geocode (key, address, lat, lon, expires_at, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, address, lat, lon, now + ttl, now),
+            )
+            self.conn.commit()
+
+    def evict(self):
+        """Drop expired entries and trim the oldest ones beyond max_entries"""
+        with self.lock:
+            self.conn.execute("DELETE FROM geocode WHERE expires_at <= ?", (time.time(),))
+            if self.max_entries:
+                self.conn.execute(
+                    "DELETE FROM geocode WHERE key IN ("
+                    " SELECT key FROM geocode ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self.conn.commit()
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def summary(self):
+        """One-line hit rate report for the end of a run"""
+        lookups = self.hits + self.misses
+        return (f"Geocoding cache: {self.hits} hits / {lookups} lookups "
+                f"({self.hit_rate():.1%} hit rate)")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,85 @@
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+def cache_key(prompt_template, text, model, temperature):
+    """Content hash of everything that determines a model answer"""
+    payload = json.dumps([prompt_template, text, model, temperature], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class LLMCache:
+    """SQLite-backed LRU cache of model answers keyed by a content hash"""
+
+    def __init__(self, path="llm_cache.sqlite", max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_response ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT,"
+            " response TEXT NOT NULL,"
+            " tokens INTEGER NOT NULL DEFAULT 0,"
+            " last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS llm_response_last_used ON llm_response (last_used)")
+        self.conn.commit()
+
+    def get(self, prompt_template, text, model, temperature):
+        """Return the cached answer, or None on a miss"""
+        return self.get_any((prompt_template,), text, model, temperature)
+
+    def get_any(self, prompt_templates, text, model, temperature):
+        """
+        Return the answer cached under the first of several prompt templates that
+        has one, or None. Counts as a single hit or miss however many keys are tried.
+        """
+        keys = [cache_key(template, text, model, temperature) for template in prompt_templates]
+        with self.lock:
+            for key in keys:
+                row = self.conn.execute(
+                    "SELECT response, tokens FROM llm_response WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    break
+            else:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE llm_response SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            self.hits += 1
+            self.tokens_saved += row[1]
+            return row[0]
+
+    def put(self, prompt_template, text, model, temperature, response, tokens=0):
+        """Store an answer and evict the least recently used entries beyond the size cap"""
+        key = cache_key(prompt_template, text, model, temperature)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_response (key, model, response, tokens, last_used)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, tokens, time.time()),
+            )
+            if self.max_entries:
+                self.conn.execute(
+                    "DELETE FROM llm_response WHERE key IN ("
+                    " SELECT key FROM llm_response ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self.conn.commit()
+
+    def summary(self):
+        """One-line report of cache effectiveness for the end of a run"""
+        return (f"LLM cache: {self.hits} hits, {self.misses} misses, "
+                f"{self.tokens_saved} tokens saved")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
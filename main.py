@@ -1,10 +1,14 @@
 import os
+import re
 import glob
-import requests
 import json
+import argparse
+import contextlib
 from openai import OpenAI
 from dotenv import load_dotenv
 
+import transport
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -17,26 +21,93 @@ def setup_openai_client():
         print("OPENAI_API_KEY=your_api_key_here")
         return None
     
-    return OpenAI(api_key=api_key)
+    # One client (and its keep-alive connection pool) is shared by every worker thread.
+    # Retries are handled by transport.call_with_retries so 429s also feed the concurrency controller
+    return OpenAI(api_key=api_key, max_retries=0)
+
+# Optional Tracer recording per-stage spans and token usage (set up in main)
+tracer = None
+
+def trace(stage):
+    """Time a pipeline stage when tracing is enabled; yields a dict for extra fields"""
+    if tracer is None:
+        return contextlib.nullcontext({})
+    return tracer.span(stage)
+
+def trace_posts(*keys):
+    """Attribute the spans of this thread to the given "<year>-<id>" post keys"""
+    if tracer is None:
+        return contextlib.nullcontext()
+    return tracer.posts(keys)
+
+# Sampling temperature used for address extraction
+TEMPERATURE = 0.3
+
+def chat_completion(client, prompt, model="gpt-4.1-mini", temperature=TEMPERATURE, **options):
+    """Send a prompt to OpenAI and return (content, usage); raises on API errors"""
+    with trace("llm") as span:
+        span["model"] = model
+        response = transport.call_with_retries(
+            lambda: client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                # max_tokens=1000,
+                temperature=temperature,
+                **options,
+            ),
+            transport.llm_limiter,
+        )
+    if tracer is not None:
+        tracer.record_usage(model, response.usage)
+    return response.choices[0].message.content, response.usage
 
 def chat_with_openai(client, prompt, model="gpt-4.1-mini"):
     """Send a prompt to OpenAI and get response"""
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            # max_tokens=1000,
-            temperature=0.3,
-        )
-        return response.choices[0].message.content
+        content, _ = chat_completion(client, prompt, model)
+        return content
     except Exception as e:
         return f"Error: {str(e)}"
 
+# Geocoding endpoint; override with GEOCODE_URL to point at a local stand-in
+GEOCODE_URL = os.getenv('GEOCODE_URL', "https://maps.googleapis.com/maps/api/geocode/json")
+
+# Optional GeocodeCache shared by every geocoding call (set up in main)
+geocode_cache = None
+
+# Optional offline Gazetteer tried before the geocoding API (set up in main)
+gazetteer = None
+
+# Geocoder answer for an address it could not place (as opposed to a failed request)
+NO_COORDINATES = "Error: No coordinates found"
+
 def get_coordinates_from_api(address):
     """Get coordinates from Google Maps Geocoding API"""
+    with trace("geocode") as span:
+        coordinates = resolve_coordinates(address)
+        if coordinates.startswith("Error"):
+            span["error"] = coordinates
+        return coordinates
+
+def resolve_coordinates(address):
+    """Resolve an address through the gazetteer, the cache or the Geocoding API"""
     try:
+        # Resolve locally when the gazetteer has a confident match
+        if gazetteer is not None:
+            match = gazetteer.lookup(address)
+            if match is not None:
+                return f"{match[0]}, {match[1]}"
+        
+        # Answer from the cache when this address has been geocoded before
+        if geocode_cache is not None:
+            cached = geocode_cache.get(address)
+            if cached is not None:
+                if cached.lat is None:
+                    return NO_COORDINATES
+                return f"{cached.lat}, {cached.lon}"
+        
         # Get Google Maps API key from environment
         google_api_key = os.getenv('GOOGLE_MAPS_API_KEY')
         if not google_api_key:
@@ -44,84 +115,401 @@ def get_coordinates_from_api(address):
         
         # Format the address for URL
         formatted_address = address.replace(' ', '%20')
-        url = f"https://maps.googleapis.com/maps/api/geocode/json?address={formatted_address}&key={google_api_key}"
+        url = f"{GEOCODE_URL}?address={formatted_address}&key={google_api_key}"
         
-        # Make API request
-        response = requests.get(url, headers={'User-Agent': 'GeoLLM/1.0'})
-        response.raise_for_status()
+        # Make API request over the shared keep-alive session, retrying throttled and failed calls
+        def request_geocode():
+            response = transport.get_session().get(url)
+            response.raise_for_status()
+            data = response.json()
+            if data.get('status') == 'OVER_QUERY_LIMIT':
+                raise transport.RetryableError("Geocoding quota exceeded", throttled=True)
+            if data.get('status') == 'UNKNOWN_ERROR':
+                raise transport.RetryableError("Geocoding server error")
+            return data
         
-        data = response.json()
+        data = transport.call_with_retries(request_geocode, transport.geo_limiter)
         
         # Check if we got results
         if data.get('status') == 'OK' and data.get('results') and len(data['results']) > 0:
             location = data['results'][0]['geometry']['location']
             latitude = location['lat']
             longitude = location['lng']
+            if geocode_cache is not None:
+                geocode_cache.put(address, latitude, longitude)
             return f"{latitude}, {longitude}"
         else:
-            return "Error: No coordinates found"
+            # Only remember definite misses, not quota or request errors
+            if geocode_cache is not None and data.get('status') == 'ZERO_RESULTS':
+                geocode_cache.put(address)
+            return NO_COORDINATES
             
     except Exception as e:
         return f"Error: {str(e)}"
 
-def process_text_file(client, file_path, model="gpt-4.1-mini"):
-    """Process a single text file and extract coordinates"""
+# Address extraction prompt; it is part of the LLM cache key, so editing it invalidates cached answers
+PROMPT_TEMPLATE = (
+    "Saya membutuhkan bantuan anda untuk memberikan alamat yang akurat dari "
+    "text yang diberikan di bawah ini:\n\n"
+    "{text}"
+    "\n\nBerikan langsung jawaban alamat tanpa tambahan kata-kata lain. "
+    "Apabila memungkinkan, berikan alamat dalam format\n\n"
+    "<kelurahan>%20<kecamatan>%20<kota>%20Indonesia\n\n"
+    "Bila informasi tidak lengkap, berikan saja alamat yang tersedia. "
+    "Bila terdapat lebih dari satu alamat, berikan satu alamat yang paling relevan. "
+    "Ubah spasi menjadi '%20' untuk format URL.\n\n"
+)
+
+def build_prompt(text):
+    """Create the address extraction prompt for a post"""
+    return PROMPT_TEMPLATE.format(text=text)
+
+# Optional PostDump serving posts from one JSONL dump instead of .txt files (set up in main)
+post_dump = None
+
+# (size, mtime, sha256) of each post as it was read for extraction, by path, so the
+# manifest records the content a result came from even if the file changes mid-run
+input_versions = {}
+
+def read_text_file(file_path):
+    """Read a post text file, or the post a --dump holds for that path"""
+    if post_dump is not None:
+        text = post_dump.read_path(file_path)
+        if text is not None:
+            if input_manifest is not None:
+                from changes import content_hash
+                input_versions.setdefault(os.path.normpath(file_path),
+                                          (None, None, content_hash(text.encode('utf-8'))))
+            return text.strip()
+    with open(file_path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        data = f.read()
+    if input_manifest is not None:
+        from changes import content_hash
+        # The first read wins: it is the one the prompt was built from
+        input_versions.setdefault(os.path.normpath(file_path),
+                                  (stat.st_size, stat.st_mtime, content_hash(data)))
+    return data.decode('utf-8').replace('\r\n', '\n').strip()
+
+def forget_input_version(file_path):
+    """Drop the read-time version of a post, so saving its result leaves it pending"""
+    return input_versions.pop(os.path.normpath(file_path), None)
+
+# Strip scrape noise from posts before building prompts (set up in main)
+clean_inputs = True
+
+# Keyword arguments for text_cleaner.clean_post_text (set up in main)
+clean_options = {}
+
+def load_post_text(file_path):
+    """Read a post, strip scrape noise and return (text, log message)"""
+    with trace("read"):
+        raw = read_text_file(file_path)
+        if not clean_inputs:
+            return raw, None
+        from text_cleaner import clean_post_text, cleaning_stats
+        text = clean_post_text(raw, **clean_options)
+        bytes_removed, tokens_removed = cleaning_stats(raw, text)
+    return text, f"  Cleaned: removed {bytes_removed} bytes (~{tokens_removed} tokens)"
+
+# Optional LLMCache of previous answers (set up in main)
+llm_cache = None
+
+# Optional FastPathRouter answering confident posts without the LLM (set up in main)
+fast_path = None
+
+def route_fast_path(text):
+    """(answer, FastResult) from the rule-based extractor; answer is None when the LLM should decide"""
+    if fast_path is None:
+        return None, None
+    result, local = fast_path.route(text)
+    return (result.address if local else None), result
+
+def extract_address(client, text, model="gpt-4.1-mini", on_usage=None, use_fast_path=True):
+    """
+    Ask the model for the most relevant address in a post. on_usage is called
+    with the token usage of an LLM call; use_fast_path=False always asks the model.
+    """
+    if llm_cache is not None:
+        cached = llm_cache.get(PROMPT_TEMPLATE, text, model, TEMPERATURE)
+        if cached is not None:
+            return cached
+    
+    fast_result = None
+    if use_fast_path:
+        answer, fast_result = route_fast_path(text)
+        if answer is not None:
+            return answer
+    
+    with trace("prompt"):
+        prompt = build_prompt(text)
     try:
-        # Read the text file
-        with open(file_path, 'r', encoding='utf-8') as f:
-            text = f.read().strip()
-        
-        # Create prompt for address extraction
-        prompt = (
-            "Saya membutuhkan bantuan anda untuk memberikan alamat yang akurat dari "
-            "text yang diberikan di bawah ini:\n\n"
-            f"{text}"
-            "\n\nBerikan langsung jawaban alamat tanpa tambahan kata-kata lain. "
-            "Apabila memungkinkan, berikan alamat dalam format\n\n"
-            "<kelurahan>%20<kecamatan>%20<kota>%20Indonesia\n\n"
-            "Bila informasi tidak lengkap, berikan saja alamat yang tersedia. "
-            "Bila terdapat lebih dari satu alamat, berikan satu alamat yang paling relevan. "
-            "Ubah spasi menjadi '%20' untuk format URL.\n\n"
-        )
+        content, usage = chat_completion(client, prompt, model)
+    except Exception as e:
+        return f"Error: {str(e)}"
+    if on_usage is not None:
+        on_usage(usage)
+    address = content.strip()
+    if fast_result is not None:
+        fast_path.compare(fast_result, address)
+    
+    # Apologies are not cached so deleting them with recheck.py really retries the post
+    if llm_cache is not None and "maaf" not in address.lower():
+        tokens = usage.total_tokens if usage is not None else 0
+        llm_cache.put(PROMPT_TEMPLATE, text, model, TEMPERATURE, address, tokens)
+    return address
+
+def format_result(address, coordinates):
+    """Format the contents of a coordinate file"""
+    return f"Address: {address}\nCoordinates: {coordinates}"
+
+def write_coordinate_file(coordinate_file, content):
+    """Write a coordinate file atomically so partial results are never left behind"""
+    tmp_file = f"{coordinate_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_file, coordinate_file)
+
+# Optional ResultStore used instead of per-file .loc outputs (set up in main)
+result_store = None
+
+# Optional InputManifest of input content hashes, to reprocess edited posts (set up in main)
+input_manifest = None
+
+# Optional DeadLetterQueue of inputs that failed, for replaying later (set up in main)
+dead_letters = None
+
+def record_failure(year, txt_file, error):
+    """Queue a failed input for --replay-dead-letters"""
+    if dead_letters is not None:
+        dead_letters.add(year, txt_file, error)
+
+def save_response(year, txt_file, coordinate_file, response):
+    """Persist a result to the result store, or to its .loc file; returns True on success"""
+    if "Error" in response:
+        record_failure(year, txt_file, response)
+    # A result whose input was not read in this run (e.g. a resumed batch) is adopted on the next check
+    version = forget_input_version(txt_file)
+    with trace("write") as span:
+        if "Error" in response:
+            span["error"] = response
+        if result_store is not None:
+            text = post_dump.read_path(txt_file) if post_dump is not None else None
+            return result_store.record_response(year, txt_file, response, text, version)
+        if "Error" in response:
+            return False
+        write_coordinate_file(coordinate_file, response)
+        if input_manifest is not None and version is not None:
+            post_id = os.path.splitext(os.path.basename(txt_file))[0]
+            input_manifest.record(txt_file, year, post_id, version=version)
+    return True
+
+def is_done(year, txt_file, coordinate_file, done_keys=None):
+    """Whether a post already has a result for its current contents"""
+    if result_store is not None:
+        post_id = os.path.splitext(os.path.basename(txt_file))[0]
+        if done_keys is not None:
+            done = (year, post_id) in done_keys
+        else:
+            done = result_store.is_processed(year, post_id)
+    else:
+        done = os.path.exists(coordinate_file)
+    
+    # Posts edited since their result was written are processed again
+    if done and input_manifest is not None:
+        post_id = os.path.splitext(os.path.basename(txt_file))[0]
+        if input_manifest.is_changed(txt_file, year, post_id):
+            return False
+    return done
+
+def coordinate_path(txt_file):
+    """Return the coordinate file path for a text file"""
+    name_without_ext = os.path.splitext(os.path.basename(txt_file))[0]
+    return os.path.join(os.path.dirname(txt_file), f"{name_without_ext}_coordinate.loc")
+
+def post_key(year, txt_file):
+    """Stable post id: <year>-<file id>"""
+    return f"{year}-{os.path.splitext(os.path.basename(txt_file))[0]}"
+
+def find_pending_files(base_dir="yearly_result", years=range(2010, 2026), verbose=True):
+    """List (year, txt_file, coordinate_file) for every text file without a result yet"""
+    pending = []
+    done_keys = result_store.processed_keys() if result_store is not None else None
+    if post_dump is not None:
+        jobs = post_dump.jobs(base_dir, years)
+        if result_store is None:
+            # Only the .loc results are written under base_dir
+            for folder in {os.path.dirname(coordinate_file) for _, _, coordinate_file in jobs}:
+                os.makedirs(folder, exist_ok=True)
+        return [job for job in jobs if not is_done(*job, done_keys)]
+    for year in years:
+        output_banjir_folder = os.path.join(base_dir, f"result_{year}", "output_banjir")
         
-        # Get AI response for address
-        address_response = chat_with_openai(client, prompt, model)
+        if not os.path.exists(output_banjir_folder):
+            if verbose:
+                print(f"Skipping {year} - output_banjir folder not found")
+            continue
         
-        # Clean up the address response
-        address = address_response.strip()
+        txt_files = glob.glob(os.path.join(output_banjir_folder, "*.txt"))
+        for txt_file in txt_files:
+            coordinate_file = coordinate_path(txt_file)
+            if not is_done(year, txt_file, coordinate_file, done_keys):
+                pending.append((year, txt_file, coordinate_file))
+    return pending
+
+# Optional ModelCascade trying cheaper models first (set up in main)
+cascade = None
+
+def process_text_file(client, file_path, model="gpt-4.1-mini"):
+    """Process a single text file and extract coordinates"""
+    try:
+        # Read the text file and strip scrape noise
+        text, cleaning_message = load_post_text(file_path)
+        if cleaning_message:
+            print(cleaning_message)
         
-        # Get coordinates from API
-        coordinates = get_coordinates_from_api(address)
+        if cascade is not None:
+            # Cheaper models first, escalating answers that fail validation
+            address, coordinates = cascade.resolve(client, text)
+            if address.startswith("Error"):
+                return address
+        else:
+            # Get AI response for address
+            address = extract_address(client, text, model)
+            if address.startswith("Error"):
+                # Recorded as a failure by save_response; geocoding the error text would waste quota
+                return address
+            
+            # Get coordinates from API
+            coordinates = get_coordinates_from_api(address)
         
         # Return both address and coordinates
-        result = f"Address: {address}\nCoordinates: {coordinates}"
+        result = format_result(address, coordinates)
         print(result)
         return result
         
     except Exception as e:
         return f"Error processing file {file_path}: {str(e)}"
 
-def main():
-    """Process all text files in yearly_result folders"""
-    print("OpenAI Coordinate Extraction")
-    print("=" * 30)
-    
-    # Initialize OpenAI client
-    client = setup_openai_client()
-    if not client:
-        return
-    
-    # Use the specified model with search capabilities
-    model = "gpt-4.1-mini"
-    print(f"Using model: {model} (with web search capabilities)")
-    print()
-    
-    # Base directory
-    base_dir = "yearly_result"
-    
-    # Process each year from 2010 to 2025
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Extract coordinates from flood reports")
+    parser.add_argument('--base-dir', default="yearly_result", help="Input directory")
+    parser.add_argument('--model', default="gpt-4.1-mini", help="OpenAI model")
+    parser.add_argument('--concurrent', action='store_true',
+                        help="Process many files at once with separate LLM and geocoding pools")
+    parser.add_argument('--llm-workers', type=int, default=8, help="Concurrent OpenAI calls")
+    parser.add_argument('--llm-rpm', type=float, default=500, help="OpenAI requests per minute (0 = unlimited)")
+    parser.add_argument('--geo-workers', type=int, default=8, help="Concurrent geocoding calls")
+    parser.add_argument('--geo-rpm', type=float, default=3000, help="Geocoding requests per minute (0 = unlimited)")
+    parser.add_argument('--geocode-cache', default=os.getenv('GEOCODE_CACHE', "geocode_cache.sqlite"),
+                        help="SQLite geocoding cache file")
+    parser.add_argument('--no-geocode-cache', action='store_true', help="Always call the geocoding API")
+    parser.add_argument('--store', default=os.getenv('RESULT_STORE'),
+                        help="SQLite result store to write results to instead of per-file .loc files")
+    parser.add_argument('--manifest', default=os.getenv('INPUT_MANIFEST', "input_manifest.sqlite"),
+                        help="Input hash manifest used to reprocess edited posts (ignored with --store)")
+    parser.add_argument('--no-track-changes', action='store_true',
+                        help="Skip any post with a result even if its text changed")
+    parser.add_argument('--max-attempts', type=int, default=5,
+                        help="Attempts per API call before giving up (with jittered exponential backoff)")
+    parser.add_argument('--target-latency', type=float,
+                        help="Seconds per OpenAI call above which concurrency is reduced")
+    parser.add_argument('--dead-letter', default="dead_letter.jsonl",
+                        help="JSONL file collecting inputs that failed after all retries")
+    parser.add_argument('--replay-dead-letters', action='store_true',
+                        help="Reprocess the inputs collected in the dead-letter file")
+    parser.add_argument('--gazetteer', default=os.getenv('GAZETTEER_CSV'),
+                        help="CSV of kelurahan/kecamatan/kota centroids to geocode offline before calling Google")
+    parser.add_argument('--llm-cache', default=os.getenv('LLM_CACHE', "llm_cache.sqlite"),
+                        help="SQLite cache of model answers")
+    parser.add_argument('--llm-cache-size', type=int, default=100000,
+                        help="Maximum cached answers before least recently used ones are evicted")
+    parser.add_argument('--no-llm-cache', action='store_true', help="Always call OpenAI")
+    parser.add_argument('--no-clean', action='store_true', help="Send raw scraped text to the model")
+    parser.add_argument('--drop-comments', action='store_true', default=bool(os.getenv('CLEAN_DROP_COMMENTS')),
+                        help="Send only the post body, without its comment thread")
+    parser.add_argument('--min-line-length', type=int, default=int(os.getenv('CLEAN_MIN_LINE_LENGTH', 2)),
+                        help="Drop cleaned lines shorter than this many characters")
+    parser.add_argument('--noise-line', action='append', default=[],
+                        help="Extra page-chrome line to drop, matched whole and case-insensitively (repeatable)")
+    parser.add_argument('--noise-pattern', action='append', default=[],
+                        help="Extra regular expression; lines it matches are dropped (repeatable)")
+    parser.add_argument('--watch', action='store_true',
+                        help="Keep running and process new or edited posts as they land")
+    parser.add_argument('--watch-interval', type=float, default=10, help="Seconds between watch polls")
+    parser.add_argument('--pack', action='store_true',
+                        help="Extract addresses for several posts per OpenAI call")
+    parser.add_argument('--pack-tokens', type=int, default=6000, help="Prompt token budget per packed call")
+    parser.add_argument('--pack-size', type=int, default=20, help="Maximum posts per packed call")
+    parser.add_argument('--pack-baseline', type=int, default=2,
+                        help="Posts sent as single-post calls to compare throughput against (0 = none)")
+    parser.add_argument('--fast-path', action='store_true',
+                        help="Answer posts that state their location plainly with local rules instead of the LLM")
+    parser.add_argument('--fast-threshold', type=float, default=0.5,
+                        help="Rule-based confidence needed to skip the LLM (tune with fastpath.py --evaluate)")
+    parser.add_argument('--fast-audit', type=float, default=0.0,
+                        help="Share of confident posts also sent to the LLM to keep measuring agreement")
+    parser.add_argument('--dedup', action='store_true',
+                        help="Send one post per cluster of near-duplicates to the LLM and copy its result "
+                             "(with --concurrent, --pack or --batch)")
+    parser.add_argument('--dedup-threshold', type=float, default=0.8,
+                        help="Estimated Jaccard similarity at which posts count as duplicates")
+    parser.add_argument('--trace', help="Append a JSONL trace of stage timings and token usage to this file")
+    parser.add_argument('--metrics', help="Write a per-year summary here: .csv for CSV, anything else for Prometheus text")
+    parser.add_argument('--batch', action='store_true',
+                        help="Extract addresses through the OpenAI Batch API instead of per-file calls")
+    parser.add_argument('--batch-id', help="Resume polling and collecting an already submitted batch")
+    parser.add_argument('--batch-file', default="batch_requests.jsonl", help="Batch request JSONL file")
+    parser.add_argument('--poll-interval', type=float, default=30, help="Seconds between batch status checks")
+    parser.add_argument('--cascade', metavar="MODELS",
+                        help="Comma-separated models, cheapest first; answers failing validation are "
+                             "retried on the next model (replaces --model)")
+    parser.add_argument('--dump', help="Read posts from this JSONL dump (.gz allowed) instead of "
+                                       "result_<year>/output_banjir/*.txt files")
+    parser.add_argument('--queue', help="Shared work queue SQLite file; claim leased jobs from it so several "
+                                        "processes or machines can run together")
+    parser.add_argument('--worker-id', help="Name of this worker in the queue (default: <host>-<pid>)")
+    parser.add_argument('--shard', default="0/1", help="Only take jobs of shard K out of N, given as K/N")
+    parser.add_argument('--shard-by', choices=["hash", "year"], default="hash",
+                        help="Split shards by post key hash or by year")
+    parser.add_argument('--lease', type=float, default=300, help="Seconds a claimed job stays leased without a heartbeat")
+    parser.add_argument('--claim-size', type=int, default=16, help="Jobs claimed from the queue at a time")
+    args = parser.parse_args(argv)
+    if args.dump and (args.watch or not (args.concurrent or args.pack or args.batch or args.batch_id
+                                         or args.queue or args.replay_dead_letters)):
+        parser.error("--dump works with --concurrent, --pack, --batch, --queue or --replay-dead-letters")
+    if args.cascade:
+        args.cascade = [model.strip() for model in args.cascade.split(",") if model.strip()]
+        if not args.cascade:
+            parser.error("--cascade needs at least one model")
+        if args.pack or args.batch or args.batch_id:
+            parser.error("--cascade works with the sequential, --concurrent, --watch and --queue modes")
+        args.model = args.cascade[-1]
+    if args.queue:
+        if args.replay_dead_letters or args.watch or args.batch or args.batch_id or args.pack or args.dedup:
+            parser.error("--queue runs the concurrent pipeline and cannot be combined with other modes")
+        from coordinator import parse_shard
+        try:
+            args.shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+    from text_cleaner import cleaner_options
+    try:
+        args.clean_options = cleaner_options(not args.drop_comments, args.min_line_length,
+                                             args.noise_line, args.noise_pattern)
+    except re.error as e:
+        parser.error(f"Invalid --noise-pattern: {e}")
+    if args.dedup and (args.replay_dead_letters or args.watch or args.batch_id
+                       or not (args.concurrent or args.pack or args.batch)):
+        parser.error("--dedup works with --concurrent, --pack or --batch")
+    return args
+
+def run_sequential(client, base_dir, model):
+    """Process every year one file at a time"""
     total_processed = 0
     total_errors = 0
+    done_keys = result_store.processed_keys() if result_store is not None else None
     
     for year in range(2010, 2026):
         year_folder = os.path.join(base_dir, f"result_{year}")
@@ -148,41 +536,217 @@ def main():
                 name_without_ext = os.path.splitext(filename)[0]
                 
                 # Create coordinate filename
-                coordinate_file = os.path.join(output_banjir_folder, f"{name_without_ext}_coordinate.loc")
+                coordinate_file = coordinate_path(txt_file)
                 
-                # Skip if coordinate file already exists
-                if os.path.exists(coordinate_file):
+                # Skip if a result already exists
+                if is_done(year, txt_file, coordinate_file, done_keys):
                     print(f"  Skipping {filename} - coordinate file already exists")
                     continue
                 
                 print(f"Processing: {year}-{filename}")
                 
-                # Process the file
-                response = process_text_file(client, txt_file, model)
-                
-                if "Error" in response:
+                # Process the file and save the response
+                with trace_posts(post_key(year, txt_file)):
+                    response = process_text_file(client, txt_file, model)
+                    saved = save_response(year, txt_file, coordinate_file, response)
+                if not saved:
                     print(f"  Error processing {filename}: {response}")
                     total_errors += 1
                     continue
-
-                # Save the response
-                with open(coordinate_file, 'w', encoding='utf-8') as f:
-                    f.write(response)
                 
                 total_processed += 1
                 print(f"  Saved: {name_without_ext}_coordinate.loc")
                 
             except Exception as e:
                 total_errors += 1
+                record_failure(year, txt_file, str(e))
                 print(f"  Error processing {filename}: {str(e)}")
         
         print(f"Completed {year}\n")
     
+    return total_processed, total_errors
+
+# DedupPlan of the current run when --dedup is used (set up in pending_jobs)
+dedup_plan = None
+
+def pending_jobs(args):
+    """Pending jobs for the job-based modes, reduced to cluster representatives with --dedup"""
+    global dedup_plan
+    jobs = find_pending_files(args.base_dir)
+    if not args.dedup:
+        return jobs
+    from dedup import deduplicate
+    dedup_plan = deduplicate(jobs, args.base_dir, args.dedup_threshold)
+    print(dedup_plan.summary())
+    return dedup_plan.representatives
+
+def main(argv=None):
+    """Process all text files in yearly_result folders"""
+    global geocode_cache, llm_cache, clean_inputs, clean_options, gazetteer, result_store, input_manifest, dead_letters, tracer, fast_path, cascade, post_dump
+    args = parse_args(argv)
+    
+    print("OpenAI Coordinate Extraction")
+    print("=" * 30)
+    
+    # Initialize OpenAI client
+    client = setup_openai_client()
+    if not client:
+        return
+    
+    # Use the specified model with search capabilities
+    model = args.model
+    if args.cascade:
+        print(f"Using model cascade: {' -> '.join(args.cascade)}")
+    else:
+        print(f"Using model: {model} (with web search capabilities)")
+    print()
+    
+    clean_inputs = not args.no_clean
+    clean_options = args.clean_options
+    
+    transport.MAX_ATTEMPTS = args.max_attempts
+    transport.llm_limiter.configure(initial=args.llm_workers, maximum=args.llm_workers,
+                                    target_latency=args.target_latency)
+    transport.geo_limiter.configure(initial=args.geo_workers, maximum=args.geo_workers)
+    dead_letters = transport.DeadLetterQueue(args.dead_letter)
+    if args.trace or args.metrics:
+        from telemetry import Tracer
+        tracer = Tracer(args.trace)
+    
+    if args.store:
+        from result_store import ResultStore
+        result_store = ResultStore(args.store)
+        print(f"Writing results to {args.store}")
+    if not args.no_track_changes:
+        if result_store is not None:
+            input_manifest = result_store.manifest
+        else:
+            from changes import InputManifest
+            input_manifest = InputManifest(args.manifest)
+    
+    if args.dump:
+        from dump import PostDump
+        post_dump = PostDump(args.dump)
+        print(f"Reading posts from {args.dump} ({len(post_dump)} posts)")
+    
+    if args.gazetteer:
+        from gazetteer import Gazetteer
+        gazetteer = Gazetteer(args.gazetteer)
+        print(f"Loaded gazetteer with {len(gazetteer)} places from {args.gazetteer}")
+    
+    if args.fast_path:
+        from fastpath import FastPathRouter
+        fast_path = FastPathRouter(args.fast_threshold, args.fast_audit, gazetteer)
+    
+    if args.cascade:
+        from cascade import ModelCascade
+        cascade = ModelCascade(args.cascade)
+    
+    if not args.no_geocode_cache:
+        from geocache import GeocodeCache
+        geocode_cache = GeocodeCache(args.geocode_cache)
+    if not args.no_llm_cache:
+        from llm_cache import LLMCache
+        llm_cache = LLMCache(args.llm_cache, max_entries=args.llm_cache_size)
+    
+    if args.replay_dead_letters:
+        from pipeline import run_concurrent
+        jobs = [(year, txt_file, coordinate_path(txt_file)) for year, txt_file in dead_letters.take()]
+        print(f"Replaying {len(jobs)} inputs from {args.dead_letter}")
+        total_processed, total_errors = run_concurrent(
+            client, jobs, model,
+            llm_workers=args.llm_workers, llm_rpm=args.llm_rpm,
+            geo_workers=args.geo_workers, geo_rpm=args.geo_rpm,
+        )
+        dead_letters.finish_replay()
+    elif args.queue:
+        from coordinator import Coordinator, format_progress, run_worker
+        coordinator = Coordinator(args.queue, worker_id=args.worker_id, lease_seconds=args.lease,
+                                  shard=args.shard, shard_by=args.shard_by)
+        total_processed, total_errors = run_worker(
+            client, coordinator, args.base_dir, model, claim_size=args.claim_size,
+            llm_workers=args.llm_workers, llm_rpm=args.llm_rpm,
+            geo_workers=args.geo_workers, geo_rpm=args.geo_rpm,
+        )
+        print(format_progress(coordinator.progress()))
+        coordinator.close()
+    elif args.watch:
+        from watch import watch
+        total_processed, total_errors = watch(
+            client, args.base_dir, model, interval=args.watch_interval,
+            llm_workers=args.llm_workers, llm_rpm=args.llm_rpm,
+            geo_workers=args.geo_workers, geo_rpm=args.geo_rpm,
+        )
+    elif args.batch or args.batch_id:
+        from batch import run_batch
+        jobs = pending_jobs(args)
+        total_processed, total_errors = run_batch(
+            client, jobs, model, base_dir=args.base_dir,
+            batch_file=args.batch_file, batch_id=args.batch_id,
+            poll_interval=args.poll_interval,
+            geo_workers=args.geo_workers, geo_rpm=args.geo_rpm,
+        )
+    elif args.pack:
+        from packing import run_packed
+        jobs = pending_jobs(args)
+        total_processed, total_errors = run_packed(
+            client, jobs, model,
+            token_budget=args.pack_tokens, max_posts=args.pack_size, baseline_posts=args.pack_baseline,
+            llm_workers=args.llm_workers, llm_rpm=args.llm_rpm,
+            geo_workers=args.geo_workers, geo_rpm=args.geo_rpm,
+        )
+    elif args.concurrent:
+        from pipeline import run_concurrent
+        jobs = pending_jobs(args)
+        total_processed, total_errors = run_concurrent(
+            client, jobs, model,
+            llm_workers=args.llm_workers, llm_rpm=args.llm_rpm,
+            geo_workers=args.geo_workers, geo_rpm=args.geo_rpm,
+        )
+    else:
+        total_processed, total_errors = run_sequential(client, args.base_dir, model)
+    
+    if dedup_plan is not None:
+        from dedup import fan_out
+        copied, copy_errors = fan_out(dedup_plan)
+        total_processed += copied
+        total_errors += copy_errors
+        print(dedup_plan.summary())
+    
     print("=" * 30)
     print(f"Processing complete!")
     print(f"Total files processed: {total_processed}")
     print(f"Total errors: {total_errors}")
+    print(transport.llm_limiter.summary())
+    print(transport.geo_limiter.summary())
+    if dead_letters.added:
+        print(f"{dead_letters.added} failed inputs queued in {args.dead_letter} "
+              f"(replay with --replay-dead-letters)")
+    if gazetteer is not None:
+        print(gazetteer.summary())
+    if fast_path is not None:
+        print(fast_path.summary())
+    if cascade is not None:
+        print(cascade.summary())
+    if tracer is not None:
+        print(tracer.summary())
+        if args.metrics:
+            tracer.write_metrics(args.metrics)
+            print(f"Metrics written to {args.metrics}")
+        tracer.close()
+    if input_manifest is not None:
+        input_manifest.close()
+    if result_store is not None:
+        result_store.close()
+    if geocode_cache is not None:
+        print(geocode_cache.summary())
+        geocode_cache.close()
+    if llm_cache is not None:
+        print(llm_cache.summary())
+        llm_cache.close()
     print("Done!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Run through the importable module so pipeline.py and batch.py see the same caches and settings
+    import main as geollm
+    geollm.main()
\ No newline at end of file
@@ -0,0 +1,294 @@
+import json
+import time
+import threading
+from concurrent.futures import as_completed
+
+import main
+from main import (
+    PROMPT_TEMPLATE,
+    TEMPERATURE,
+    load_post_text,
+    build_prompt,
+    chat_completion,
+    post_key,
+    trace,
+    trace_posts,
+)
+from pipeline import Stage, geocode_and_save
+from text_cleaner import estimate_tokens
+
+PACKED_PROMPT = (
+    "Saya membutuhkan bantuan anda untuk memberikan alamat yang akurat dari "
+    "setiap laporan di bawah ini. Setiap laporan diawali dengan ### ID: <id>.\n\n"
+    "{posts}"
+    "\n\nUntuk setiap laporan, berikan satu alamat yang paling relevan. "
+    "Apabila memungkinkan, berikan alamat dalam format\n\n"
+    "<kelurahan>%20<kecamatan>%20<kota>%20Indonesia\n\n"
+    "Bila informasi tidak lengkap, berikan saja alamat yang tersedia. "
+    "Ubah spasi menjadi '%20' untuk format URL. "
+    "Jawab dalam JSON dengan satu entri {{\"id\", \"address\"}} untuk setiap laporan, "
+    "gunakan id persis seperti yang diberikan."
+)
+
+# Structured output schema; the API requires an object at the top level, so the array is wrapped
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "post_addresses",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "results": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "string"},
+                            "address": {"type": "string"},
+                        },
+                        "required": ["id", "address"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["results"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# Bump when PACKED_PROMPT or RESPONSE_FORMAT change in a way that changes answers
+PACK_SCHEMA_VERSION = 1
+
+# llm_cache "template" for per-post answers taken from packed calls; kept apart from
+# PROMPT_TEMPLATE so single-post runs never see packed answers as their own
+PACKED_CACHE_TEMPLATE = f"{PACKED_PROMPT}\n[packed schema v{PACK_SCHEMA_VERSION}]"
+
+# Rough prompt overhead outside the posts themselves
+PACKED_PROMPT_TOKENS = estimate_tokens(PACKED_PROMPT)
+
+def pack_posts(posts, token_budget=6000, max_posts=20):
+    """Group (key, text) posts into packs that stay under a prompt token budget"""
+    packs = []
+    current = []
+    used = PACKED_PROMPT_TOKENS
+    for key, text in posts:
+        cost = estimate_tokens(text) + 10
+        if current and (used + cost > token_budget or len(current) >= max_posts):
+            packs.append(current)
+            current = []
+            used = PACKED_PROMPT_TOKENS
+        current.append((key, text))
+        used += cost
+    if current:
+        packs.append(current)
+    return packs
+
+def build_packed_prompt(pack):
+    """Create one prompt covering every post in a pack"""
+    posts = "\n\n".join(f"### ID: {key}\n{text}" for key, text in pack)
+    return PACKED_PROMPT.format(posts=posts)
+
+def parse_packed_response(content, expected_ids):
+    """
+    Validate a packed answer against the schema and the ids that were sent.
+    Returns {id: address}, or None when the count or id mapping is wrong.
+    """
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError):
+        return None
+    results = data.get("results") if isinstance(data, dict) else None
+    if not isinstance(results, list) or len(results) != len(expected_ids):
+        return None
+
+    answers = {}
+    for item in results:
+        if not isinstance(item, dict) or set(item) != {"id", "address"}:
+            return None
+        if not isinstance(item["id"], str) or not isinstance(item["address"], str):
+            return None
+        answers[item["id"]] = item["address"].strip()
+    if set(answers) != set(expected_ids):
+        return None
+    return answers
+
+class PackingStats:
+    """Counters for comparing packed calls with single-post calls"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.packed_calls = 0
+        self.packed_posts = 0
+        self.packed_seconds = 0.0
+        self.failed_packs = 0
+        self.single_calls = 0
+        self.single_seconds = 0.0
+        self.fallback_packs = 0
+
+    def add_packed(self, posts, seconds):
+        with self.lock:
+            self.packed_calls += 1
+            self.packed_posts += posts
+            self.packed_seconds += seconds
+
+    def add_failed_pack(self):
+        """A packed call that errored or came back invalid; its time is left out of the packed rate"""
+        with self.lock:
+            self.failed_packs += 1
+            self.fallback_packs += 1
+
+    def add_single(self, seconds):
+        with self.lock:
+            self.single_calls += 1
+            self.single_seconds += seconds
+
+    def summary(self):
+        lines = [
+            f"Packed mode: {self.packed_posts} posts in {self.packed_calls} calls, "
+            f"{self.single_calls} single-post calls ({self.fallback_packs} packs fell back)"
+        ]
+        packed_rate = self.packed_posts / self.packed_seconds if self.packed_seconds else None
+        single_rate = self.single_calls / self.single_seconds if self.single_seconds else None
+        line = "  LLM throughput: packed " + (f"{packed_rate:.2f}" if packed_rate else "n/a")
+        line += " vs single-post " + (f"{single_rate:.2f}" if single_rate else "n/a (no baseline calls)")
+        line += " posts per call-second"
+        if packed_rate and single_rate:
+            line += f" ({packed_rate / single_rate:.1f}x)"
+        lines.append(line)
+        posts = self.packed_posts + self.single_calls
+        calls = self.packed_calls + self.single_calls
+        if calls:
+            lines.append(f"  API calls: {calls} for {posts} posts ({posts / calls:.1f} posts per call)")
+        return "\n".join(lines)
+
+def extract_single(client, key, text, model, stats):
+    """
+    One post through the single-post prompt, for fallbacks and the baseline sample.
+    Cache and fast-path checks already happened in run_packed, so the model is called directly.
+    """
+    start = time.monotonic()
+    with trace_posts(key):
+        with trace("prompt"):
+            prompt = build_prompt(text)
+        try:
+            content, usage = chat_completion(client, prompt, model)
+        except Exception as e:
+            return f"Error: {str(e)}"
+    stats.add_single(time.monotonic() - start)
+    address = content.strip()
+    if main.llm_cache is not None and "maaf" not in address.lower():
+        tokens = usage.total_tokens if usage is not None else 0
+        main.llm_cache.put(PROMPT_TEMPLATE, text, model, TEMPERATURE, address, tokens)
+    return address
+
+def extract_baseline(client, key, text, model, stats):
+    """{key: address} for a baseline post, shaped like an extract_pack result"""
+    return {key: extract_single(client, key, text, model, stats)}
+
+def extract_pack(client, pack, model, stats):
+    """Extract addresses for a pack, falling back to per-post calls if the answer is invalid"""
+    start = time.monotonic()
+    answers = None
+    try:
+        with trace_posts(*[key for key, _ in pack]):
+            with trace("prompt"):
+                prompt = build_packed_prompt(pack)
+            content, usage = chat_completion(
+                client, prompt, model,
+                response_format=RESPONSE_FORMAT,
+            )
+        answers = parse_packed_response(content, [key for key, _ in pack])
+    except Exception as e:
+        print(f"  Packed call failed: {str(e)}")
+        usage = None
+
+    if answers is not None:
+        stats.add_packed(len(pack), time.monotonic() - start)
+        if main.llm_cache is not None:
+            tokens = usage.total_tokens // len(pack) if usage is not None else 0
+            for key, text in pack:
+                if "maaf" not in answers[key].lower():
+                    main.llm_cache.put(PACKED_CACHE_TEMPLATE, text, model, TEMPERATURE, answers[key], tokens)
+        return answers
+
+    stats.add_failed_pack()
+    return {key: extract_single(client, key, text, model, stats) for key, text in pack}
+
+def run_packed(client, jobs, model="gpt-4.1-mini", token_budget=6000, max_posts=20,
+               llm_workers=4, llm_rpm=500, geo_workers=8, geo_rpm=3000, baseline_posts=2):
+    """
+    Process jobs by packing several cleaned posts into each chat completion,
+    then geocode each answer into the usual _coordinate.loc files. The first
+    baseline_posts posts go through single-post calls instead, so every run
+    can compare packed throughput with single-post throughput.
+    """
+    by_key = {}
+    posts = []
+    cached = {}
+    fast_results = {}
+    for job in jobs:
+        key = post_key(job[0], job[1])
+        with trace_posts(key):
+            text, _ = load_post_text(job[1])
+        by_key[key] = job
+        if main.llm_cache is not None:
+            # One lookup per post, whichever prompt answered it before
+            answer = main.llm_cache.get_any((PROMPT_TEMPLATE, PACKED_CACHE_TEMPLATE), text, model, TEMPERATURE)
+            if answer is not None:
+                cached[key] = answer
+                continue
+        answer, fast_results[key] = main.route_fast_path(text)
+        if answer is not None:
+            cached[key] = answer
+            continue
+        posts.append((key, text))
+
+    # Only sample a baseline when packing still leaves posts to pack
+    baseline = posts[:baseline_posts] if len(posts) > baseline_posts else []
+    posts = posts[len(baseline):]
+    packs = pack_posts(posts, token_budget, max_posts)
+    print(f"Packed {len(posts)} posts into {len(packs)} requests "
+          f"({len(cached)} answered from cache or local rules, {len(baseline)} single-post baseline calls)")
+
+    stats = PackingStats()
+    llm_stage = Stage("llm", llm_workers, llm_rpm)
+    geo_stage = Stage("geocode", geo_workers, geo_rpm)
+    geo_futures = []
+    total_errors = 0
+    try:
+        for key, address in cached.items():
+            geo_futures.append(geo_stage.submit(geocode_and_save, *by_key[key], address))
+
+        pack_futures = [llm_stage.submit(extract_pack, client, pack, model, stats) for pack in packs]
+        pack_futures += [llm_stage.submit(extract_baseline, client, key, text, model, stats)
+                         for key, text in baseline]
+        for future in as_completed(pack_futures):
+            try:
+                answers = future.result()
+            except Exception as e:
+                total_errors += 1
+                print(f"  Error processing pack: {str(e)}")
+                continue
+            for key, address in answers.items():
+                if fast_results.get(key) is not None:
+                    main.fast_path.compare(fast_results[key], address)
+                geo_futures.append(geo_stage.submit(geocode_and_save, *by_key[key], address))
+
+        total_processed = 0
+        for future in as_completed(geo_futures):
+            try:
+                if future.result():
+                    total_processed += 1
+                else:
+                    total_errors += 1
+            except Exception as e:
+                total_errors += 1
+                print(f"  Error saving result: {str(e)}")
+    finally:
+        llm_stage.shutdown()
+        geo_stage.shutdown()
+
+    print(stats.summary())
+    return total_processed, total_errors
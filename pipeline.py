@@ -0,0 +1,143 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import main
+from main import (
+    load_post_text,
+    extract_address,
+    get_coordinates_from_api,
+    format_result,
+    save_response,
+    record_failure,
+    post_key,
+    trace_posts,
+)
+
+class RateLimiter:
+    """Spread calls out so no more than `rpm` start in any minute"""
+
+    def __init__(self, rpm):
+        self.interval = 60.0 / rpm if rpm else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until the next call slot is free"""
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+class Stage:
+    """A worker pool with its own concurrency and rate limit"""
+
+    def __init__(self, name, workers, rpm):
+        self.name = name
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self.limiter = RateLimiter(rpm)
+
+    def submit(self, fn, *args):
+        def call():
+            self.limiter.acquire()
+            return fn(*args)
+        return self.executor.submit(call)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+def geocode_and_save(year, txt_file, coordinate_file, address, log=print, coordinates=None):
+    """
+    Geocode an extracted address (unless coordinates are already known) and write
+    its coordinate file; returns True on success
+    """
+    filename = os.path.basename(txt_file)
+    with trace_posts(post_key(year, txt_file)):
+        if address.startswith("Error"):
+            # The LLM stage gave up: record the failure without spending a geocoding request
+            save_response(year, txt_file, coordinate_file, address)
+            log(f"  Error processing {year}-{filename}: {address}")
+            return False
+        if coordinates is None:
+            coordinates = get_coordinates_from_api(address)
+        response = format_result(address, coordinates)
+        saved = save_response(year, txt_file, coordinate_file, response)
+    if not saved:
+        log(f"  Error processing {year}-{filename}: {response}")
+        return False
+    log(f"  Saved: {year}-{os.path.basename(coordinate_file)}\n{response}")
+    return True
+
+def run_concurrent(client, jobs, model="gpt-4.1-mini",
+                   llm_workers=8, llm_rpm=500, geo_workers=8, geo_rpm=3000):
+    """
+    Process (year, txt_file, coordinate_file) jobs with overlapping LLM and geocoding stages.
+    Each LLM result is handed to the geocoding pool as soon as it arrives, and every
+    coordinate file is written atomically so resume-by-skip keeps working.
+    """
+    llm_stage = Stage("llm", llm_workers, llm_rpm)
+    geo_stage = Stage("geocode", geo_workers, geo_rpm)
+    print_lock = threading.Lock()
+
+    def log(message):
+        with print_lock:
+            print(message)
+
+    def extract(year, txt_file, coordinate_file):
+        with trace_posts(post_key(year, txt_file)):
+            text, cleaning_message = load_post_text(txt_file)
+            if cleaning_message:
+                log(f"  {year}-{os.path.basename(txt_file)} {cleaning_message.strip()}")
+            if main.cascade is not None:
+                # The cascade geocodes to validate each answer, so only the write is left
+                address, coordinates = main.cascade.resolve(client, text)
+                return geo_stage.submit(geocode_and_save, year, txt_file, coordinate_file, address, log, coordinates)
+            address = extract_address(client, text, model)
+        return geo_stage.submit(geocode_and_save, year, txt_file, coordinate_file, address, log)
+
+    print(f"Processing {len(jobs)} files concurrently "
+          f"(LLM: {llm_workers} workers @ {llm_rpm or 'unlimited'} rpm, "
+          f"geocoding: {geo_workers} workers @ {geo_rpm or 'unlimited'} rpm)")
+
+    total_processed = 0
+    total_errors = 0
+    start = time.monotonic()
+
+    try:
+        llm_futures = {llm_stage.submit(extract, *job): job for job in jobs}
+        geo_futures = {}
+        for future in as_completed(llm_futures):
+            year, txt_file, _ = llm_futures[future]
+            try:
+                geo_futures[future.result()] = llm_futures[future]
+            except Exception as e:
+                total_errors += 1
+                record_failure(year, txt_file, str(e))
+                log(f"  Error processing {year}-{os.path.basename(txt_file)}: {str(e)}")
+
+        for future in as_completed(geo_futures):
+            year, txt_file, _ = geo_futures[future]
+            try:
+                if future.result():
+                    total_processed += 1
+                else:
+                    total_errors += 1
+            except Exception as e:
+                total_errors += 1
+                record_failure(year, txt_file, str(e))
+                log(f"  Error processing {year}-{os.path.basename(txt_file)}: {str(e)}")
+    finally:
+        llm_stage.shutdown()
+        geo_stage.shutdown()
+
+    elapsed = time.monotonic() - start
+    if jobs and elapsed > 0:
+        print(f"Finished {len(jobs)} files in {elapsed:.1f}s ({len(jobs) / elapsed:.2f} files/s)")
+
+    return total_processed, total_errors
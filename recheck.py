@@ -1,93 +1,66 @@
 import os
 import glob
-import shutil
-from urllib.parse import unquote
 
-def process_coordinate_files():
-    """
-    Iterate through all coordinate files and process them according to requirements:
-    1. If address contains "maaf", prompt user to delete
-    2. If not, append first 2 lines from corresponding .txt file
-    """
-    
-    # Pattern to find all coordinate files
-    pattern = r"yearly_result\result_*\output_banjir\*_coordinate.loc"
-    coordinate_files = glob.glob(pattern, recursive=True)
-    
-    print(f"Found {len(coordinate_files)} coordinate files to process...\n")
-    
-    for coord_file in coordinate_files:
+from validate import COORDINATE_PATTERN as RESULT_PATTERN, apply_fix, validate
+
+BASE_DIR = "yearly_result"
+COORDINATE_PATTERN = os.path.join(BASE_DIR, RESULT_PATTERN)
+
+def print_report(report):
+    """Print the summary of a validate.py report"""
+    summary = report["summary"]
+    counts = ", ".join(f"{issue} {count}" for issue, count in summary.items()
+                       if issue not in ("files", "ok", "applied"))
+    print(f"\nChecked {summary['files']} coordinate files: {summary['ok']} OK"
+          + (f", {counts}" if counts else ""))
+    print(f"Applied {summary['applied']} fixes")
+
+def confirm_deletes(report, rules):
+    """Show each file the report would delete for the given rules and ask before deleting it"""
+    for entry in report["issues"]:
+        if entry["issue"] not in rules:
+            continue
+        coord_file = entry["file"]
+        print(f"Processing: {coord_file}")
+        print("=" * 50)
+        print(f"Rule: {entry['issue']} ({entry['lines']} lines)")
+        print("-" * 20)
         try:
-            # Read the coordinate file
             with open(coord_file, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-            
-            print(f"Processing: {coord_file}")
-            print("=" * 50)
-            
-            # Check if address contains "maaf"
-            if "maaf" in content.lower():
-                print("Content of file:")
-                print(content)
-                print("\nThis file contains 'maaf' in the address.")
-                
-                while True:
-                    user_input = input("Do you want to delete this file? (yes/no): ").lower().strip()
-                    if user_input in ['yes', 'y']:
-                        try:
-                            os.remove(coord_file)
-                            print(f"File {coord_file} deleted successfully.\n")
-                        except Exception as e:
-                            print(f"Error deleting file {coord_file}: {e}\n")
-                        break
-                    elif user_input in ['no', 'n']:
-                        print("File kept.\n")
-                        break
-                    else:
-                        print("Please enter 'yes' or 'no'")
+                print(f.read())
+        except OSError as e:
+            print(f"Error reading {coord_file}: {e}\n")
+            continue
+        print("-" * 20)
+
+        while True:
+            user_input = input("Do you want to delete this file? (yes/no): ").lower().strip()
+            if user_input in ['yes', 'y']:
+                try:
+                    apply_fix(entry)
+                    print(f"File {coord_file} deleted successfully.\n")
+                except Exception as e:
+                    print(f"Error deleting file {coord_file}: {e}\n")
+                break
+            elif user_input in ['no', 'n']:
+                print("File kept.\n")
+                break
             else:
-                # File doesn't contain "maaf", check if it needs POST and DATE lines
-                # Read the coordinate file to count lines
-                with open(coord_file, 'r', encoding='utf-8') as f:
-                    coord_lines = f.readlines()
-                
-                coord_line_count = len(coord_lines)
-                
-                # Only append if file has exactly 2 lines (Address and Coordinates only)
-                if coord_line_count == 2:
-                    # Get the corresponding .txt file
-                    base_name = os.path.basename(coord_file).replace('_coordinate.loc', '.txt')
-                    txt_file = os.path.join(os.path.dirname(coord_file), base_name)
-                    
-                    if os.path.exists(txt_file):
-                        try:
-                            # Read first 2 lines from .txt file
-                            with open(txt_file, 'r', encoding='utf-8') as f:
-                                lines = f.readlines()
-                                first_two_lines = ''.join(lines[:2]).strip()
-                            
-                            # Append to coordinate file
-                            with open(coord_file, 'a', encoding='utf-8') as f:
-                                f.write('\n' + first_two_lines)
-                            
-                            print(f"Appended content from {base_name} to {os.path.basename(coord_file)}")
-                            print(f"Added lines:\n{first_two_lines}\n")
-                            
-                        except Exception as e:
-                            print(f"Error processing {txt_file}: {e}\n")
-                    else:
-                        print(f"Warning: Corresponding .txt file not found: {txt_file}\n")
-                else:
-                    print(f"Skipped: {os.path.basename(coord_file)} already has {coord_line_count} lines (not 2)\n")
-                    
-        except Exception as e:
-            print(f"Error processing {coord_file}: {e}\n")
-        
+                print("Please enter 'yes' or 'no'")
         print("-" * 50)
 
+def process_coordinate_files():
+    """
+    Append POST and DATE from the .txt to 2-line files (validate.py rule needs_post_date),
+    then prompt before deleting each file whose address contains "maaf".
+    """
+    report = validate(BASE_DIR, policy={"needs_post_date"})
+    print_report(report)
+    confirm_deletes(report, {"maaf"})
+
 def show_sample_file():
     """Show a sample of what the files look like"""
-    pattern = r"yearly_result\result_*\output_banjir\*_coordinate.loc"
+    pattern = COORDINATE_PATTERN
     coordinate_files = glob.glob(pattern, recursive=True)
     
     if coordinate_files:
@@ -115,199 +88,44 @@ def show_sample_file():
 
 def check_file_line_count():
     """
-    Check if all coordinate files have exactly 4 lines.
-    If not, show content and prompt user to delete.
+    Report files that do not have exactly 4 lines and prompt before deleting the
+    ones validate.py cannot repair (rule bad_line_count).
     """
-    pattern = r"yearly_result\result_*\output_banjir\*_coordinate.loc"
-    coordinate_files = glob.glob(pattern, recursive=True)
-    
-    print(f"Checking {len(coordinate_files)} coordinate files for 4-line requirement...\n")
-    
-    files_with_issues = 0
-    
-    for coord_file in coordinate_files:
-        try:
-            # Read the coordinate file
-            with open(coord_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            
-            line_count = len(lines)
-            
-            # Check if file has exactly 4 lines
-            if line_count != 4:
-                files_with_issues += 1
-                print(f"Processing: {coord_file}")
-                print("=" * 50)
-                print(f"This file has {line_count} lines instead of 4.")
-                print("\nFile content:")
-                print("-" * 20)
-                
-                # Show content
-                with open(coord_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                print(content)
-                print("-" * 20)
-                
-                while True:
-                    user_input = input("Do you want to delete this file? (yes/no): ").lower().strip()
-                    if user_input in ['yes', 'y']:
-                        try:
-                            os.remove(coord_file)
-                            print(f"File {coord_file} deleted successfully.\n")
-                        except Exception as e:
-                            print(f"Error deleting file {coord_file}: {e}\n")
-                        break
-                    elif user_input in ['no', 'n']:
-                        print("File kept.\n")
-                        break
-                    else:
-                        print("Please enter 'yes' or 'no'")
-                
-                print("-" * 50)
-            else:
-                print(f"✓ {os.path.basename(coord_file)} - OK (4 lines)")
-                
-        except Exception as e:
-            print(f"Error processing {coord_file}: {e}\n")
-    
-    print(f"\nSummary: Found {files_with_issues} files with line count issues.")
+    report = validate(BASE_DIR)
+    print_report(report)
+    fixable = sum(1 for entry in report["issues"] if entry["issue"] in ("needs_post_date", "six_lines"))
+    if fixable:
+        print(f"{fixable} files can be repaired with options 2 and 4")
+    confirm_deletes(report, {"bad_line_count"})
 
 def fix_six_line_files():
-    """
-    Find files with exactly 6 lines and automatically remove the last 2 lines.
-    """
-    pattern = r"yearly_result\result_*\output_banjir\*_coordinate.loc"
-    coordinate_files = glob.glob(pattern, recursive=True)
-    
-    print(f"Checking {len(coordinate_files)} coordinate files for 6-line files to fix...\n")
-    
-    files_fixed = 0
-    
-    for coord_file in coordinate_files:
-        try:
-            # Read the coordinate file
-            with open(coord_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            
-            line_count = len(lines)
-            
-            # Check if file has exactly 6 lines
-            if line_count == 6:
-                files_fixed += 1
-                print(f"Found 6-line file: {coord_file}")
-                print("=" * 50)
-                
-                # Show original content
-                print("Original content (6 lines):")
-                print("-" * 20)
-                for i, line in enumerate(lines, 1):
-                    print(f"{i}: {line.rstrip()}")
-                print("-" * 20)
-                
-                # Keep only the first 4 lines
-                new_content = ''.join(lines[:4])
-                
-                # Write back to file
-                with open(coord_file, 'w', encoding='utf-8') as f:
-                    f.write(new_content)
-                
-                print("✓ Removed last 2 lines. New content (4 lines):")
-                print("-" * 20)
-                for i, line in enumerate(lines[:4], 1):
-                    print(f"{i}: {line.rstrip()}")
-                print("-" * 20)
-                print(f"Fixed: {os.path.basename(coord_file)}\n")
-                
-            else:
-                print(f"Skipped: {os.path.basename(coord_file)} ({line_count} lines)")
-                
-        except Exception as e:
-            print(f"Error processing {coord_file}: {e}\n")
-    
-    print(f"\nSummary: Fixed {files_fixed} files that had 6 lines.")
+    """Keep the first 4 lines of every 6-line file (validate.py rule six_lines)"""
+    report = validate(BASE_DIR, policy={"six_lines"})
+    for entry in report["issues"]:
+        if entry.get("applied"):
+            print(f"Fixed: {entry['file']}")
+    print_report(report)
 
-def copy_files_to_new_structure():
+def export_results():
     """
-    Copy all coordinate and text files to a new organized folder structure.
-    Structure: root_folder/year/filename.ext
+    Export every result to one GeoJSON, CSV or GeoParquet dataset (see export.py)
+    instead of copying .loc/.txt pairs into a new folder structure.
     """
-    # Get root folder name from user
-    root_folder = input("Enter the root folder name: ").strip()
+    from export import export
+
+    output = input("Enter the output file (.geojson, .csv, or a folder for GeoParquet): ").strip()
     
-    if not root_folder:
-        print("Root folder name cannot be empty.")
+    if not output:
+        print("Output name cannot be empty.")
         return
     
-    # Create the root folder if it doesn't exist
-    if not os.path.exists(root_folder):
-        try:
-            os.makedirs(root_folder)
-            print(f"Created root folder: {root_folder}")
-        except Exception as e:
-            print(f"Error creating root folder: {e}")
-            return
-    
-    # Pattern to find all coordinate files
-    pattern = r"yearly_result\result_*\output_banjir\*_coordinate.loc"
-    coordinate_files = glob.glob(pattern, recursive=True)
-    
-    print(f"Found {len(coordinate_files)} coordinate files to copy...\n")
-    
-    copied_files = 0
-    years_created = set()
-    
-    for coord_file in coordinate_files:
-        try:
-            # Extract year from the path (e.g., result_2010 -> 2010)
-            path_parts = coord_file.replace('\\', '/').split('/')
-            year_folder = None
-            for part in path_parts:
-                if part.startswith('result_'):
-                    year_folder = part.replace('result_', '')
-                    break
-            
-            if not year_folder:
-                print(f"Warning: Could not extract year from {coord_file}")
-                continue
-            
-            # Create year folder if it doesn't exist
-            year_path = os.path.join(root_folder, year_folder)
-            if not os.path.exists(year_path):
-                os.makedirs(year_path)
-                years_created.add(year_folder)
-                print(f"Created year folder: {year_folder}")
-            
-            # Get the base filename (without _coordinate.loc)
-            coord_filename = os.path.basename(coord_file)
-            base_name = coord_filename.replace('_coordinate.loc', '')
-            
-            # Copy coordinate file
-            coord_dest = os.path.join(year_path, coord_filename)
-            shutil.copy2(coord_file, coord_dest)
-            
-            # Copy corresponding txt file
-            txt_file = coord_file.replace('_coordinate.loc', '.txt')
-            if os.path.exists(txt_file):
-                txt_filename = base_name + '.txt'
-                txt_dest = os.path.join(year_path, txt_filename)
-                shutil.copy2(txt_file, txt_dest)
-                
-                print(f"Copied pair: {coord_filename} and {txt_filename} to {year_folder}/")
-                copied_files += 1
-            else:
-                print(f"Warning: Corresponding .txt file not found for {coord_filename}")
-                # Still copy the coordinate file
-                print(f"Copied: {coord_filename} to {year_folder}/ (no corresponding .txt)")
-                copied_files += 1
-                
-        except Exception as e:
-            print(f"Error processing {coord_file}: {e}")
+    try:
+        count = export(output)
+    except (ValueError, RuntimeError) as e:
+        print(f"Error exporting results: {e}")
+        return
     
-    print(f"\nSummary:")
-    print(f"- Root folder: {root_folder}")
-    print(f"- Years created: {sorted(years_created)}")
-    print(f"- File pairs copied: {copied_files}")
-    print(f"- Total years: {len(years_created)}")
+    print(f"\nExported {count} results to {output}")
 
 if __name__ == "__main__":
     print("Coordinate File Processor")
@@ -319,7 +137,7 @@ if __name__ == "__main__":
         print("2. Process all coordinate files")
         print("3. Check files for 4-line requirement")
         print("4. Fix 6-line files (remove last 2 lines)")
-        print("5. Copy files to new organized structure")
+        print("5. Export results to GeoJSON/CSV/GeoParquet")
         print("6. Exit")
         
         choice = input("Enter your choice (1-6): ").strip()
@@ -333,7 +151,7 @@ if __name__ == "__main__":
         elif choice == '4':
             fix_six_line_files()
         elif choice == '5':
-            copy_files_to_new_structure()
+            export_results()
         elif choice == '6':
             print("Exiting...")
             break
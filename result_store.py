@@ -0,0 +1,250 @@
+import os
+import re
+import glob
+import time
+import sqlite3
+import argparse
+import threading
+
+from changes import InputManifest
+
+COORDINATE_SUFFIX = "_coordinate.loc"
+
+# Rows fetched at a time by ResultStore.iter_results
+ITER_BATCH = 1000
+
+def parse_coordinates(value):
+    """Parse "lat, lon" into floats, or (None, None) when it is not a coordinate pair"""
+    match = re.match(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$", value or "")
+    if not match:
+        return None, None
+    return float(match.group(1)), float(match.group(2))
+
+def parse_coordinate_file(content):
+    """Parse the Address/Coordinates/POST LINK/DATE lines of a .loc file into a dict"""
+    record = {"address": None, "coordinates": None, "post_link": None, "date": None}
+    prefixes = {
+        "Address:": "address",
+        "Coordinates:": "coordinates",
+        "POST LINK:": "post_link",
+        "DATE:": "date",
+    }
+    for line in content.splitlines():
+        for prefix, field in prefixes.items():
+            if line.startswith(prefix) and record[field] is None:
+                record[field] = line[len(prefix):].strip()
+                break
+    record["lat"], record["lon"] = parse_coordinates(record["coordinates"])
+    return record
+
+def read_post_header(txt_file, text=None):
+    """Return (post_link, date) from the first two lines of a post, or of its text when given"""
+    post_link = date = None
+    try:
+        if text is not None:
+            lines = text.splitlines()[:2]
+        else:
+            with open(txt_file, 'r', encoding='utf-8') as f:
+                lines = [f.readline() for _ in range(2)]
+    except OSError:
+        return post_link, date
+    for line in lines:
+        line = line.strip()
+        if line.startswith("POST LINK:"):
+            post_link = line[len("POST LINK:"):].strip()
+        elif line.startswith("DATE:"):
+            date = line[len("DATE:"):].strip()
+    return post_link, date
+
+def split_coordinate_path(coordinate_file):
+    """Return (year, post_id) for .../result_<year>/output_banjir/<id>_coordinate.loc"""
+    post_id = os.path.basename(coordinate_file)[:-len(COORDINATE_SUFFIX)]
+    match = re.search(r"result_(\d{4})", coordinate_file.replace('\\', '/'))
+    return (int(match.group(1)) if match else None), post_id
+
+class ResultStore:
+    """SQLite store of typed extraction results plus a manifest of processed inputs"""
+
+    def __init__(self, path="results.sqlite"):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " year INTEGER NOT NULL,"
+            " post_id TEXT NOT NULL,"
+            " address TEXT,"
+            " lat REAL,"
+            " lon REAL,"
+            " post_link TEXT,"
+            " date TEXT,"
+            " status TEXT NOT NULL,"
+            " error TEXT,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (year, post_id))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS results_status ON results (status)")
+        self.conn.commit()
+        self.manifest = InputManifest(path, conn=self.conn, lock=self.lock)
+
+    def record(self, year, post_id, address=None, lat=None, lon=None, post_link=None,
+               date=None, status="ok", error=None, txt_file=None, input_version=None):
+        """
+        Insert or replace one result. Its input is marked as processed when
+        input_version, the (size, mtime, hash) of txt_file as it was read, is given.
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results"
+                " (year, post_id, address, lat, lon, post_link, date, status, error, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (year, str(post_id), address, lat, lon, post_link, date, status, error, now),
+            )
+            if txt_file is not None and input_version is not None:
+                self.manifest.record(txt_file, year, post_id, now, commit=False, version=input_version)
+            self.conn.commit()
+
+    def record_response(self, year, txt_file, response, text=None, input_version=None):
+        """
+        Store a main.py response string ("Address: ...\\nCoordinates: ...") for a post.
+        text is the post itself when it does not live in txt_file (e.g. a --dump);
+        input_version is the (size, mtime, hash) of the post as it was read.
+        """
+        post_id = os.path.splitext(os.path.basename(txt_file))[0]
+        parsed = parse_coordinate_file(response)
+        post_link, date = read_post_header(txt_file, text)
+        if "Error" in response:
+            status, error = "error", response
+        else:
+            status, error = "ok", None
+        self.record(year, post_id, parsed["address"], parsed["lat"], parsed["lon"],
+                    post_link, date, status, error, txt_file, input_version)
+        return status == "ok"
+
+    def processed_keys(self, status="ok"):
+        """Set of (year, post_id) that already have a result with this status"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT year, post_id FROM results WHERE status = ?", (status,)
+            ).fetchall()
+        return {(year, post_id) for year, post_id in rows}
+
+    def is_processed(self, year, post_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM results WHERE year = ? AND post_id = ? AND status = 'ok'",
+                (year, str(post_id)),
+            ).fetchone()
+        return row is not None
+
+    def get(self, year, post_id):
+        """A post's successful result as a dict, or None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT address, lat, lon, post_link, date FROM results"
+                " WHERE year = ? AND post_id = ? AND status = 'ok'",
+                (year, str(post_id)),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("address", "lat", "lon", "post_link", "date"), row))
+
+    def iter_results(self, year=None, status="ok"):
+        """Yield result rows as dicts ordered by year and post id"""
+        query = ("SELECT year, post_id, address, lat, lon, post_link, date, status, error"
+                 " FROM results WHERE status = ?")
+        params = [status]
+        if year is not None:
+            query += " AND year = ?"
+            params.append(year)
+        query += " ORDER BY year, CAST(post_id AS INTEGER), post_id"
+        columns = ("year", "post_id", "address", "lat", "lon", "post_link", "date", "status", "error")
+        with self.lock:
+            cursor = self.conn.execute(query, params)
+        # Fetched in batches so exporting a large store keeps memory flat
+        while True:
+            with self.lock:
+                rows = cursor.fetchmany(ITER_BATCH)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(zip(columns, row))
+
+    def stats(self):
+        """Result counts per year and status"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT year, status, COUNT(*) FROM results GROUP BY year, status ORDER BY year, status"
+            ).fetchall()
+
+    def import_loc_files(self, base_dir="yearly_result"):
+        """Load existing _coordinate.loc files into the store; returns the number imported"""
+        pattern = os.path.join(base_dir, "result_*", "output_banjir", f"*{COORDINATE_SUFFIX}")
+        imported = 0
+        now = time.time()
+        with self.lock:
+            for coord_file in glob.glob(pattern):
+                year, post_id = split_coordinate_path(coord_file)
+                if year is None:
+                    continue
+                with open(coord_file, 'r', encoding='utf-8') as f:
+                    parsed = parse_coordinate_file(f.read())
+                txt_file = os.path.join(os.path.dirname(coord_file), f"{post_id}.txt")
+                if parsed["post_link"] is None and parsed["date"] is None:
+                    parsed["post_link"], parsed["date"] = read_post_header(txt_file)
+                status = "ok" if parsed["lat"] is not None else "error"
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO results"
+                    " (year, post_id, address, lat, lon, post_link, date, status, error, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (year, post_id, parsed["address"], parsed["lat"], parsed["lon"],
+                     parsed["post_link"], parsed["date"], status,
+                     None if status == "ok" else parsed["coordinates"], now),
+                )
+                if os.path.exists(txt_file):
+                    self.manifest.record(txt_file, year, post_id, now, commit=False)
+                imported += 1
+            self.conn.commit()
+        return imported
+
+    def export_loc_files(self, base_dir="yearly_result", overwrite=False):
+        """Write every successful result back out as a 4-line _coordinate.loc file"""
+        from main import write_coordinate_file
+        exported = 0
+        for row in self.iter_results():
+            folder = os.path.join(base_dir, f"result_{row['year']}", "output_banjir")
+            coord_file = os.path.join(folder, f"{row['post_id']}{COORDINATE_SUFFIX}")
+            if not overwrite and os.path.exists(coord_file):
+                continue
+            os.makedirs(folder, exist_ok=True)
+            lines = [f"Address: {row['address']}", f"Coordinates: {row['lat']}, {row['lon']}"]
+            if row["post_link"] is not None or row["date"] is not None:
+                lines.append(f"POST LINK: {row['post_link'] or ''}")
+                lines.append(f"DATE: {row['date'] or ''}")
+            write_coordinate_file(coord_file, "\n".join(lines))
+            exported += 1
+        return exported
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the GeoLLM result store")
+    parser.add_argument('command', choices=["import", "export", "stats"])
+    parser.add_argument('--store', default="results.sqlite", help="Result store file")
+    parser.add_argument('--base-dir', default="yearly_result", help="Directory holding result_<year> folders")
+    parser.add_argument('--overwrite', action='store_true', help="Replace existing .loc files on export")
+    args = parser.parse_args()
+
+    store = ResultStore(args.store)
+    if args.command == "import":
+        print(f"Imported {store.import_loc_files(args.base_dir)} coordinate files into {args.store}")
+    elif args.command == "export":
+        print(f"Exported {store.export_loc_files(args.base_dir, args.overwrite)} coordinate files")
+    else:
+        for year, status, count in store.stats():
+            print(f"{year}  {status:<6} {count}")
+    store.close()
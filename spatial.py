@@ -0,0 +1,285 @@
+"""
+Spatial queries over extracted coordinates.
+
+    python spatial.py radius -6.2 106.85 --km 5
+    python spatial.py nearest -6.2 106.85 -k 10
+    python spatial.py bbox -6.4 106.6 -6.0 107.0 --year 2020
+    python spatial.py hotspots --cell-km 5 --top 20
+    python spatial.py areas --gazetteer places.csv --level kecamatan
+"""
+import os
+import glob
+import time
+import argparse
+
+import numpy as np
+
+from result_store import COORDINATE_SUFFIX, parse_coordinate_file, split_coordinate_path
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.195
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance in km from one point to arrays of points"""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def load_records(base_dir="yearly_result", store=None):
+    """Results with coordinates, from a ResultStore or from the _coordinate.loc files"""
+    records = []
+    if store is not None:
+        for row in store.iter_results():
+            if row["lat"] is not None and row["lon"] is not None:
+                records.append(row)
+        return records
+    pattern = os.path.join(base_dir, "result_*", "output_banjir", f"*{COORDINATE_SUFFIX}")
+    for coord_file in glob.glob(pattern):
+        year, post_id = split_coordinate_path(coord_file)
+        try:
+            with open(coord_file, 'r', encoding='utf-8') as f:
+                record = parse_coordinate_file(f.read())
+        except OSError:
+            continue
+        if year is None or record["lat"] is None:
+            continue
+        record["year"] = year
+        record["post_id"] = post_id
+        # Relative DATE values ("2 jam") are relative to when the post was scraped
+        try:
+            record["scraped_at"] = os.path.getmtime(coord_file[:-len(COORDINATE_SUFFIX)] + ".txt")
+        except OSError:
+            record["scraped_at"] = None
+        records.append(record)
+    return records
+
+class SpatialIndex:
+    """
+    Coordinates held in NumPy arrays and bucketed into a fixed lat/lon grid.
+    Points are sorted by grid cell, so a query only touches the cells it
+    overlaps: one searchsorted per grid row, then an exact filter.
+    """
+
+    def __init__(self, lats, lons, years=None, post_ids=None, addresses=None, dates=None, cell_deg=0.05,
+                 scraped_at=None):
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        count = len(lats)
+        self.cell_deg = cell_deg
+        self.columns = int(np.ceil(360.0 / cell_deg)) + 1
+        keys = self.cell_keys(lats, lons)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.lat = lats[order]
+        self.lon = lons[order]
+        self.year = (np.asarray(years, dtype=np.int16) if years is not None
+                     else np.zeros(count, dtype=np.int16))[order]
+        self.post_id = np.asarray(post_ids if post_ids is not None else [None] * count, dtype=object)[order]
+        self.address = np.asarray(addresses if addresses is not None else [None] * count, dtype=object)[order]
+        self.date = np.asarray(dates if dates is not None else [None] * count, dtype=object)[order]
+        self.scraped_at = (np.asarray([np.nan if t is None else t for t in scraped_at], dtype=np.float64)
+                           if scraped_at is not None else np.full(count, np.nan))[order]
+
+    @classmethod
+    def from_records(cls, records, cell_deg=0.05):
+        return cls(
+            [r["lat"] for r in records],
+            [r["lon"] for r in records],
+            [r["year"] for r in records],
+            [r["post_id"] for r in records],
+            [r["address"] for r in records],
+            [r.get("date") for r in records],
+            cell_deg,
+            [r.get("scraped_at") for r in records],
+        )
+
+    @classmethod
+    def load(cls, base_dir="yearly_result", store=None, cell_deg=0.05):
+        """Build the index from every result under base_dir, or from a ResultStore"""
+        return cls.from_records(load_records(base_dir, store), cell_deg)
+
+    def __len__(self):
+        return len(self.lat)
+
+    def cell_rows_cols(self, lats, lons):
+        rows = np.floor((np.asarray(lats) + 90.0) / self.cell_deg).astype(np.int64)
+        cols = np.floor((np.asarray(lons) + 180.0) / self.cell_deg).astype(np.int64)
+        return rows, cols
+
+    def cell_keys(self, lats, lons):
+        rows, cols = self.cell_rows_cols(lats, lons)
+        return rows * self.columns + cols
+
+    def year_mask(self, indices, years):
+        if years is None:
+            return indices
+        return indices[np.isin(self.year[indices], np.atleast_1d(years))]
+
+    def candidates(self, south, west, north, east):
+        """Indices of points in the grid cells overlapping a bounding box"""
+        (row0, row1), (col0, col1) = self.cell_rows_cols([south, north], [west, east])
+        starts = np.arange(row0, row1 + 1) * self.columns
+        left = np.searchsorted(self.keys, starts + col0, side="left")
+        right = np.searchsorted(self.keys, starts + col1, side="right")
+        spans = [np.arange(lo, hi) for lo, hi in zip(left, right) if hi > lo]
+        if not spans:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(spans)
+
+    def bbox(self, south, west, north, east, years=None):
+        """Indices of points inside a bounding box"""
+        indices = self.candidates(south, west, north, east)
+        lat, lon = self.lat[indices], self.lon[indices]
+        inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        return self.year_mask(indices[inside], years)
+
+    def radius(self, lat, lon, km, years=None):
+        """(indices, distances in km) of points within km of a point, nearest first"""
+        dlat = km / KM_PER_DEGREE
+        dlon = km / (KM_PER_DEGREE * max(np.cos(np.radians(lat)), 1e-6))
+        south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+        west, east = max(lon - dlon, -180.0), min(lon + dlon, 180.0)
+        indices = self.year_mask(self.candidates(south, west, north, east), years)
+        distances = haversine_km(lat, lon, self.lat[indices], self.lon[indices])
+        within = distances <= km
+        indices, distances = indices[within], distances[within]
+        order = np.argsort(distances, kind="stable")
+        return indices[order], distances[order]
+
+    def nearest(self, lat, lon, k=1, years=None):
+        """(indices, distances in km) of the k nearest points, growing the search radius as needed"""
+        km = self.cell_deg * KM_PER_DEGREE
+        while True:
+            indices, distances = self.radius(lat, lon, km, years)
+            if len(indices) >= k or km >= np.pi * EARTH_RADIUS_KM:
+                return indices[:k], distances[:k]
+            km *= 2
+
+    def grid_counts(self, cell_km=5.0, years=None):
+        """
+        Count points per square grid cell of about cell_km, in one vectorized pass.
+        Returns arrays (lat, lon, count) with the mean position of each cell's
+        points, busiest cells first.
+        """
+        indices = self.year_mask(np.arange(len(self)), years)
+        if not len(indices):
+            empty = np.empty(0)
+            return empty, empty, np.empty(0, dtype=np.int64)
+        step = cell_km / KM_PER_DEGREE
+        lat, lon = self.lat[indices], self.lon[indices]
+        rows = np.floor(lat / step).astype(np.int64)
+        cols = np.floor(lon / step).astype(np.int64)
+        cells = rows * (int(np.ceil(360.0 / step)) + 1) + cols
+        _, inverse, counts = np.unique(cells, return_inverse=True, return_counts=True)
+        mean_lat = np.bincount(inverse, weights=lat) / counts
+        mean_lon = np.bincount(inverse, weights=lon) / counts
+        order = np.argsort(-counts, kind="stable")
+        return mean_lat[order], mean_lon[order], counts[order]
+
+    def hotspots(self, cell_km=5.0, top=20, years=None):
+        """The busiest grid cells as dicts of lat, lon and count"""
+        lat, lon, counts = self.grid_counts(cell_km, years)
+        return [{"lat": round(float(a), 6), "lon": round(float(b), 6), "count": int(c)}
+                for a, b, c in zip(lat[:top], lon[:top], counts[:top])]
+
+    def counts_per_year(self, labels):
+        """Count points per (year, label) for a label array aligned with the index"""
+        labels = np.asarray(labels, dtype=object)
+        pairs = {}
+        for year, label in zip(self.year.tolist(), labels.tolist()):
+            pairs[(year, label)] = pairs.get((year, label), 0) + 1
+        return pairs
+
+    def records(self, indices, distances=None):
+        """Result dicts for query indices"""
+        rows = []
+        for position, i in enumerate(indices):
+            row = {
+                "year": int(self.year[i]),
+                "post_id": self.post_id[i],
+                "address": self.address[i],
+                "lat": float(self.lat[i]),
+                "lon": float(self.lon[i]),
+                "date": self.date[i],
+            }
+            if distances is not None:
+                row["distance_km"] = round(float(distances[position]), 3)
+            rows.append(row)
+        return rows
+
+def area_labels(index, gazetteer, level="kelurahan"):
+    """Name of the nearest gazetteer centroid at a level for every point in the index"""
+    names = []
+    lats = []
+    lons = []
+    for (place_level, key), (lat, lon) in gazetteer.centroids.items():
+        if place_level == level:
+            names.append(" / ".join(reversed(key)))
+            lats.append(lat)
+            lons.append(lon)
+    if not names:
+        return np.full(len(index), None, dtype=object)
+    places = SpatialIndex(lats, lons, addresses=names, cell_deg=0.1)
+    labels = np.empty(len(index), dtype=object)
+    for i in range(len(index)):
+        nearest, _ = places.nearest(index.lat[i], index.lon[i], 1)
+        labels[i] = places.address[nearest[0]]
+    return labels
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query extracted flood coordinates")
+    parser.add_argument('--base-dir', default="yearly_result", help="Directory holding result_<year> folders")
+    parser.add_argument('--store', default=os.getenv('RESULT_STORE'), help="Read results from this SQLite store")
+    parser.add_argument('--year', type=int, action='append', help="Only this year (repeatable)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    radius_cmd = commands.add_parser("radius", help="Reports within --km of a point")
+    radius_cmd.add_argument('lat', type=float)
+    radius_cmd.add_argument('lon', type=float)
+    radius_cmd.add_argument('--km', type=float, default=5.0)
+    nearest_cmd = commands.add_parser("nearest", help="The k reports nearest a point")
+    nearest_cmd.add_argument('lat', type=float)
+    nearest_cmd.add_argument('lon', type=float)
+    nearest_cmd.add_argument('-k', type=int, default=10)
+    bbox_cmd = commands.add_parser("bbox", help="Reports inside south west north east")
+    for name in ("south", "west", "north", "east"):
+        bbox_cmd.add_argument(name, type=float)
+    hotspot_cmd = commands.add_parser("hotspots", help="Busiest grid cells")
+    hotspot_cmd.add_argument('--cell-km', type=float, default=5.0)
+    hotspot_cmd.add_argument('--top', type=int, default=20)
+    areas_cmd = commands.add_parser("areas", help="Reports per gazetteer area per year")
+    areas_cmd.add_argument('--gazetteer', default=os.getenv('GAZETTEER_CSV'), required=not os.getenv('GAZETTEER_CSV'))
+    areas_cmd.add_argument('--level', choices=["kelurahan", "kecamatan", "kota"], default="kelurahan")
+    args = parser.parse_args()
+
+    store = None
+    if args.store:
+        from result_store import ResultStore
+        store = ResultStore(args.store)
+    start = time.perf_counter()
+    index = SpatialIndex.load(args.base_dir, store)
+    print(f"Indexed {len(index)} results in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    if args.command == "radius":
+        rows = index.records(*index.radius(args.lat, args.lon, args.km, args.year))
+    elif args.command == "nearest":
+        rows = index.records(*index.nearest(args.lat, args.lon, args.k, args.year))
+    elif args.command == "bbox":
+        rows = index.records(index.bbox(args.south, args.west, args.north, args.east, args.year))
+    elif args.command == "hotspots":
+        rows = index.hotspots(args.cell_km, args.top, args.year)
+    else:
+        from gazetteer import Gazetteer
+        counts = index.counts_per_year(area_labels(index, Gazetteer(args.gazetteer), args.level))
+        rows = [{"year": year, args.level: label, "count": count}
+                for (year, label), count in sorted(counts.items(), key=lambda item: (item[0][0], -item[1]))
+                if args.year is None or year in args.year]
+    elapsed = (time.perf_counter() - start) * 1000
+
+    for row in rows:
+        print("  " + "  ".join(f"{key}={value}" for key, value in row.items()))
+    print(f"{len(rows)} rows in {elapsed:.3f} ms")
+    if store is not None:
+        store.close()
@@ -0,0 +1,327 @@
+"""
+Local stand-ins for the OpenAI and Google Geocoding endpoints used by GeoLLM,
+for testing and benchmarking without API spend or network jitter.
+
+    python stub_servers.py --port 8010 --geo-port 8011 --latency 0.5
+    OPENAI_BASE_URL=http://127.0.0.1:8010/v1 OPENAI_API_KEY=stub \
+    GEOCODE_URL=http://127.0.0.1:8011/maps/api/geocode/json GOOGLE_MAPS_API_KEY=stub \
+    python main.py --concurrent
+"""
+import re
+import json
+import time
+import uuid
+import random
+import hashlib
+import argparse
+import threading
+import email.parser
+import email.policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def stub_answer(prompt):
+    """Deterministic address guess: the capitalized words after the first "di" in the post"""
+    match = re.search(r"\bdi ((?:[A-Z][\w.-]*\s?){1,4})", prompt)
+    place = match.group(1).strip() if match else "Surabaya"
+    return place.replace(" ", "%20") + "%20Indonesia"
+
+def packed_answer(prompt):
+    """Structured answer for a multi-post prompt with "### ID: <id>" sections"""
+    sections = re.split(r"^### ID: (\S+)\n", prompt, flags=re.MULTILINE)[1:]
+    results = [
+        {"id": post_id, "address": stub_answer(text)}
+        for post_id, text in zip(sections[::2], sections[1::2])
+    ]
+    return json.dumps({"results": results})
+
+def chat_response(body):
+    """Build a chat.completion object for a request body"""
+    prompt = body["messages"][-1]["content"]
+    if (body.get("response_format") or {}).get("type") == "json_schema":
+        answer = packed_answer(prompt)
+    else:
+        answer = stub_answer(prompt)
+    prompt_tokens = len(prompt) // 4
+    completion_tokens = len(answer) // 4
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": answer},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+class StubBehavior:
+    """Latency and failure injection shared by the stand-ins"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0,
+                 retry_after=1.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+
+    def next_outcome(self):
+        """Sleep for the simulated latency and return "ok", "error" or "throttled" """
+        with self.lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            roll = self.random.random()
+            if roll < self.throttle_rate:
+                outcome = "throttled"
+                self.throttled += 1
+            elif roll < self.throttle_rate + self.error_rate:
+                outcome = "error"
+                self.errors += 1
+            else:
+                outcome = "ok"
+        if delay:
+            time.sleep(delay)
+        return outcome
+
+    def stats(self):
+        return {"requests": self.requests, "errors": self.errors, "throttled": self.throttled}
+
+class OpenAIStubState:
+    """Files and batches held in memory by the stub server"""
+
+    def __init__(self, batch_delay=0.0, behavior=None):
+        self.batch_delay = batch_delay
+        self.behavior = behavior or StubBehavior()
+        self.files = {}
+        self.batches = {}
+        self.lock = threading.Lock()
+
+    def add_file(self, content, filename, purpose):
+        file_id = f"file-{uuid.uuid4().hex[:12]}"
+        with self.lock:
+            self.files[file_id] = {
+                "id": file_id,
+                "object": "file",
+                "bytes": len(content),
+                "created_at": int(time.time()),
+                "filename": filename,
+                "purpose": purpose,
+                "status": "processed",
+                "content": content,
+            }
+        return self.file_object(file_id)
+
+    def file_object(self, file_id):
+        return {k: v for k, v in self.files[file_id].items() if k != "content"}
+
+    def create_batch(self, body):
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        lines = [line for line in self.files[body["input_file_id"]]["content"].splitlines() if line.strip()]
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": body["endpoint"],
+            "errors": None,
+            "input_file_id": body["input_file_id"],
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "in_progress",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "metadata": body.get("metadata"),
+            "request_counts": {"total": len(lines), "completed": 0, "failed": 0},
+        }
+        with self.lock:
+            self.batches[batch_id] = batch
+        threading.Timer(self.batch_delay, self.run_batch, args=(batch_id, lines)).start()
+        return batch
+
+    def run_batch(self, batch_id, lines):
+        output = []
+        for line in lines:
+            request = json.loads(line)
+            output.append(json.dumps({
+                "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": chat_response(request["body"])},
+                "error": None,
+            }))
+        output_file = self.add_file(("\n".join(output) + "\n").encode("utf-8"), "batch_output.jsonl", "batch_output")
+        with self.lock:
+            batch = self.batches[batch_id]
+            batch["status"] = "completed"
+            batch["output_file_id"] = output_file["id"]
+            batch["completed_at"] = int(time.time())
+            batch["request_counts"]["completed"] = len(lines)
+
+def parse_multipart(content_type, body):
+    """Return {field name: (filename, bytes or str)} for a multipart/form-data body"""
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body
+    )
+    fields = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        fields[name] = (part.get_filename(), part.get_payload(decode=True))
+    return fields
+
+def make_openai_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, payload, status=200):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def read_body(self):
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def do_POST(self):
+            path = self.path.split("?")[0]
+            if path.endswith("/chat/completions"):
+                body = json.loads(self.read_body())
+                outcome = state.behavior.next_outcome()
+                if outcome == "throttled":
+                    self.send_response(429)
+                    self.send_header("Retry-After", str(state.behavior.retry_after))
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                elif outcome == "error":
+                    self.send_json({"error": {"message": "Stub server error", "type": "server_error"}}, 500)
+                else:
+                    self.send_json(chat_response(body))
+            elif path.endswith("/files"):
+                fields = parse_multipart(self.headers["Content-Type"], self.read_body())
+                filename, content = fields["file"]
+                purpose = fields.get("purpose", (None, b"batch"))[1].decode()
+                self.send_json(state.add_file(content, filename, purpose))
+            elif path.endswith("/batches"):
+                self.send_json(state.create_batch(json.loads(self.read_body())))
+            else:
+                self.send_json({"error": {"message": f"Unknown path {path}"}}, 404)
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            match = re.search(r"/files/([^/]+)/content$", path)
+            if match and match.group(1) in state.files:
+                data = state.files[match.group(1)]["content"]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+            match = re.search(r"/files/([^/]+)$", path)
+            if match and match.group(1) in state.files:
+                self.send_json(state.file_object(match.group(1)))
+                return
+            match = re.search(r"/batches/([^/]+)$", path)
+            if match and match.group(1) in state.batches:
+                with state.lock:
+                    self.send_json(state.batches[match.group(1)])
+                return
+            self.send_json({"error": {"message": f"Unknown path {path}"}}, 404)
+
+    return Handler
+
+def stub_location(address):
+    """Deterministic pseudo-coordinates inside Java for an address"""
+    digest = hashlib.sha256(address.lower().encode("utf-8")).digest()
+    lat = -8.5 + digest[0] / 255 * 2.5
+    lon = 105.5 + digest[1] / 255 * 9.0
+    return round(lat, 7), round(lon, 7)
+
+def make_geocode_handler(behavior, zero_results_rate=0.0):
+    """Handler mimicking /maps/api/geocode/json; throttling answers OVER_QUERY_LIMIT like Google"""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, payload, status=200):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            from urllib.parse import urlparse, parse_qs
+            query = parse_qs(urlparse(self.path).query)
+            address = query.get("address", [""])[0]
+            outcome = behavior.next_outcome()
+            if outcome == "throttled":
+                self.send_json({"status": "OVER_QUERY_LIMIT", "results": []})
+            elif outcome == "error":
+                self.send_json({"status": "UNKNOWN_ERROR", "results": []}, 500)
+            elif not address or int(hashlib.md5(address.encode()).hexdigest(), 16) % 1000 < zero_results_rate * 1000:
+                self.send_json({"status": "ZERO_RESULTS", "results": []})
+            else:
+                lat, lon = stub_location(address)
+                self.send_json({
+                    "status": "OK",
+                    "results": [{
+                        "formatted_address": address,
+                        "geometry": {"location": {"lat": lat, "lng": lon}},
+                    }],
+                })
+
+    return Handler
+
+def start_server(handler, port=0):
+    """Serve a handler on 127.0.0.1 in a background thread; returns (server, base url)"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def start_openai_stub(port=0, batch_delay=0.0, behavior=None):
+    """Start the OpenAI stand-in; returns (server, base url ending in /v1)"""
+    server, url = start_server(make_openai_handler(OpenAIStubState(batch_delay, behavior)), port)
+    return server, f"{url}/v1"
+
+def start_geocode_stub(port=0, behavior=None, zero_results_rate=0.0):
+    """Start the Geocoding stand-in; returns (server, full geocode JSON url)"""
+    server, url = start_server(make_geocode_handler(behavior or StubBehavior(), zero_results_rate), port)
+    return server, f"{url}/maps/api/geocode/json"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run local stand-ins for the OpenAI and Geocoding APIs")
+    parser.add_argument('--port', type=int, default=8010, help="OpenAI stand-in port")
+    parser.add_argument('--geo-port', type=int, default=8011, help="Geocoding stand-in port")
+    parser.add_argument('--batch-delay', type=float, default=2.0, help="Seconds before a batch completes")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Random +/- seconds on top of --latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of 5xx responses")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Fraction of 429/OVER_QUERY_LIMIT responses")
+    parser.add_argument('--retry-after', type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    args = parser.parse_args()
+
+    def behavior():
+        return StubBehavior(args.latency, args.jitter, args.error_rate, args.throttle_rate, args.retry_after)
+
+    server, base_url = start_openai_stub(args.port, args.batch_delay, behavior())
+    geo_server, geo_url = start_geocode_stub(args.geo_port, behavior())
+    print(f"OpenAI stand-in listening on {base_url}")
+    print(f"Geocoding stand-in listening on {geo_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        geo_server.shutdown()
@@ -0,0 +1,238 @@
+import csv
+import json
+import time
+import threading
+import contextlib
+
+# USD per million (prompt, completion) tokens; dated snapshots match by prefix
+MODEL_PRICES = {
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+# The Batch API bills half the synchronous price
+BATCH_DISCOUNT = 0.5
+
+STAGES = ("read", "prompt", "llm", "geocode", "write")
+
+# Post keys ("<year>-<id>") the current thread is working on, set by Tracer.posts()
+_context = threading.local()
+
+def model_price(model):
+    """(prompt, completion) USD per million tokens for a model, or None when unknown"""
+    matches = [name for name in MODEL_PRICES if model == name or model.startswith(f"{name}-")]
+    if not matches:
+        return None
+    return MODEL_PRICES[max(matches, key=len)]
+
+def estimate_cost(model, prompt_tokens, completion_tokens, batch=False):
+    """Estimated USD cost of a call, or None for models without a known price"""
+    price = model_price(model)
+    if price is None:
+        return None
+    cost = (prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000
+    return cost * BATCH_DISCOUNT if batch else cost
+
+def usage_tokens(usage):
+    """(prompt, completion) tokens from an SDK usage object or a batch output dict"""
+    if usage is None:
+        return 0, 0
+    if isinstance(usage, dict):
+        return usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0
+    return getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0
+
+def key_year(key):
+    """Year of a "<year>-<id>" post key, or None"""
+    try:
+        return int(str(key).split("-", 1)[0])
+    except ValueError:
+        return None
+
+class Tracer:
+    """
+    Records a timed span for every pipeline stage and the token usage of every
+    LLM call, writes them to a JSONL trace and keeps per-year rollups. Spans that
+    cover several posts (packed calls) are split evenly across their posts' years.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, 'a', encoding='utf-8') if path else None
+        self.started = time.time()
+        self.stages = {}   # (stage, year) -> [calls, seconds, errors]
+        self.tokens = {}   # (year, model) -> [prompt, completion, cost, calls]
+        self.unpriced = set()
+
+    def write(self, record):
+        if self.file is not None:
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    @contextlib.contextmanager
+    def posts(self, keys):
+        """Attribute spans started in this thread to the given post keys"""
+        previous = getattr(_context, "keys", None)
+        _context.keys = list(keys)
+        try:
+            yield
+        finally:
+            _context.keys = previous
+
+    def current_posts(self):
+        return getattr(_context, "keys", None) or []
+
+    @contextlib.contextmanager
+    def span(self, stage):
+        """Time a stage; yields a dict the caller may add fields (e.g. "error") to"""
+        record = {}
+        start = time.time()
+        begin = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record["error"] = str(e)
+            raise
+        finally:
+            seconds = time.perf_counter() - begin
+            keys = self.current_posts()
+            entry = {"type": "span", "stage": stage, "posts": keys,
+                     "start": round(start, 6), "seconds": round(seconds, 6)}
+            entry.update(record)
+            years = [key_year(key) for key in keys] or [None]
+            share = 1.0 / len(years)
+            with self.lock:
+                for year in years:
+                    totals = self.stages.setdefault((stage, year), [0.0, 0.0, 0.0])
+                    totals[0] += share
+                    totals[1] += seconds * share
+                    if "error" in record:
+                        totals[2] += share
+                self.write(entry)
+
+    def record_usage(self, model, usage, keys=None, batch=False):
+        """Account the prompt and completion tokens of one LLM call"""
+        prompt_tokens, completion_tokens = usage_tokens(usage)
+        cost = estimate_cost(model, prompt_tokens, completion_tokens, batch)
+        keys = list(keys) if keys is not None else self.current_posts()
+        years = [key_year(key) for key in keys] or [None]
+        share = 1.0 / len(years)
+        with self.lock:
+            if cost is None:
+                self.unpriced.add(model)
+            for year in years:
+                totals = self.tokens.setdefault((year, model), [0.0, 0.0, 0.0, 0.0])
+                totals[0] += prompt_tokens * share
+                totals[1] += completion_tokens * share
+                totals[2] += (cost or 0.0) * share
+                totals[3] += share
+            self.write({"type": "usage", "model": model, "posts": keys, "batch": batch,
+                        "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                        "cost_usd": cost, "time": round(time.time(), 6)})
+
+    def rollups(self):
+        """Per-year totals: {year: {"stages": {...}, "prompt_tokens", "completion_tokens", "cost_usd"}}"""
+        years = {}
+        with self.lock:
+            for (stage, year), (calls, seconds, errors) in self.stages.items():
+                entry = years.setdefault(year, {"stages": {}, "prompt_tokens": 0.0,
+                                                "completion_tokens": 0.0, "cost_usd": 0.0})
+                entry["stages"][stage] = {"calls": calls, "seconds": seconds, "errors": errors}
+            for (year, model), (prompt, completion, cost, _) in self.tokens.items():
+                entry = years.setdefault(year, {"stages": {}, "prompt_tokens": 0.0,
+                                                "completion_tokens": 0.0, "cost_usd": 0.0})
+                entry["prompt_tokens"] += prompt
+                entry["completion_tokens"] += completion
+                entry["cost_usd"] += cost
+        return years
+
+    def write_prometheus(self, path):
+        """
+        Write the rollups in the Prometheus text exposition format, one metric
+        family at a time (HELP and TYPE, then all of its samples)
+        """
+        with self.lock:
+            stages = sorted(self.stages.items(), key=lambda item: (item[0][1] or 0, item[0][0]))
+            tokens = sorted(self.tokens.items(), key=lambda item: (item[0][0] or 0, item[0][1]))
+        stage_labels = [(f'stage="{stage}",year="{year or ""}"', values) for (stage, year), values in stages]
+        token_labels = [(f'model="{model}",year="{year or ""}"', values) for (year, model), values in tokens]
+        families = [
+            ("geollm_stage_calls_total", "Stage spans per year",
+             [(labels, f"{calls:.3f}") for labels, (calls, _, _) in stage_labels]),
+            ("geollm_stage_seconds_total", "Summed stage time per year (overlaps across workers)",
+             [(labels, f"{seconds:.6f}") for labels, (_, seconds, _) in stage_labels]),
+            ("geollm_stage_errors_total", "Failed stage spans per year",
+             [(labels, f"{errors:.3f}") for labels, (_, _, errors) in stage_labels]),
+            ("geollm_tokens_total", "LLM tokens per year and model",
+             [(f'{labels},kind="prompt"', f"{prompt:.0f}") for labels, (prompt, _, _, _) in token_labels]
+             + [(f'{labels},kind="completion"', f"{completion:.0f}")
+                for labels, (_, completion, _, _) in token_labels]),
+            ("geollm_cost_usd_total", "Estimated LLM cost per year and model",
+             [(labels, f"{cost:.6f}") for labels, (_, _, cost, _) in token_labels]),
+        ]
+        lines = []
+        for name, help_text, samples in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            lines.extend(f"{name}{{{labels}}} {value}" for labels, value in samples)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+
+    def write_csv(self, path):
+        """Write one row per (year, stage) and per (year, model) token total"""
+        with self.lock:
+            stages = sorted(self.stages.items(), key=lambda item: (item[0][1] or 0, item[0][0]))
+            tokens = sorted(self.tokens.items(), key=lambda item: (item[0][0] or 0, item[0][1]))
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["year", "stage", "model", "calls", "seconds", "errors",
+                             "prompt_tokens", "completion_tokens", "cost_usd"])
+            for (stage, year), (calls, seconds, errors) in stages:
+                writer.writerow([year or "", stage, "", round(calls, 3), round(seconds, 6),
+                                 round(errors, 3), "", "", ""])
+            for (year, model), (prompt, completion, cost, calls) in tokens:
+                writer.writerow([year or "", "tokens", model, round(calls, 3), "", "",
+                                 round(prompt), round(completion), round(cost, 6)])
+
+    def write_metrics(self, path):
+        """CSV when the path ends in .csv, Prometheus text otherwise"""
+        if path.lower().endswith(".csv"):
+            self.write_csv(path)
+        else:
+            self.write_prometheus(path)
+
+    def summary(self):
+        """Per-year table of stage time, tokens and estimated cost"""
+        rollups = self.rollups()
+        lines = [f"Trace: {time.time() - self.started:.1f}s wall time"
+                 + (f", written to {self.path}" if self.path else "")]
+        header = "  year  " + "".join(f"{stage:>10}" for stage in STAGES) + f"{'tokens':>12}{'cost $':>10}"
+        lines.append(header)
+        totals = {stage: 0.0 for stage in STAGES}
+        total_tokens = total_cost = 0.0
+        for year in sorted(rollups, key=lambda y: y or 0):
+            entry = rollups[year]
+            row = f"  {year or '-':<6}"
+            for stage in STAGES:
+                seconds = entry["stages"].get(stage, {}).get("seconds", 0.0)
+                totals[stage] += seconds
+                row += f"{seconds:>9.2f}s"
+            tokens = entry["prompt_tokens"] + entry["completion_tokens"]
+            total_tokens += tokens
+            total_cost += entry["cost_usd"]
+            lines.append(row + f"{tokens:>12.0f}{entry['cost_usd']:>10.4f}")
+        lines.append("  total " + "".join(f"{totals[stage]:>9.2f}s" for stage in STAGES)
+                     + f"{total_tokens:>12.0f}{total_cost:>10.4f}")
+        if self.unpriced:
+            lines.append(f"  No price known for: {', '.join(sorted(self.unpriced))}")
+        return "\n".join(lines)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.write({"type": "run", "start": round(self.started, 6),
+                            "seconds": round(time.time() - self.started, 6)})
+                self.file.close()
+                self.file = None
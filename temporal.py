@@ -0,0 +1,246 @@
+"""
+Parse the Indonesian DATE lines of posts and index them by time.
+
+    python temporal.py months
+    python temporal.py range 2020-01-01 2020-01-07 --near -6.2 106.85 --km 10
+    python temporal.py season hujan --start-year 2019
+"""
+import re
+import time
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+
+DAYS = {"senin": 0, "selasa": 1, "rabu": 2, "kamis": 3, "jumat": 4, "jum'at": 4, "sabtu": 5, "minggu": 6}
+
+MONTHS = {
+    "januari": 1, "jan": 1, "februari": 2, "pebruari": 2, "feb": 2, "maret": 3, "mar": 3,
+    "april": 4, "apr": 4, "mei": 5, "juni": 6, "jun": 6, "juli": 7, "jul": 7,
+    "agustus": 8, "agu": 8, "agt": 8, "ags": 8, "september": 9, "sep": 9, "sept": 9,
+    "oktober": 10, "okt": 10, "november": 11, "nov": 11, "nopember": 11, "desember": 12, "des": 12,
+}
+
+# Relative ages shown for recent posts, e.g. "2 jam" or "3 hari yang lalu"
+UNITS = {
+    "detik": timedelta(seconds=1), "dtk": timedelta(seconds=1),
+    "menit": timedelta(minutes=1), "mnt": timedelta(minutes=1), "m": timedelta(minutes=1),
+    "jam": timedelta(hours=1), "j": timedelta(hours=1),
+    "hari": timedelta(days=1), "h": timedelta(days=1),
+    "minggu": timedelta(weeks=1), "mgg": timedelta(weeks=1), "mg": timedelta(weeks=1),
+    "bulan": timedelta(days=30), "bln": timedelta(days=30),
+    "tahun": timedelta(days=365), "thn": timedelta(days=365), "th": timedelta(days=365),
+}
+
+# Indonesian monsoon seasons: rainy October-March, dry April-September
+SEASONS = {
+    "hujan": (10, 11, 12, 1, 2, 3),
+    "kemarau": (4, 5, 6, 7, 8, 9),
+}
+
+ABSOLUTE = re.compile(
+    r"^(?:[a-z']+,?\s+)?(\d{1,2})\s+([a-z]+)\.?(?:\s+(\d{4}))?(?:\s+(?:pada|pukul|jam)\s+(\d{1,2})[.:](\d{2}))?$"
+)
+TIME_OF_DAY = r"(?:\s+(?:pada|pukul|jam)\s+(\d{1,2})[.:](\d{2}))?"
+NAMED_DAY = re.compile(r"^(kemarin|hari ini|[a-z']+)" + TIME_OF_DAY + "$")
+AGO = re.compile(r"^(\d+)\s*([a-z]+)(?:\s+(?:yang\s+)?lalu)?$")
+
+NAT = np.datetime64("NaT", "m")
+
+def as_minutes(value):
+    return np.datetime64(value.replace(second=0, microsecond=0), "m")
+
+def normalize_date(text):
+    """Lower-cased DATE value with the prefix and repeated whitespace removed"""
+    return re.sub(r"\s+", " ", (text or "").replace("DATE:", "")).strip().lower()
+
+def has_year(value):
+    """Whether a normalized DATE value is an absolute date that needs no reference time"""
+    match = ABSOLUTE.match(value)
+    return bool(match and match.group(2) in MONTHS and match.group(3))
+
+def parse_date(text, reference=None):
+    """
+    Parse one DATE value ("Selasa, 31 Desember 2024 pada 21.13") to datetime64[m].
+    Dates without a year, "Kemarin pada 21.13", weekday-only and "2 jam" forms are
+    resolved against reference (a datetime, default now). Returns NaT when unparseable.
+    """
+    value = normalize_date(text)
+    if not value:
+        return NAT
+    reference = reference or datetime.now()
+
+    match = ABSOLUTE.match(value)
+    if match and match.group(2) in MONTHS:
+        day, month_name, year, hour, minute = match.groups()
+        try:
+            parsed = datetime(int(year or reference.year), MONTHS[month_name], int(day),
+                              int(hour or 0), int(minute or 0))
+        except ValueError:
+            return NAT
+        # Facebook leaves the year off posts from the current year
+        if year is None and parsed > reference:
+            parsed = parsed.replace(year=parsed.year - 1)
+        return as_minutes(parsed)
+
+    if value in ("baru saja", "sekarang"):
+        return as_minutes(reference)
+
+    match = AGO.match(value)
+    if match and match.group(2) in UNITS:
+        return as_minutes(reference - int(match.group(1)) * UNITS[match.group(2)])
+
+    match = NAMED_DAY.match(value)
+    if match:
+        name, hour, minute = match.groups()
+        if name == "hari ini":
+            day = reference
+        elif name == "kemarin":
+            day = reference - timedelta(days=1)
+        elif name in DAYS:
+            # Posts from the past week are shown with just the weekday
+            back = (reference.weekday() - DAYS[name]) % 7 or 7
+            day = reference - timedelta(days=back)
+        else:
+            return NAT
+        if hour is None:
+            return as_minutes(day.replace(hour=0, minute=0))
+        try:
+            return as_minutes(day.replace(hour=int(hour), minute=int(minute)))
+        except ValueError:
+            return NAT
+    return NAT
+
+def parse_dates(texts, references=None):
+    """
+    Parse many DATE values into a datetime64[m] array. Absolute dates are parsed
+    once per distinct string; relative forms use each row's reference time
+    (a datetime or epoch seconds, default now).
+    """
+    texts = np.asarray([text or "" for text in texts], dtype=object)
+    result = np.full(len(texts), NAT, dtype="datetime64[m]")
+    if not len(texts):
+        return result
+    unique, inverse = np.unique(texts, return_inverse=True)
+    absolute = np.array([has_year(normalize_date(text)) for text in unique])
+    parsed = np.array([parse_date(text) if full else NAT for text, full in zip(unique, absolute)],
+                      dtype="datetime64[m]")
+    result[:] = parsed[inverse]
+    now = datetime.now()
+    for row in np.nonzero(~absolute[inverse])[0]:
+        reference = references[row] if references is not None else None
+        if isinstance(reference, (int, float)) and not np.isnan(reference):
+            reference = datetime.fromtimestamp(reference)
+        elif not isinstance(reference, datetime):
+            reference = now
+        result[row] = parse_date(texts[row], reference)
+    return result
+
+def season_start_year(times, season):
+    """Year a season occurrence started in (rainy seasons span the new year)"""
+    years = times.astype("datetime64[Y]").astype(np.int64) + 1970
+    months = times.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    first = SEASONS[season][0]
+    return np.where(months >= first, years, years - 1)
+
+class TemporalIndex:
+    """
+    Sorted datetime64 index over parsed dates. Row ids are positions in the
+    source arrays (e.g. a SpatialIndex), so results join with the coordinates.
+    """
+
+    def __init__(self, times):
+        self.times = np.asarray(times, dtype="datetime64[m]")
+        valid = np.nonzero(~np.isnat(self.times))[0]
+        order = np.argsort(self.times[valid], kind="stable")
+        self.rows = valid[order]
+        self.sorted = self.times[self.rows]
+
+    @classmethod
+    def from_spatial(cls, index):
+        """Parse the DATE of every point of a SpatialIndex, aligned with its positions"""
+        return cls(parse_dates(index.date, index.scraped_at))
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def unparsed(self):
+        return len(self.times) - len(self.rows)
+
+    def range(self, start, end):
+        """Row ids with start <= time < end, in time order"""
+        lo = np.searchsorted(self.sorted, np.datetime64(start, "m"), side="left")
+        hi = np.searchsorted(self.sorted, np.datetime64(end, "m"), side="left")
+        return self.rows[lo:hi]
+
+    def month(self, year, month):
+        """Row ids of one calendar month"""
+        start = np.datetime64(f"{year:04d}-{month:02d}", "M")
+        return self.range(start, start + 1)
+
+    def monthly_counts(self):
+        """(months as datetime64[M], counts) for every month with reports"""
+        months, counts = np.unique(self.sorted.astype("datetime64[M]"), return_counts=True)
+        return months, counts
+
+    def season(self, season, start_year=None):
+        """Row ids in a season ("hujan" or "kemarau"), optionally of one season year"""
+        months = self.sorted.astype("datetime64[M]").astype(np.int64) % 12 + 1
+        mask = np.isin(months, SEASONS[season])
+        if start_year is not None:
+            mask &= season_start_year(self.sorted, season) == start_year
+        return self.rows[mask]
+
+    def within(self, rows, start, end):
+        """Filter row ids (e.g. from a spatial query) to start <= time < end"""
+        rows = np.asarray(rows, dtype=np.int64)
+        times = self.times[rows]
+        keep = ~np.isnat(times) & (times >= np.datetime64(start, "m")) & (times < np.datetime64(end, "m"))
+        return rows[keep]
+
+if __name__ == "__main__":
+    from spatial import SpatialIndex
+
+    parser = argparse.ArgumentParser(description="Time-based queries over extracted flood reports")
+    parser.add_argument('--base-dir', default="yearly_result", help="Directory holding result_<year> folders")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("months", help="Reports per month")
+    range_cmd = commands.add_parser("range", help="Reports from start up to (not including) end")
+    range_cmd.add_argument('start')
+    range_cmd.add_argument('end')
+    range_cmd.add_argument('--near', nargs=2, type=float, metavar=("LAT", "LON"), help="Only reports near a point")
+    range_cmd.add_argument('--km', type=float, default=5.0)
+    season_cmd = commands.add_parser("season", help="Reports in the rainy (hujan) or dry (kemarau) season")
+    season_cmd.add_argument('season', choices=sorted(SEASONS))
+    season_cmd.add_argument('--start-year', type=int, help="Season starting in this year")
+    args = parser.parse_args()
+
+    spatial = SpatialIndex.load(args.base_dir)
+    start = time.perf_counter()
+    index = TemporalIndex.from_spatial(spatial)
+    print(f"Parsed {len(index)} dates ({index.unparsed} unparseable) in "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    if args.command == "months":
+        months, counts = index.monthly_counts()
+        rows = [{"month": str(month), "count": int(count)} for month, count in zip(months, counts)]
+    else:
+        if args.command == "range":
+            if args.near:
+                nearby, _ = spatial.radius(args.near[0], args.near[1], args.km)
+                found = index.within(nearby, args.start, args.end)
+                found = found[np.argsort(index.times[found], kind="stable")]
+            else:
+                found = index.range(args.start, args.end)
+        else:
+            found = index.season(args.season, args.start_year)
+        rows = spatial.records(found)
+        for row, i in zip(rows, found):
+            row["time"] = str(index.times[i])
+    elapsed = (time.perf_counter() - start) * 1000
+
+    for row in rows:
+        print("  " + "  ".join(f"{key}={value}" for key, value in row.items()))
+    print(f"{len(rows)} rows in {elapsed:.3f} ms")
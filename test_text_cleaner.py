@@ -0,0 +1,93 @@
+from text_cleaner import clean_post_text, cleaner_options, cleaning_stats
+
+# yearly_result/result_2016/output_banjir/46.txt, trimmed: part of the obfuscated
+# one-character timestamp, the video player timer and the reactions block
+VIDEO_POST = """POST LINK: https://www.facebook.com/stories/107066907747341/UzpfSVNDOjYzOTAwMDk0OTIwOTE5Mw==/?view_single=false&__tn__=%3C%3C%2CP-R
+DATE: Jumat, 15 Juli 2016 pada 12.01
+
+E100
+  ·
+Ikuti
+e
+p
+o
+d
+ l
+3
+6
+ 1
+  ·
+12.00 : Kondisi terkini banjir di JL Raya Juanda. Genangan sudah mulai surut tapi, sebaiknya kendaraan kecil hindari lajur kiri karena genangan lebih dalam. Video : Sifalin via e100. (odp-rt)
+0:01 / 1:50
+Semua tanggapan:
+407
+69
+103
+Suka
+Komentari
+Salin
+Bagikan"""
+
+BODY = ("12.00 : Kondisi terkini banjir di JL Raya Juanda. Genangan sudah mulai surut tapi, "
+        "sebaiknya kendaraan kecil hindari lajur kiri karena genangan lebih dalam. "
+        "Video : Sifalin via e100. (odp-rt)")
+
+# The same post with a comment thread after "Bagikan", in the scraper's layout
+COMMENTED_POST = VIDEO_POST + """
+Paling relevan
+Rudi Hartono
+Jl Juanda arah Sidoarjo masih banjir setinggi lutut
+2 j
+Suka
+Balas
+Tulis komentar..."""
+
+COMMENT = "Jl Juanda arah Sidoarjo masih banjir setinggi lutut"
+
+def test_keeps_post_body():
+    assert clean_post_text(VIDEO_POST) == BODY
+
+def test_removes_one_character_timestamp_lines():
+    lines = clean_post_text(VIDEO_POST).splitlines()
+    assert all(len(line) > 1 for line in lines)
+
+def test_removes_page_chrome():
+    cleaned = clean_post_text(VIDEO_POST)
+    assert "Ikuti" not in cleaned
+    assert "Semua tanggapan:" not in cleaned
+    assert "Bagikan" not in cleaned
+    assert "407" not in cleaned.splitlines()
+
+def test_removes_video_player_timer():
+    assert "0:01 / 1:50" not in clean_post_text(VIDEO_POST)
+    assert clean_post_text("Banjir di Gubeng\n0:04 / 0:25\n1:02:03 / 1:10:00") == "Banjir di Gubeng"
+
+def test_removes_post_link_and_date_headers():
+    cleaned = clean_post_text(VIDEO_POST)
+    assert "POST LINK" not in cleaned
+    assert "facebook.com" not in cleaned
+    assert "DATE:" not in cleaned
+    # Posts without the "Ikuti" header still lose their scrape headers
+    no_header = "POST LINK: https://www.facebook.com/e100ss/posts/1\nDATE: Date not found\n\nBanjir di Gubeng"
+    assert clean_post_text(no_header) == "Banjir di Gubeng"
+
+def test_keeps_comments_by_default():
+    cleaned = clean_post_text(COMMENTED_POST)
+    assert cleaned == BODY + "\nRudi Hartono\n" + COMMENT
+
+def test_drops_comments_when_asked():
+    assert clean_post_text(COMMENTED_POST, keep_comments=False) == BODY
+
+def test_cleaning_stats_counts_removed_bytes():
+    cleaned = clean_post_text(VIDEO_POST)
+    bytes_removed, tokens_removed = cleaning_stats(VIDEO_POST, cleaned)
+    assert bytes_removed == len(VIDEO_POST.encode("utf-8")) - len(cleaned.encode("utf-8"))
+    assert tokens_removed > 0
+
+def test_cleaner_options_extend_the_defaults():
+    options = cleaner_options(keep_comments=False, extra_noise_lines=["Rudi Hartono"],
+                              extra_noise_patterns=[r"^Video :"])
+    assert clean_post_text(COMMENTED_POST, **options) == BODY
+    options = cleaner_options(extra_noise_lines=["Rudi Hartono"])
+    assert clean_post_text(COMMENTED_POST, **options) == BODY + "\n" + COMMENT
+    assert clean_post_text("ab\nBanjir", **cleaner_options(min_line_length=3)) == "Banjir"
@@ -0,0 +1,85 @@
+import re
+
+# Page chrome that Facebook renders as its own line
+NOISE_LINES = {
+    "e100", "ikuti", "·", "suka", "komentari", "salin", "bagikan",
+    "semua tanggapan:", "tulis komentar...", "balas", "paling relevan",
+    "lihat komentar lainnya", "sedang bersama",
+}
+
+# Whole-line patterns that never carry location information
+NOISE_PATTERNS = [
+    re.compile(r"^(POST LINK|DATE):"),                    # scrape headers, kept separately in .loc files
+    re.compile(r"^\d{1,2}:\d{2}(:\d{2})? / \d{1,2}:\d{2}(:\d{2})?$"),  # video player "0:04 / 0:25"
+    re.compile(r"^\d+([.,]\d+)?( ?(rb|jt))?$"),           # reaction and comment counts "3,8 rb"
+    re.compile(r"^https?://\S+$"),                        # bare links
+    re.compile(r"^\d+ ?(dtk|mnt|j|h|mg|thn)$"),           # comment ages "2 h", "1 thn"
+]
+
+# Header chrome ("E100 · Ikuti" plus the obfuscated timestamp) ends at this line
+HEADER_END = "ikuti"
+
+# Reactions and comment counters start here; comments follow the "Bagikan" button
+FOOTER_START = "semua tanggapan:"
+COMMENTS_START = "bagikan"
+
+# Rough characters-per-token ratio used for logging
+CHARS_PER_TOKEN = 4
+
+def _is_noise(line, min_line_length, noise_lines, noise_patterns):
+    stripped = line.strip().strip("·").strip()
+    if len(stripped) < min_line_length:
+        return True
+    if stripped.lower() in noise_lines:
+        return True
+    return any(pattern.match(stripped) for pattern in noise_patterns)
+
+def clean_post_text(text, drop_header=True, drop_footer=True, keep_comments=True,
+                    min_line_length=2, noise_lines=NOISE_LINES, noise_patterns=NOISE_PATTERNS):
+    """
+    Strip Facebook scrape noise from a post so only the body and comment text remain.
+    Header chrome up to "Ikuti", the reactions block between "Semua tanggapan:" and
+    "Bagikan", one-character obfuscation lines, video timers and bare links are removed.
+    """
+    lines = text.splitlines()
+
+    if drop_header:
+        for i, line in enumerate(lines[:40]):
+            if line.strip().strip("·").strip().lower() == HEADER_END:
+                lines = lines[i + 1:]
+                break
+
+    if drop_footer:
+        lowered = [line.strip().lower() for line in lines]
+        if FOOTER_START in lowered:
+            start = lowered.index(FOOTER_START)
+            comments = []
+            if keep_comments and COMMENTS_START in lowered[start:]:
+                comments = lines[lowered.index(COMMENTS_START, start) + 1:]
+            lines = lines[:start] + comments
+
+    kept = [line.strip() for line in lines
+            if not _is_noise(line, min_line_length, noise_lines, noise_patterns)]
+    return "\n".join(kept)
+
+def cleaner_options(keep_comments=True, min_line_length=2, extra_noise_lines=(), extra_noise_patterns=()):
+    """
+    clean_post_text keyword arguments, with extra chrome lines and regex patterns added
+    to the defaults. Raises re.error for an invalid pattern.
+    """
+    return {
+        "keep_comments": keep_comments,
+        "min_line_length": min_line_length,
+        "noise_lines": NOISE_LINES | {line.strip().lower() for line in extra_noise_lines},
+        "noise_patterns": NOISE_PATTERNS + [re.compile(pattern) for pattern in extra_noise_patterns],
+    }
+
+def estimate_tokens(text):
+    """Cheap token estimate for logging"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def cleaning_stats(raw, cleaned):
+    """Return (bytes_removed, estimated_tokens_removed)"""
+    bytes_removed = len(raw.encode('utf-8')) - len(cleaned.encode('utf-8'))
+    tokens_removed = estimate_tokens(raw) - estimate_tokens(cleaned)
+    return bytes_removed, tokens_removed
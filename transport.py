@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import random
+import threading
+
+import openai
+import requests
+from requests.adapters import HTTPAdapter
+
+class RetryableError(Exception):
+    """A failure worth retrying; throttled marks quota/rate-limit answers"""
+
+    def __init__(self, message, throttled=False, retry_after=None):
+        super().__init__(message)
+        self.throttled = throttled
+        self.retry_after = retry_after
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that adapts to the service: it halves after a 429 or a
+    slow response and grows back by one after a run of fast successes (AIMD).
+    """
+
+    def __init__(self, name, initial=8, minimum=1, maximum=64, target_latency=None, grow_after=10):
+        self.name = name
+        self.limit = max(minimum, min(initial, maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.grow_after = grow_after
+        self.in_flight = 0
+        self.successes = 0
+        self.throttles = 0
+        self.retries = 0
+        self.condition = threading.Condition()
+
+    def configure(self, initial=None, maximum=None, target_latency=None):
+        with self.condition:
+            if maximum is not None:
+                self.maximum = max(self.minimum, maximum)
+            if initial is not None:
+                self.limit = max(self.minimum, min(initial, self.maximum))
+            if target_latency is not None:
+                self.target_latency = target_latency
+            self.condition.notify_all()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= self.limit:
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency=None, throttled=False):
+        with self.condition:
+            self.in_flight -= 1
+            slow = self.target_latency is not None and latency is not None and latency > self.target_latency
+            if throttled or slow:
+                if throttled:
+                    self.throttles += 1
+                self.limit = max(self.minimum, self.limit // 2)
+                self.successes = 0
+            elif latency is not None:
+                self.successes += 1
+                if self.successes >= self.grow_after and self.limit < self.maximum:
+                    self.limit += 1
+                    self.successes = 0
+            self.condition.notify_all()
+
+    def summary(self):
+        return (f"{self.name}: concurrency limit {self.limit}/{self.maximum}, "
+                f"{self.throttles} throttled responses, {self.retries} retries")
+
+# Shared limiters; main() sizes them to the worker pools
+llm_limiter = AdaptiveLimiter("OpenAI", initial=8, maximum=8)
+geo_limiter = AdaptiveLimiter("Geocoding", initial=8, maximum=8)
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+def parse_retry_after(value):
+    """Seconds from a Retry-After header (delta seconds only), or None"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+def classify_error(error):
+    """Return (retryable, throttled, retry_after) for an exception raised by a call"""
+    if isinstance(error, RetryableError):
+        return True, error.throttled, error.retry_after
+    if isinstance(error, openai.RateLimitError):
+        return True, True, parse_retry_after(error.response.headers.get("retry-after"))
+    if isinstance(error, openai.APIStatusError):
+        retry_after = parse_retry_after(error.response.headers.get("retry-after"))
+        return error.status_code >= 500 or error.status_code == 408, False, retry_after
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True, False, None
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        retry_after = parse_retry_after(error.response.headers.get("Retry-After"))
+        return status == 429 or status >= 500, status == 429, retry_after
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True, False, None
+    return False, False, None
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After"""
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+def call_with_retries(fn, limiter=None, max_attempts=None):
+    """Run fn under the limiter, retrying retryable failures with jittered backoff"""
+    attempts = max_attempts or MAX_ATTEMPTS
+    for attempt in range(attempts):
+        if limiter is not None:
+            limiter.acquire()
+        start = time.monotonic()
+        try:
+            result = fn()
+        except Exception as e:
+            retryable, throttled, retry_after = classify_error(e)
+            if limiter is not None:
+                limiter.release(throttled=throttled)
+            if not retryable or attempt == attempts - 1:
+                raise
+            if limiter is not None:
+                with limiter.condition:
+                    limiter.retries += 1
+            time.sleep(backoff_delay(attempt, retry_after))
+            continue
+        if limiter is not None:
+            limiter.release(latency=time.monotonic() - start)
+        return result
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session(pool_size=32):
+    """Shared keep-alive requests session for the geocoding API"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+            _session.headers.update({'User-Agent': 'GeoLLM/1.0'})
+        return _session
+
+class DeadLetterQueue:
+    """Append-only JSONL of inputs that failed after all retries, for replaying later"""
+
+    def __init__(self, path="dead_letter.jsonl"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.added = 0
+
+    def add(self, year, txt_file, error):
+        record = {"year": year, "txt_file": txt_file, "error": error, "failed_at": time.time()}
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.added += 1
+
+    def take(self):
+        """
+        Return the queued inputs as (year, txt_file) pairs, one per file, and move
+        the queue aside until finish_replay(). Inputs that fail again during the
+        replay are queued again by the run; an interrupted replay is picked up next time.
+        """
+        replay_path = f"{self.path}.replay"
+        with self.lock:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as src, open(replay_path, 'a', encoding='utf-8') as dst:
+                    dst.write(src.read())
+                os.remove(self.path)
+            if not os.path.exists(replay_path):
+                return []
+            entries = {}
+            with open(replay_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        entries[record["txt_file"]] = record["year"]
+        return [(year, txt_file) for txt_file, year in entries.items()]
+
+    def finish_replay(self):
+        """Drop the inputs handed out by take() once they have been reprocessed"""
+        with self.lock:
+            if os.path.exists(f"{self.path}.replay"):
+                os.remove(f"{self.path}.replay")
@@ -0,0 +1,137 @@
+import os
+import sys
+import json
+import glob
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+COORDINATE_PATTERN = os.path.join("result_*", "output_banjir", "*_coordinate.loc")
+
+# Rule name -> action taken when the rule is applied
+RULES = {
+    "maaf": "delete",              # model apologised instead of answering
+    "needs_post_date": "append",   # only Address/Coordinates; copy POST/DATE from the .txt
+    "six_lines": "trim",           # duplicated POST/DATE; keep the first 4 lines
+    "bad_line_count": "delete",    # anything else that is not 4 lines
+}
+FIX_RULES = {"needs_post_date", "six_lines"}
+
+def check_pair(coord_file):
+    """Read a .loc file (and its .txt when needed) once and return its report entry"""
+    entry = {"file": coord_file, "lines": None, "issue": None, "action": None}
+    try:
+        with open(coord_file, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+    except Exception as e:
+        entry["issue"] = "unreadable"
+        entry["error"] = str(e)
+        return entry
+
+    entry["lines"] = len(lines)
+    content = "".join(lines)
+    if "maaf" in content.lower():
+        entry["issue"] = "maaf"
+    elif len(lines) == 2:
+        entry["issue"] = "needs_post_date"
+        txt_file = coord_file.replace('_coordinate.loc', '.txt')
+        try:
+            with open(txt_file, 'r', encoding='utf-8') as f:
+                entry["append"] = (f.readline() + f.readline()).strip()
+        except OSError:
+            entry["issue"] = "missing_txt"
+            entry["error"] = f"Corresponding .txt file not found: {txt_file}"
+    elif len(lines) == 6:
+        entry["issue"] = "six_lines"
+        entry["content"] = "".join(lines[:4])
+    elif len(lines) != 4:
+        entry["issue"] = "bad_line_count"
+
+    if entry["issue"] in RULES:
+        entry["action"] = RULES[entry["issue"]]
+    return entry
+
+def apply_fix(entry):
+    """Carry out the action recorded in a report entry"""
+    coord_file = entry["file"]
+    action = entry["action"]
+    if action == "delete":
+        os.remove(coord_file)
+    elif action == "append":
+        with open(coord_file, 'a', encoding='utf-8') as f:
+            f.write('\n' + entry["append"])
+    elif action == "trim":
+        tmp_file = f"{coord_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(entry["content"])
+        os.replace(tmp_file, coord_file)
+
+def parse_policy(value):
+    """Turn --apply into a set of rule names: none, fixes, all or a comma-separated list"""
+    if not value or value == "none":
+        return set()
+    if value == "all":
+        return set(RULES)
+    if value == "fixes":
+        return set(FIX_RULES)
+    rules = {rule.strip() for rule in value.split(",") if rule.strip()}
+    unknown = rules - set(RULES)
+    if unknown:
+        raise ValueError(f"Unknown rules: {', '.join(sorted(unknown))}")
+    return rules
+
+def validate(base_dir="yearly_result", policy=(), workers=8):
+    """Check every coordinate file in one parallel pass and apply fixes allowed by policy"""
+    coordinate_files = sorted(glob.glob(os.path.join(base_dir, COORDINATE_PATTERN)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        entries = list(executor.map(check_pair, coordinate_files))
+
+        to_apply = [entry for entry in entries if entry["issue"] in policy]
+
+        def run(entry):
+            try:
+                apply_fix(entry)
+                entry["applied"] = True
+            except Exception as e:
+                entry["applied"] = False
+                entry["error"] = str(e)
+
+        list(executor.map(run, to_apply))
+
+    summary = {"files": len(entries), "ok": 0}
+    for entry in entries:
+        issue = entry["issue"] or "ok"
+        summary[issue] = summary.get(issue, 0) + 1
+    summary["applied"] = sum(1 for entry in entries if entry.get("applied"))
+
+    issues = []
+    for entry in entries:
+        if entry["issue"] is None:
+            continue
+        # Keep the report small: file contents are only needed to apply fixes
+        issues.append({k: v for k, v in entry.items() if k not in ("append", "content")})
+    return {"summary": summary, "policy": sorted(policy), "issues": issues}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Validate all coordinate files in one pass without prompting")
+    parser.add_argument('--base-dir', default="yearly_result", help="Directory holding result_<year> folders")
+    parser.add_argument('--apply', default="none",
+                        help="Rules to fix: none (report only), fixes (append POST/DATE and trim 6-line files), "
+                             f"all, or a comma-separated list of {', '.join(RULES)}")
+    parser.add_argument('--report', help="Write the JSON report to this file instead of stdout")
+    parser.add_argument('--workers', type=int, default=8, help="Parallel file readers")
+    args = parser.parse_args()
+
+    try:
+        policy = parse_policy(args.apply)
+    except ValueError as e:
+        parser.error(str(e))
+
+    report = validate(args.base_dir, policy, args.workers)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(json.dumps(report["summary"]))
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
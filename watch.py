@@ -0,0 +1,75 @@
+import os
+import re
+import time
+
+import main
+from main import coordinate_path
+from pipeline import run_concurrent
+
+def scan_inputs(base_dir="yearly_result"):
+    """Stat every post under base_dir; returns {txt_file: (year, size, mtime)}"""
+    snapshot = {}
+    try:
+        year_dirs = os.scandir(base_dir)
+    except OSError:
+        return snapshot
+    with year_dirs:
+        for year_dir in year_dirs:
+            match = re.fullmatch(r"result_(\d{4})", year_dir.name)
+            if not match or not year_dir.is_dir():
+                continue
+            folder = os.path.join(year_dir.path, "output_banjir")
+            try:
+                entries = os.scandir(folder)
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.name.endswith(".txt") and entry.is_file():
+                        stat = entry.stat()
+                        snapshot[entry.path] = (int(match.group(1)), stat.st_size, stat.st_mtime)
+    return snapshot
+
+def watch(client, base_dir="yearly_result", model="gpt-4.1-mini", interval=10,
+          llm_workers=8, llm_rpm=500, geo_workers=8, geo_rpm=3000):
+    """
+    Poll base_dir and extract coordinates for posts as they land or change.
+    A file is picked up once its size and mtime have been stable for one poll,
+    so posts still being written by the scraper are not read half-finished.
+    Runs until interrupted; returns (total_processed, total_errors).
+    """
+    previous = {}
+    handled = {}
+    total_processed = 0
+    total_errors = 0
+    print(f"Watching {base_dir} every {interval}s (Ctrl+C to stop)")
+
+    try:
+        while True:
+            snapshot = scan_inputs(base_dir)
+            jobs = []
+            for txt_file, state in snapshot.items():
+                if handled.get(txt_file) == state or previous.get(txt_file) != state:
+                    continue
+                handled[txt_file] = state
+                year = state[0]
+                coordinate_file = coordinate_path(txt_file)
+                if not main.is_done(year, txt_file, coordinate_file):
+                    jobs.append((year, txt_file, coordinate_file))
+
+            if jobs:
+                print(f"\n{time.strftime('%H:%M:%S')} - {len(jobs)} new or changed posts")
+                processed, errors = run_concurrent(
+                    client, jobs, model,
+                    llm_workers=llm_workers, llm_rpm=llm_rpm,
+                    geo_workers=geo_workers, geo_rpm=geo_rpm,
+                )
+                total_processed += processed
+                total_errors += errors
+
+            previous = snapshot
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+
+    return total_processed, total_errors